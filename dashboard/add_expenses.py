@@ -1,8 +1,12 @@
-import sqlite3
 from datetime import datetime, timedelta
 
+import db_pool
+import kpi_store
+import migrations
+
 DB_PATH = 'data/northstar.db'
-conn = sqlite3.connect(DB_PATH)
+conn = db_pool.connect(DB_PATH)
+migrations.migrate(conn)
 cursor = conn.cursor()
 
 # Add missing monthly subscriptions and API costs
@@ -56,6 +60,7 @@ for date, segment, desc, amount, category in expenses:
         inserted += 1
 
 conn.commit()
+kpi_store.refresh_for_source(conn, "expenses")
 
 # Verify totals
 cursor.execute("SELECT COUNT(*), SUM(amount) FROM expenses")
@@ -1,8 +1,13 @@
-import sqlite3
 import random
 from datetime import datetime, timedelta
 
-conn = sqlite3.connect('data/northstar.db')
+import db_pool
+import kpi_store
+import migrations
+
+conn = db_pool.connect('data/northstar.db')
+
+migrations.migrate(conn)
 cursor = conn.cursor()
 
 # Add realistic historical settled trades to show actual trading P&L
@@ -64,6 +69,7 @@ for i in range(150):
     total_pnl += pnl
 
 conn.commit()
+kpi_store.refresh_for_source(conn, "kalshi_trades")
 
 # Verify new totals
 cursor.execute("SELECT COUNT(*), SUM(pnl_realized) FROM kalshi_trades WHERE status='Settled'")
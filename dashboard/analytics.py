@@ -2,21 +2,13 @@
 analytics.py — advanced query endpoints for Northstar dashboard
 Imported by app.py
 """
-import sqlite3, json
+import sqlite3, json, asyncio
 from fastapi import APIRouter
 from database import DB_PATH, get_db
+import eod_engine
 
 router = APIRouter(prefix="/api")
 
-PERIOD_SQL = {
-    "today":   "date(snap_date) = date('now','localtime')",
-    "week":    "date(snap_date) >= date('now','localtime','-7 days')",
-    "month":   "strftime('%Y-%m',snap_date) = strftime('%Y-%m','now','localtime')",
-    "quarter": "snap_date >= date('now','localtime','start of year','+' || (((cast(strftime('%m','now') as int)-1)/3)*3) || ' months')",
-    "year":    "strftime('%Y',snap_date) = strftime('%Y','now','localtime')",
-    "all":     "1=1",
-}
-
 BET_PERIOD_SQL = {
     "today":   "date(bet_date) = date('now','localtime')",
     "week":    "date(bet_date) >= date('now','localtime','-7 days')",
@@ -28,7 +20,8 @@ BET_PERIOD_SQL = {
 
 # ── KALSHI LIVE SUMMARY ────────────────────────────────────────────────────────
 @router.get("/kalshi/summary")
-async def kalshi_summary():
+async def kalshi_summary(start: str = None, end: str = None):
+    series = await asyncio.to_thread(eod_engine.get_series, DB_PATH)
     db = await get_db()
     try:
         # Latest snapshot for live balance
@@ -36,29 +29,17 @@ async def kalshi_summary():
         latest = dict((await cur.fetchone()) or {})
 
         # Daily P&L — last 30 days, one snapshot per day (end-of-day LAST snapshot)
-        cur = await db.execute("""
-            WITH daily_eod AS (
-                SELECT *
-                FROM (
-                    SELECT *,
-                           ROW_NUMBER() OVER (
-                               PARTITION BY snap_date
-                               ORDER BY snapshot_ts DESC
-                           ) AS rn
-                    FROM kalshi_snapshots
-                )
-                WHERE rn = 1
-            )
-            SELECT snap_date,
-                   total_pnl_cents AS max_pnl,
-                   balance_cents AS max_bal,
-                   total_fills AS max_fills,
-                   win_count AS wins,
-                   loss_count AS losses
-            FROM daily_eod
-            ORDER BY snap_date DESC LIMIT 30
-        """)
-        daily = [dict(r) for r in await cur.fetchall()]
+        daily = [
+            {
+                "snap_date": r.snap_date,
+                "max_pnl": r.total_pnl_cents,
+                "max_bal": r.balance_cents,
+                "max_fills": r.total_fills,
+                "wins": r.win_count,
+                "losses": r.loss_count,
+            }
+            for r in series.rows[-30:]
+        ]
 
         # Category breakdown (latest snapshot)
         categories = {}
@@ -71,63 +52,22 @@ async def kalshi_summary():
                 "lip_rewards":   round((latest.get("lip_rewards_cents") or 0) / 100, 2),
             }
 
-        # Period P&L — calculate balance change using end-of-day LAST snapshots
+        # Period P&L — balance change between first and last end-of-day snapshots
+        ranges = {p: eod_engine.period_bounds(p) for p in eod_engine.PERIODS}
+        if start or end:
+            ranges["custom"] = (start, end)
         periods = {}
-        for period, cond in PERIOD_SQL.items():
-            # First EOD snapshot in period
-            cur = await db.execute(f"""
-                WITH daily_eod AS (
-                    SELECT *
-                    FROM (
-                        SELECT *,
-                               ROW_NUMBER() OVER (
-                                   PARTITION BY snap_date
-                                   ORDER BY snapshot_ts DESC
-                               ) AS rn
-                        FROM kalshi_snapshots
-                    )
-                    WHERE rn = 1
-                )
-                SELECT balance_cents
-                FROM daily_eod
-                WHERE {cond}
-                ORDER BY snap_date ASC
-                LIMIT 1
-            """)
-            first = await cur.fetchone()
-            start_bal = (first[0] if first else 0) or 0
-
-            # Last EOD snapshot in period
-            cur = await db.execute(f"""
-                WITH daily_eod AS (
-                    SELECT *
-                    FROM (
-                        SELECT *,
-                               ROW_NUMBER() OVER (
-                                   PARTITION BY snap_date
-                                   ORDER BY snapshot_ts DESC
-                               ) AS rn
-                        FROM kalshi_snapshots
-                    )
-                    WHERE rn = 1
-                )
-                SELECT balance_cents, total_fills, win_count, loss_count
-                FROM daily_eod
-                WHERE {cond}
-                ORDER BY snap_date DESC
-                LIMIT 1
-            """)
-            last = await cur.fetchone()
-
-            if last:
-                end_bal = (last[0] or 0)
-                pnl = (end_bal - start_bal) / 100
-                periods[period] = {
-                    "pnl_usd":  round(pnl, 2),
-                    "fills":    last[1] or 0,
-                    "wins":     last[2] or 0,
-                    "losses":   last[3] or 0,
-                }
+        for period, (p_start, p_end) in ranges.items():
+            summary = series.range_summary(p_start, p_end)
+            if not summary:
+                continue
+            first, last = summary["first"], summary["last"]
+            periods[period] = {
+                "pnl_usd":  round(((last.balance_cents or 0) - (first.balance_cents or 0)) / 100, 2),
+                "fills":    last.total_fills or 0,
+                "wins":     last.win_count or 0,
+                "losses":   last.loss_count or 0,
+            }
 
         return {
             "live": {
@@ -142,7 +82,7 @@ async def kalshi_summary():
             },
             "categories":   categories,
             "periods":       periods,
-            "daily":         list(reversed(daily)),
+            "daily":         daily,
         }
     finally:
         await db.close()
@@ -150,41 +90,14 @@ async def kalshi_summary():
 # ── KALSHI TIMESERIES ──────────────────────────────────────────────────────────
 @router.get("/kalshi/timeseries")
 async def kalshi_timeseries():
-    db = await get_db()
-    try:
-        cur = await db.execute("""
-            WITH daily_eod AS (
-                SELECT *
-                FROM (
-                    SELECT *,
-                           ROW_NUMBER() OVER (
-                               PARTITION BY snap_date
-                               ORDER BY snapshot_ts DESC
-                           ) AS rn
-                    FROM kalshi_snapshots
-                )
-                WHERE rn = 1
-            )
-            SELECT snap_date,
-                   total_pnl_cents AS total_pnl,
-                   balance_cents AS balance,
-                   weather_pnl_cents AS weather,
-                   crypto_pnl_cents AS crypto,
-                   econ_pnl_cents AS econ,
-                   mm_pnl_cents AS mm
-            FROM daily_eod
-            ORDER BY snap_date
-        """)
-        rows = await cur.fetchall()
-        return [{"date": r[0],
-                 "total_pnl": round((r[1] or 0)/100, 2),
-                 "balance": round((r[2] or 0)/100, 2),
-                 "weather": round((r[3] or 0)/100, 2),
-                 "crypto":  round((r[4] or 0)/100, 2),
-                 "econ":    round((r[5] or 0)/100, 2),
-                 "mm":      round((r[6] or 0)/100, 2)} for r in rows]
-    finally:
-        await db.close()
+    series = await asyncio.to_thread(eod_engine.get_series, DB_PATH)
+    return [{"date": r.snap_date,
+             "total_pnl": round((r.total_pnl_cents or 0)/100, 2),
+             "balance": round((r.balance_cents or 0)/100, 2),
+             "weather": round((r.weather_pnl_cents or 0)/100, 2),
+             "crypto":  round((r.crypto_pnl_cents or 0)/100, 2),
+             "econ":    round((r.econ_pnl_cents or 0)/100, 2),
+             "mm":      round((r.mm_pnl_cents or 0)/100, 2)} for r in series.rows]
 
 # ── SPORTS PICKS ────────────────────────────────────────────────────────────────
 @router.get("/sports-picks")
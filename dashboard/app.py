@@ -5,17 +5,28 @@ FastAPI application serving Kalshi trade data from SQLite
 
 import os
 import re
-import sqlite3
-import json
 import calendar
 import subprocess
 from datetime import date, datetime, timedelta
 from pathlib import Path
 from contextlib import contextmanager
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+
+import db_pool
+import drawdown_engine
+import eod_engine
+import exposure_ledger
+import kalshi_http
+import kpi_store
+import ledgers
+import market_clusters
+import migrations
+from kalshi_live import LiveRefresher
+from kpi_push import KpiBroadcaster
+from response_cache import ResponseCache, encode
 
 # — Database path: use committed db, fall back to /tmp
 DB_PATH = os.environ.get(
@@ -29,62 +40,33 @@ if not os.path.exists(DB_PATH):
 
 app = FastAPI(title="NorthStar Synergy P&L API")
 
+# Heavy read endpoints: JSON bytes reused until PRAGMA data_version moves
+response_cache = ResponseCache(DB_PATH)
+
+# Polls Kalshi balance/positions on an interval; /api/kalshi/live reads from memory
+kalshi_live_refresher = LiveRefresher(DB_PATH)
+
+# Recomputes the dashboard once per data change and pushes field deltas (SSE / WebSocket)
+kpi_broadcaster = KpiBroadcaster(response_cache.data_version, lambda: _dashboard_payload())
+
 
 # — Database helpers
 @contextmanager
 def get_db():
-    """Synchronous SQLite connection with row_factory."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    try:
+    """Pooled per-thread read connection (sqlite3.Row rows)."""
+    yield db_pool.reader(DB_PATH)
+
+
+@contextmanager
+def get_write_db():
+    """The process-wide writer connection; commits on exit."""
+    with db_pool.writer(DB_PATH) as conn:
         yield conn
-    finally:
-        conn.close()
 
 
 def ensure_tables(conn):
-    """Create tables if they don't exist."""
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS kalshi_trades (
-            trade_date TEXT,
-            contract_id TEXT,
-            market TEXT,
-            direction TEXT,
-            entry_price REAL,
-            exit_price REAL,
-            num_contracts INTEGER,
-            cost_basis REAL,
-            pnl_realized REAL,
-            pnl_unrealized REAL,
-            status TEXT,
-            expiry_date TEXT,
-            fees REAL,
-            notes TEXT
-        )
-    """)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS api_usage (
-            usage_date TEXT,
-            provider TEXT,
-            model TEXT,
-            input_tokens INTEGER,
-            output_tokens INTEGER,
-            cost_usd REAL
-        )
-    """)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS sync_run_audit (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            run_id TEXT NOT NULL,
-            source TEXT NOT NULL,
-            started_at TEXT NOT NULL,
-            completed_at TEXT,
-            status TEXT NOT NULL,
-            records_synced INTEGER DEFAULT 0,
-            error_message TEXT,
-            details_json TEXT
-        )
-    """)
+    """Create or upgrade tables via the versioned migrations."""
+    migrations.migrate(conn)
     conn.commit()
 
 
@@ -323,251 +305,152 @@ def get_scheduler_checks():
 @app.on_event("startup")
 def startup():
     print(f"[DB] Using database at: {DB_PATH}")
-    with get_db() as conn:
+    with get_write_db() as conn:
         ensure_tables(conn)
+        kpi_store.ensure_kpi_tables(conn)
+        if conn.execute("SELECT 1 FROM kpi_totals LIMIT 1").fetchone() is None:
+            kpi_store.refresh_all(conn)
         # Check row count
         cur = conn.execute("SELECT COUNT(*) FROM kalshi_trades")
         count = cur.fetchone()[0]
         print(f"[DB] kalshi_trades has {count} rows")
+    kalshi_live_refresher.start()
 
 
-# — API: Dashboard KPIs (FULL DATA VERSION)
-def _kalshi_legacy_trade_metrics(conn):
-    """Previous KPI method based on kalshi_trades; retained for reconciliation."""
-    total = conn.execute("SELECT COUNT(*) FROM kalshi_trades").fetchone()[0]
-    settled = conn.execute("SELECT COUNT(*) FROM kalshi_trades WHERE status='Settled'").fetchone()[0]
-    open_pos = conn.execute("SELECT COUNT(*) FROM kalshi_trades WHERE status IS NULL OR status!='Settled'").fetchone()[0]
-
-    wins = 0
-    losses = 0
-    net_pnl = 0.0
-    win_total = 0.0
-    loss_total = 0.0
-    open_exposure = 0.0
+@app.on_event("startup")
+async def start_kpi_push():
+    kpi_broadcaster.start()
 
-    rows = conn.execute(
-        "SELECT entry_price, exit_price, num_contracts, fees, status, cost_basis, pnl_realized FROM kalshi_trades"
-    ).fetchall()
-    for row in rows:
-        entry, exit_p, qty, fees, status, cost, db_pnl = row
-        if status == 'Settled':
-            if db_pnl is not None:
-                pnl = db_pnl
-            elif entry is not None and exit_p is not None and qty is not None:
-                pnl = (exit_p - entry) * qty - (fees or 0)
-            else:
-                continue
-            net_pnl += pnl
-            if pnl > 0:
-                wins += 1
-                win_total += pnl
-            elif pnl < 0:
-                losses += 1
-                loss_total += abs(pnl)
-        else:
-            if cost is not None:
-                open_exposure += cost
-            elif entry is not None and qty is not None:
-                open_exposure += entry * qty
 
+@app.on_event("shutdown")
+def shutdown():
+    kpi_broadcaster.stop()
+    kalshi_live_refresher.stop()
+    kalshi_http.close()
+    response_cache.close()
+    db_pool.close_all()
+
+
+# — API: Dashboard KPIs (FULL DATA VERSION)
+def _kalshi_legacy_trade_metrics(conn, totals=None):
+    """Previous KPI method based on kalshi_trades; retained for reconciliation.
+
+    Reads the kpi_totals rows maintained by kpi_store.refresh_trades().
+    """
+    t = totals if totals is not None else kpi_store.read_totals(conn, "kalshi_trades")
+    wins = int(t.get("wins", 0))
+    losses = int(t.get("losses", 0))
     return {
         "betting_wins": wins,
         "betting_losses": losses,
-        "betting_net": round(net_pnl, 2),
-        "total_trades": total,
-        "open_positions": open_pos,
-        "open_exposure": round(open_exposure, 2),
-        "unique_contracts": settled,
-        "avg_win": round(win_total / max(wins, 1), 2),
-        "avg_loss": round(-(loss_total / max(losses, 1)), 2),
+        "betting_net": round(float(t.get("net_pnl", 0.0)), 2),
+        "total_trades": int(t.get("total", 0)),
+        "open_positions": int(t.get("open_positions", 0)),
+        "open_exposure": round(float(t.get("open_exposure", 0.0)), 2),
+        "unique_contracts": int(t.get("settled", 0)),
+        "avg_win": round(float(t.get("win_total", 0.0)) / max(wins, 1), 2),
+        "avg_loss": round(-(float(t.get("loss_total", 0.0)) / max(losses, 1)), 2),
     }
 
 
-def _kalshi_snapshot_periods(conn):
+def _kalshi_snapshot_periods(conn, start: str = None, end: str = None):
     """Compute period aggregates from end-of-day snapshots with a pre-period baseline."""
-    period_filters = {
-        "today": "date(snap_date) = date('now','localtime')",
-        "week": "date(snap_date) >= date('now','localtime','-7 days')",
-        "month": "strftime('%Y-%m',snap_date) = strftime('%Y-%m','now','localtime')",
-        "quarter": "snap_date >= date('now','localtime','start of year','+' || (((cast(strftime('%m','now') as int)-1)/3)*3) || ' months')",
-        "year": "strftime('%Y',snap_date) = strftime('%Y','now','localtime')",
-        "all": "1=1",
-    }
-
-    eod_cte = """
-        WITH daily_eod AS (
-            SELECT *
-            FROM (
-                SELECT *,
-                       ROW_NUMBER() OVER (
-                           PARTITION BY snap_date
-                           ORDER BY snapshot_ts DESC
-                       ) AS rn
-                FROM kalshi_snapshots
-            )
-            WHERE rn = 1
-        )
-    """
-
-    out = {}
-    for period, where_sql in period_filters.items():
-        first = conn.execute(
-            eod_cte + f"""
-            SELECT snap_date, snapshot_ts, balance_cents, total_pnl_cents
-            FROM daily_eod
-            WHERE {where_sql}
-            ORDER BY snap_date ASC
-            LIMIT 1
-            """
-        ).fetchone()
-        last = conn.execute(
-            eod_cte + f"""
-            SELECT snap_date, snapshot_ts, balance_cents, total_pnl_cents, total_fills, win_count, loss_count
-            FROM daily_eod
-            WHERE {where_sql}
-            ORDER BY snap_date DESC
-            LIMIT 1
-            """
-        ).fetchone()
-        if not first or not last:
-            continue
-
-        baseline = conn.execute(
-            eod_cte + """
-            SELECT balance_cents, total_pnl_cents
-            FROM daily_eod
-            WHERE snap_date < ?
-            ORDER BY snap_date DESC
-            LIMIT 1
-            """,
-            (first[0],),
-        ).fetchone()
-
-        baseline_balance = (baseline[0] if baseline else first[2]) or 0
-        baseline_total_pnl = (baseline[1] if baseline else first[3]) or 0
-
-        balance_delta_usd = ((last[2] or 0) - baseline_balance) / 100.0
-        pnl_delta_usd = ((last[3] or 0) - baseline_total_pnl) / 100.0
-        out[period] = {
-            "start_ts": first[1],
-            "end_ts": last[1],
-            "pnl_usd": round(pnl_delta_usd, 2),
-            "balance_delta_usd": round(balance_delta_usd, 2),
-            "fills": int(last[4] or 0),
-            "wins": int(last[5] or 0),
-            "losses": int(last[6] or 0),
-        }
-
-    return out
+    return eod_engine.get_series(DB_PATH, conn).periods(start=start, end=end)
 
 
 def _build_drawdown_analytics(conn):
-    """Build EOD equity, underwater curve, and recovery markers from kalshi_snapshots."""
-    rows = conn.execute("""
-        WITH daily_eod AS (
-            SELECT *
-            FROM (
-                SELECT *,
-                       ROW_NUMBER() OVER (
-                           PARTITION BY snap_date
-                           ORDER BY snapshot_ts DESC
-                       ) AS rn
-                FROM kalshi_snapshots
-            )
-            WHERE rn = 1
-        )
-        SELECT snap_date, total_pnl_cents
-        FROM daily_eod
-        ORDER BY snap_date ASC
-    """).fetchall()
+    """Build EOD equity, underwater curve, and recovery markers from kpi_daily_eod."""
+    rows = conn.execute(
+        "SELECT snap_date, total_pnl_cents FROM kpi_daily_eod ORDER BY snap_date ASC"
+    ).fetchall()
+    dd = drawdown_engine.compute([r[0] for r in rows], [(r[1] or 0) / 100.0 for r in rows])
+    series, episodes = dd["series"], dd["episodes"]
+    return {
+        "equity_curve": [{"date": d, "pnl": v} for d, v in zip(series["ts"], series["equity"])],
+        "underwater": [
+            {"date": d, "drawdown": v, "drawdown_pct": pct}
+            for d, v, pct in zip(series["ts"], series["drawdown"], series["drawdown_pct"])
+        ],
+        "daily_pnl": [{"date": d, "pnl": v} for d, v in zip(series["ts"], series["period_pnl"])],
+        "max_drawdown": dd["max_drawdown"],
+        "max_drawdown_pct": dd["max_drawdown_pct"],
+        "max_drawdown_days": dd["max_drawdown_points"],
+        "drawdown_zone": dd["drawdown_zone"],
+        "recovery_markers": [
+            {"drawdown_start": s, "recovered_on": rec, "duration_days": days}
+            for s, rec, days in zip(episodes["start"], episodes["recovered"], episodes["duration_points"])
+            if rec is not None
+        ],
+        "drawdown_thresholds": dd["drawdown_thresholds"],
+    }
 
-    if not rows:
-        return {
-            "equity_curve": [],
-            "underwater": [],
-            "daily_pnl": [],
-            "max_drawdown": 0.0,
-            "max_drawdown_pct": 0.0,
-            "max_drawdown_days": 0,
-            "drawdown_zone": "green",
-            "recovery_markers": [],
-            "drawdown_thresholds": {
-                "green": {"max_dd_usd": 250.0, "label": "healthy"},
-                "amber": {"max_dd_usd": 750.0, "label": "caution"},
-                "red": {"max_dd_usd": 99999999.0, "label": "risk"},
-            },
-        }
 
-    total_pnls = [float((r[1] or 0) / 100.0) for r in rows]
-    baseline = total_pnls[0]
-    running_peak = baseline
-    peak_idx = 0
-    drawdown_start_idx = None
-
-    equity_curve = []
-    underwater = []
-    daily_pnl = []
-    recovery_markers = []
-
-    max_dd = 0.0
-    max_dd_pct = 0.0
-    max_dd_days = 0
-
-    for i, r in enumerate(rows):
-        day = r[0]
-        total = total_pnls[i]
-        equity = round(total - baseline, 2)
-        day_pnl = 0.0 if i == 0 else round(total - total_pnls[i - 1], 2)
-
-        equity_curve.append({"date": day, "pnl": equity})
-        daily_pnl.append({"date": day, "pnl": day_pnl})
-
-        if total >= running_peak:
-            if drawdown_start_idx is not None and i > drawdown_start_idx:
-                recovery_markers.append({
-                    "drawdown_start": rows[drawdown_start_idx][0],
-                    "recovered_on": day,
-                    "duration_days": i - drawdown_start_idx,
-                })
-            running_peak = total
-            peak_idx = i
-            drawdown_start_idx = None
+@app.get("/api/dashboard")
+def get_dashboard(request: Request, start: str = None, end: str = None):
+    """Full P&L dashboard payload, cached until the next database write."""
+    return response_cache.respond(request, ("dashboard", start, end), lambda: _dashboard_payload(start, end))
+
+
+@app.get("/api/drawdown")
+def get_drawdown(request: Request, resolution: str = "hourly", start: str = None, end: str = None):
+    """Columnar equity/drawdown series over kalshi_snapshots (resolution: raw, 15min, hourly, daily)."""
+    if resolution not in drawdown_engine.RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {', '.join(drawdown_engine.RESOLUTIONS)}")
+    return response_cache.respond(
+        request, ("drawdown", resolution, start, end),
+        lambda: drawdown_engine.snapshot_drawdown(DB_PATH, resolution, start, end),
+    )
 
-        dd = round(total - running_peak, 2)
-        if dd < 0 and drawdown_start_idx is None:
-            drawdown_start_idx = peak_idx
 
-        dd_pct = 0.0 if running_peak <= 0 else (dd / running_peak) * 100.0
-        underwater.append({"date": day, "drawdown": dd, "drawdown_pct": round(dd_pct, 2)})
+# — Server push: snapshot then KPI deltas whenever the database changes
+@app.get("/api/stream/kpis")
+async def stream_kpis(request: Request):
+    """Server-Sent Events: `snapshot` (full dashboard payload), then `delta` events with changed fields only."""
+    sub = await kpi_broadcaster.subscribe()
 
-        if dd < max_dd:
-            max_dd = dd
-            max_dd_pct = dd_pct
-            max_dd_days = i - peak_idx if i >= peak_idx else 0
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                item = await kpi_broadcaster.next_event(sub)
+                if item is None:
+                    yield b": keepalive\n\n"
+                    continue
+                event, seq, data = item
+                yield b"event: %s\nid: %d\ndata: %s\n\n" % (event.encode(), seq, encode(data))
+        finally:
+            kpi_broadcaster.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    abs_max_dd = abs(max_dd)
-    zone = "green" if abs_max_dd <= 250 else "amber" if abs_max_dd <= 750 else "red"
 
-    return {
-        "equity_curve": equity_curve,
-        "underwater": underwater,
-        "daily_pnl": daily_pnl,
-        "max_drawdown": round(max_dd, 2),
-        "max_drawdown_pct": round(max_dd_pct, 2),
-        "max_drawdown_days": int(max_dd_days),
-        "drawdown_zone": zone,
-        "recovery_markers": recovery_markers,
-        "drawdown_thresholds": {
-            "green": {"max_dd_usd": 250.0, "label": "healthy"},
-            "amber": {"max_dd_usd": 750.0, "label": "caution"},
-            "red": {"max_dd_usd": 99999999.0, "label": "risk"},
-        },
-    }
+@app.websocket("/ws/kpis")
+async def ws_kpis(websocket: WebSocket):
+    """Same stream as /api/stream/kpis as JSON messages {"event", "seq", "data"}."""
+    await websocket.accept()
+    sub = await kpi_broadcaster.subscribe()
+    try:
+        while True:
+            item = await kpi_broadcaster.next_event(sub)
+            if item is None:
+                await websocket.send_text('{"event":"ping"}')
+                continue
+            event, seq, data = item
+            await websocket.send_text(encode({"event": event, "seq": seq, "data": data}).decode())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        kpi_broadcaster.unsubscribe(sub)
 
 
-@app.get("/api/dashboard")
-def get_dashboard():
-    """Return full P&L dashboard data with Kalshi KPIs sourced from kalshi_snapshots."""
+def _dashboard_payload(start: str = None, end: str = None):
+    """Return full P&L dashboard data with Kalshi KPIs sourced from kalshi_snapshots.
+
+    Optional start/end (YYYY-MM-DD) add a "custom" entry to kalshi_periods.
+    """
     usage = 0
     cost_caps = {}
 
@@ -622,33 +505,36 @@ def get_dashboard():
 
     with get_db() as conn:
         try:
-            latest = conn.execute(
-                """
-                SELECT snapshot_ts, total_pnl_cents, total_fills, win_count, loss_count,
-                       open_positions, total_orders
-                FROM kalshi_snapshots
-                ORDER BY snapshot_ts DESC LIMIT 1
-                """
-            ).fetchone()
+            kpis = kpi_store.read_dashboard_kpis(conn)
+        except Exception as e:
+            print(f"[ERROR] KPI read: {e}")
+            kpis = {"latest": None, "periods": {}, "expenses": {}, "sports": {}, "john": {}, "kalshi_trades": {}}
+
+        try:
+            latest = kpis["latest"]
             if latest:
                 snapshot_metrics.update({
-                    "betting_wins": int(latest[3] or 0),
-                    "betting_losses": int(latest[4] or 0),
-                    "betting_net": round((latest[1] or 0) / 100.0, 2),
-                    "total_trades": int(latest[2] or 0),
-                    "open_positions": int(latest[5] or 0),
+                    "betting_wins": int(latest[5] or 0),
+                    "betting_losses": int(latest[6] or 0),
+                    "betting_net": round((latest[3] or 0) / 100.0, 2),
+                    "total_trades": int(latest[4] or 0),
+                    "open_positions": int(latest[7] or 0),
                     "open_exposure": 0.0,
-                    "unique_contracts": int(latest[2] or 0),
-                    "last_snapshot_ts": latest[0],
+                    "unique_contracts": int(latest[4] or 0),
+                    "last_snapshot_ts": latest[1],
                 })
-            kalshi_periods = _kalshi_snapshot_periods(conn)
+            kalshi_periods = kpis["periods"]
+            if start or end:
+                custom = _kalshi_snapshot_periods(conn, start, end).get("custom")
+                if custom:
+                    kalshi_periods = {**kalshi_periods, "custom": custom}
             drawdown_analytics = _build_drawdown_analytics(conn)
         except Exception as e:
             print(f"[ERROR] Snapshot KPI calc: {e}")
 
         # Legacy comparison (previous method)
         try:
-            legacy = _kalshi_legacy_trade_metrics(conn)
+            legacy = _kalshi_legacy_trade_metrics(conn, kpis["kalshi_trades"])
             kalshi_reconciliation = {
                 "snapshot": {
                     "betting_wins": snapshot_metrics["betting_wins"],
@@ -706,52 +592,24 @@ def get_dashboard():
             cost_caps = {}
 
         # Get expenses
-        try:
-            exp_row = conn.execute("SELECT SUM(amount) FROM expenses").fetchone()
-            total_expenses = float(exp_row[0] if exp_row and exp_row[0] else 0)
-
-            api_row = conn.execute("SELECT SUM(amount) FROM expenses WHERE lower(category)='api_tokens'").fetchone()
-            api_cost_expenses = float(api_row[0] if api_row and api_row[0] else 0)
-
-            fee_row = conn.execute("SELECT SUM(amount) FROM expenses WHERE lower(category)='trading_fees'").fetchone()
-            trading_fee_expenses = float(fee_row[0] if fee_row and fee_row[0] else 0)
-
-            other_expenses = max(0.0, total_expenses - api_cost_expenses - trading_fee_expenses)
-        except Exception:
-            total_expenses = 0
-            api_cost_expenses = 0
-            trading_fee_expenses = 0
-            other_expenses = 0
+        expenses = kpis["expenses"]
+        total_expenses = float(expenses.get("total", 0) or 0)
+        api_cost_expenses = float(expenses.get("category:api_tokens", 0) or 0)
+        trading_fee_expenses = float(expenses.get("category:trading_fees", 0) or 0)
+        other_expenses = max(0.0, total_expenses - api_cost_expenses - trading_fee_expenses)
 
         # Get John's business data
-        try:
-            john_cash_row = conn.execute("SELECT SUM(amount) FROM revenue WHERE lower(segment)='john'").fetchone()
-            john_revenue = float(john_cash_row[0] if john_cash_row and john_cash_row[0] else 0)
-
-            john_pipeline_row = conn.execute("SELECT SUM(invoice_amount) FROM john_jobs WHERE status IN ('quoted', 'in_progress')").fetchone()
-            john_pipeline = john_pipeline_row[0] if john_pipeline_row and john_pipeline_row[0] else 0
-
-            john_jobs = conn.execute("SELECT COUNT(*) FROM john_jobs").fetchone()[0]
-            john_leads = conn.execute("SELECT COUNT(*) FROM john_leads").fetchone()[0]
-        except Exception:
-            john_revenue = 0
-            john_pipeline = 0
+        john = kpis["john"]
+        john_revenue = float(john.get("revenue", 0) or 0)
+        john_pipeline = float(john.get("pipeline", 0) or 0)
+        john_jobs = int(john.get("jobs", 0) or 0)
+        john_leads = int(john.get("leads", 0) or 0)
 
         # Get sports betting P&L
-        try:
-            sports_result = conn.execute("""
-                SELECT
-                    SUM(CASE WHEN result='WIN' THEN 1 ELSE 0 END) as wins,
-                    SUM(CASE WHEN result='LOSS' THEN 1 ELSE 0 END) as losses,
-                    SUM(profit_loss) as net
-                FROM sports_picks
-                WHERE result IN ('WIN', 'LOSS')
-            """).fetchone()
-            sports_wins = sports_result[0] if sports_result[0] else 0
-            sports_losses = sports_result[1] if sports_result[1] else 0
-            sports_net = sports_result[2] if sports_result[2] else 0
-        except Exception:
-            pass
+        sports = kpis["sports"]
+        sports_wins = int(sports.get("wins", 0) or 0)
+        sports_losses = int(sports.get("losses", 0) or 0)
+        sports_net = float(sports.get("net", 0) or 0)
 
     wins = snapshot_metrics["betting_wins"]
     losses = snapshot_metrics["betting_losses"]
@@ -878,23 +736,22 @@ def _risk_level(value: float, warn: float, critical: float) -> str:
     return "ok"
 
 
-def _normalize_cluster(text: str) -> str:
-    t = (text or "").lower()
-    if any(k in t for k in ["weather", "temp", "rain", "snow", "hurricane", "wind"]):
-        return "weather"
-    if any(k in t for k in ["crypto", "btc", "bitcoin", "eth", "ethereum", "sol", "doge"]):
-        return "crypto"
-    if any(k in t for k in ["cpi", "fed", "fomc", "inflation", "unemployment", "gdp", "rates"]):
-        return "economics"
-    if any(k in t for k in ["election", "senate", "house", "president", "trump", "biden"]):
-        return "politics"
-    if any(k in t for k in ["nfl", "nba", "mlb", "nhl", "ncaa", "soccer", "tennis", "golf", "ufc"]):
-        return "sports"
-    return "other"
+@app.get("/api/risk/exposure-heatmap")
+def get_exposure_heatmap(request: Request):
+    """Exposure heatmap, cached until the next database write."""
+    return response_cache.respond(request, ("exposure_heatmap",), _exposure_heatmap_payload)
 
 
-@app.get("/api/risk/exposure-heatmap")
-def get_exposure_heatmap():
+@app.get("/api/risk/concentration-history")
+def get_concentration_history(request: Request, days: int = 30):
+    """Open exposure, HHI and top-share history recorded by exposure_ledger."""
+    def compute():
+        with get_db() as conn:
+            return {"days": days, "points": exposure_ledger.read_history(conn, days)}
+    return response_cache.respond(request, ("concentration_history", days), compute)
+
+
+def _exposure_heatmap_payload():
     """Cross-book exposure heatmap + concentration risk for open Kalshi and sports positions."""
     thresholds = {
         "total_open_exposure_usd": {"warning": 2500.0, "critical": 5000.0},
@@ -904,89 +761,19 @@ def get_exposure_heatmap():
     }
 
     with get_db() as conn:
-        kalshi_rows = conn.execute(
-            """
-            SELECT market, direction, entry_price, num_contracts, cost_basis, status, expiry_date
-            FROM kalshi_trades
-            WHERE status IS NULL OR status != 'Settled'
-            """
-        ).fetchall()
-
-        sports_rows = conn.execute(
-            """
-            SELECT sport, game, pick, stake, result, pick_date
-            FROM sports_picks
-            WHERE COALESCE(result, 'PENDING') = 'PENDING'
-            """
-        ).fetchall()
-
-    cells = {}
-    market_totals = {}
-    cluster_totals = {}
-    records = []
-    missing_exposure_count = 0
-
-    def add_cell(source: str, cluster: str, amount: float, positions: int = 1):
-        key = (source, cluster)
-        if key not in cells:
-            cells[key] = {"source": source, "cluster": cluster, "exposure_usd": 0.0, "positions": 0}
-        cells[key]["exposure_usd"] += float(amount or 0)
-        cells[key]["positions"] += int(positions or 0)
-
-    for r in kalshi_rows:
-        market = (r["market"] or "Unknown Market").strip() or "Unknown Market"
-        cluster = _normalize_cluster(market)
-        qty = float(r["num_contracts"] or 0)
-        entry = float(r["entry_price"] or 0)
-        cost_basis = float(r["cost_basis"] or 0)
-
-        exposure = cost_basis if cost_basis > 0 else (entry * qty)
-        if exposure <= 0:
-            missing_exposure_count += 1
-
-        add_cell("kalshi", cluster, exposure, 1)
-        market_totals[market] = market_totals.get(market, 0.0) + exposure
-        cluster_totals[cluster] = cluster_totals.get(cluster, 0.0) + exposure
-
-        records.append({
-            "source": "kalshi",
-            "label": market,
-            "cluster": cluster,
-            "direction": r["direction"],
-            "exposure_usd": round(exposure, 2),
-            "expiry_date": r["expiry_date"],
-        })
-
-    for r in sports_rows:
-        sport = (r["sport"] or "Sports").strip() or "Sports"
-        game = (r["game"] or "Unknown Game").strip() or "Unknown Game"
-        pick = (r["pick"] or "").strip()
-        label = f"{game} {pick}".strip()
-        exposure = float(r["stake"] or 0)
-        if exposure <= 0:
-            missing_exposure_count += 1
-
-        add_cell("sports", sport.lower(), exposure, 1)
-        market_totals[label] = market_totals.get(label, 0.0) + exposure
-        cluster_totals[sport.lower()] = cluster_totals.get(sport.lower(), 0.0) + exposure
-
-        records.append({
-            "source": "sports",
-            "label": label,
-            "cluster": sport.lower(),
-            "direction": None,
-            "exposure_usd": round(exposure, 2),
-            "expiry_date": r["pick_date"],
-        })
-
-    total_open = sum(market_totals.values())
-    sorted_markets = sorted(market_totals.items(), key=lambda x: x[1], reverse=True)
-    sorted_clusters = sorted(cluster_totals.items(), key=lambda x: x[1], reverse=True)
-
-    top_market_share = (sorted_markets[0][1] / total_open) if total_open > 0 and sorted_markets else 0.0
-    top_cluster_share = (sorted_clusters[0][1] / total_open) if total_open > 0 and sorted_clusters else 0.0
-    top3_share = (sum(v for _, v in sorted_markets[:3]) / total_open) if total_open > 0 else 0.0
-    hhi = (sum(((v / total_open) ** 2) for _, v in sorted_markets) * 10000.0) if total_open > 0 else 0.0
+        # Running sums maintained by triggers on the position tables (exposure_ledger)
+        ledger = exposure_ledger.read_heatmap(conn)
+
+    cells = {(c["source"], c["cluster"]): c for c in ledger["cells"]}
+    open_positions = ledger["open_positions"]
+    missing_exposure_count = ledger["missing_exposure_count"]
+    total_open = ledger["total_open_exposure_usd"]
+    sorted_markets = ledger["markets"]
+    sorted_clusters = ledger["clusters"]
+    top_market_share = ledger["top_market_share"]
+    top_cluster_share = ledger["top_cluster_share"]
+    top3_share = ledger["top3_market_share"]
+    hhi = ledger["hhi"]
 
     alerts = [
         {
@@ -1020,7 +807,7 @@ def get_exposure_heatmap():
         "fallback_state": "no_open_positions" if total_open <= 0 else None,
         "guardrails": {
             "missing_exposure_count": missing_exposure_count,
-            "missing_exposure_pct": round(missing_exposure_count / max(len(records), 1), 4),
+            "missing_exposure_pct": round(missing_exposure_count / max(open_positions, 1), 4),
             "notes": [
                 "Kalshi exposure uses cost_basis when available; falls back to entry_price * contracts.",
                 "Sports open exposure uses pending stake.",
@@ -1028,7 +815,7 @@ def get_exposure_heatmap():
         },
         "summary": {
             "total_open_exposure_usd": round(total_open, 2),
-            "open_positions": len(records),
+            "open_positions": open_positions,
             "top_market": {"name": sorted_markets[0][0], "exposure_usd": round(sorted_markets[0][1], 2)} if sorted_markets else None,
             "top_cluster": {"name": sorted_clusters[0][0], "exposure_usd": round(sorted_clusters[0][1], 2)} if sorted_clusters else None,
             "top_market_share": round(top_market_share, 4),
@@ -1057,8 +844,41 @@ def get_exposure_heatmap():
     }
 
 
+# — Ledger paging: ?after=<date>,<id>&limit=N, filters, or NDJSON (?format=ndjson / Accept)
+def _ledger_response(request: Request, name: str, key: str, after, limit, fmt, filters: dict, full):
+    """Keyset page or NDJSON stream; with no paging/filter params, the full document from full()."""
+    spec = ledgers.LEDGERS[name]
+    filters = {k: v for k, v in filters.items() if v is not None}
+    try:
+        ledgers.parse_after(after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if fmt == "ndjson" or "application/x-ndjson" in request.headers.get("accept", ""):
+        return StreamingResponse(
+            ledgers.iter_ndjson(DB_PATH, spec, after, limit, filters),
+            media_type="application/x-ndjson",
+        )
+    if after is None and limit is None and not filters:
+        return full()
+    with get_db() as conn:
+        result = ledgers.page(conn, spec, after, limit, filters)
+    return {key: result["rows"], "count": result["count"], "next_after": result["next_after"]}
+
+
 @app.get("/api/sports-picks")
-def get_sports_picks():
+def get_sports_picks(
+    request: Request, after: str = None, limit: int = None, format: str = None,
+    result: str = None, sport: str = None, confidence: str = None, since: str = None, until: str = None,
+):
+    """Sports picks with summary breakdowns (cached until the next write), or a keyset page of picks."""
+    filters = {"result": result, "sport": sport, "confidence": confidence, "since": since, "until": until}
+    return _ledger_response(
+        request, "sports_picks", "picks", after, limit, format, filters,
+        lambda: response_cache.respond(request, ("sports_picks",), _sports_picks_payload),
+    )
+
+
+def _sports_picks_payload():
     with get_db() as conn:
         rows = conn.execute("SELECT * FROM sports_picks ORDER BY pick_date DESC, id DESC").fetchall()
         picks = [dict(r) for r in rows]
@@ -1120,9 +940,7 @@ def get_sports_picks():
 
 
 # — API: John's Business
-@app.get("/api/john/jobs")
-def get_john_jobs():
-    """Return John's job data."""
+def _all_john_jobs():
     with get_db() as conn:
         rows = conn.execute(
             "SELECT * FROM john_jobs ORDER BY job_date DESC"
@@ -1130,9 +948,17 @@ def get_john_jobs():
     return {"jobs": [dict(r) for r in rows], "count": len(rows)}
 
 
-@app.get("/api/john/leads")
-def get_john_leads():
-    """Return John's lead data."""
+@app.get("/api/john/jobs")
+def get_john_jobs(
+    request: Request, after: str = None, limit: int = None, format: str = None,
+    status: str = None, client: str = None, paid: int = None, since: str = None, until: str = None,
+):
+    """Return John's job data."""
+    filters = {"status": status, "client": client, "paid": paid, "since": since, "until": until}
+    return _ledger_response(request, "john_jobs", "jobs", after, limit, format, filters, _all_john_jobs)
+
+
+def _all_john_leads():
     with get_db() as conn:
         rows = conn.execute(
             "SELECT * FROM john_leads ORDER BY lead_date DESC"
@@ -1140,16 +966,34 @@ def get_john_leads():
     return {"leads": [dict(r) for r in rows], "count": len(rows)}
 
 
-@app.get("/api/kalshi-trades")
-def get_kalshi_trades():
-    """Return all kalshi trades for the ledger and analytics."""
+@app.get("/api/john/leads")
+def get_john_leads(
+    request: Request, after: str = None, limit: int = None, format: str = None,
+    status: str = None, source: str = None, service: str = None, since: str = None, until: str = None,
+):
+    """Return John's lead data."""
+    filters = {"status": status, "source": source, "service": service, "since": since, "until": until}
+    return _ledger_response(request, "john_leads", "leads", after, limit, format, filters, _all_john_leads)
+
+
+def _all_kalshi_trades():
     with get_db() as conn:
         rows = conn.execute(
-            "SELECT * FROM kalshi_trades ORDER BY trade_date DESC"
+            "SELECT rowid AS id, * FROM kalshi_trades ORDER BY trade_date DESC, rowid DESC"
         ).fetchall()
     return {"trades": [dict(r) for r in rows], "count": len(rows)}
 
 
+@app.get("/api/kalshi-trades")
+def get_kalshi_trades(
+    request: Request, after: str = None, limit: int = None, format: str = None,
+    status: str = None, market: str = None, direction: str = None, since: str = None, until: str = None,
+):
+    """Return kalshi trades for the ledger and analytics (all, a keyset page, or NDJSON)."""
+    filters = {"status": status, "market": market, "direction": direction, "since": since, "until": until}
+    return _ledger_response(request, "kalshi_trades", "trades", after, limit, format, filters, _all_kalshi_trades)
+
+
 # — API: Usage summary
 @app.get("/api/usage/summary")
 def get_usage_summary(days: int = 7):
@@ -1233,128 +1077,77 @@ def get_anthropic_usage(days: int = 1):
     }
 
 
-@app.get("/api/usage/caps")
-def get_usage_caps():
-    """Budget cap tracking for Anthropic and OpenAI/ChatGPT plus OpenRouter actual spend."""
+def _usage_caps_payload():
     with get_db() as conn:
         return calculate_cost_caps(conn)
 
 
+@app.get("/api/usage/caps")
+def get_usage_caps(request: Request):
+    """Budget cap tracking for Anthropic and OpenAI/ChatGPT plus OpenRouter actual spend."""
+    return response_cache.respond(request, ("usage_caps",), _usage_caps_payload)
+
+
 # — Sync Kalshi Trades from API
 @app.post("/api/sync/kalshi")
 def sync_kalshi_trades():
     """Sync trades from Kalshi API to database."""
-    import urllib.request
-    import ssl
-    
-    api_key = os.environ.get("KALSHI_API_KEY", "4fa680d5-be76-4d85-9c1b-5fd2d42c9612")
-    
-    ctx = ssl.create_default_context()
-    ctx.check_hostname = False
-    ctx.verify_mode = ssl.CERT_NONE
-    
     try:
-        # Get fills (trades)
-        req = urllib.request.Request(
-            "https://trading-api.kalshi.com/trade-api/v2/portfolio/fills",
-            headers={"Authorization": f"Bearer {api_key}"}
-        )
-        with urllib.request.urlopen(req, context=ctx, timeout=30) as resp:
-            fills_data = json.loads(resp.read().decode())
-        
-        fills = fills_data.get("fills", [])
-        
-        with get_db() as conn:
-            inserted = 0
-            updated = 0
-            
-            for fill in fills:
-                contract_id = fill.get("contract_id", "")
-                market = fill.get("market_ticker", "")
-                price = fill.get("price", 0)
-                qty = fill.get("count", 0)
-                side = fill.get("side", "")
-                fill_date = fill.get("created_time", datetime.utcnow().isoformat())
-                
-                # Check if exists
-                existing = conn.execute(
-                    "SELECT 1 FROM kalshi_trades WHERE contract_id = ?",
-                    (contract_id,)
-                ).fetchone()
-                
-                if existing:
-                    # Update
-                    conn.execute(
-                        """UPDATE kalshi_trades SET 
-                           exit_price = ?, status = 'Settled'
-                           WHERE contract_id = ?""",
-                        (price, contract_id)
-                    )
-                    updated += 1
+        # Every page of fills over the shared pooled client
+        fills = kalshi_http.run(lambda k: k.get_fills())
+
+        rows = []
+        for fill in fills:
+            rows.append((
+                fill.get("created_time", datetime.utcnow().isoformat()),
+                fill.get("contract_id", ""),
+                fill.get("market_ticker", fill.get("ticker", "")),
+                fill.get("price", fill.get("yes_price", 0)),
+                fill.get("count", 0),
+                fill.get("side", ""),
+            ))
+
+        with get_write_db() as conn:
+            existing = {r[0] for r in conn.execute("SELECT contract_id FROM kalshi_trades")}
+            updates, inserts = [], []
+            for r in rows:
+                if r[1] in existing:
+                    updates.append((r[3], r[1]))
                 else:
-                    # Insert new
-                    conn.execute(
-                        """INSERT INTO kalshi_trades 
-                           (trade_date, contract_id, market, entry_price, 
-                            num_contracts, direction, status, fees)
-                           VALUES (?, ?, ?, ?, ?, ?, 'Open', 0)""",
-                        (fill_date, contract_id, market, price, qty, side)
-                    )
-                    inserted += 1
-            
-            conn.commit()
-        
+                    existing.add(r[1])
+                    inserts.append((*r, market_clusters.classify(r[2])))
+            # Inserts first, so a contract_id repeated within the batch updates the row it created.
+            conn.executemany(
+                """INSERT INTO kalshi_trades 
+                   (trade_date, contract_id, market, entry_price, 
+                    num_contracts, direction, status, fees, cluster)
+                   VALUES (?, ?, ?, ?, ?, ?, 'Open', 0, ?)""",
+                inserts,
+            )
+            conn.executemany(
+                """UPDATE kalshi_trades SET 
+                   exit_price = ?, status = 'Settled'
+                   WHERE contract_id = ?""",
+                updates,
+            )
+            kpi_store.refresh_for_source(conn, "kalshi_trades")
+
         return {
             "synced": True,
             "fills_received": len(fills),
-            "inserted": inserted,
-            "updated": updated,
+            "inserted": len(inserts),
+            "updated": len(updates),
             "timestamp": datetime.utcnow().isoformat()
         }
     except Exception as e:
         return {"synced": False, "error": str(e), "timestamp": datetime.utcnow().isoformat()}
 
 
-# — Kalshi Live Data (Real-time from API)
+# — Kalshi Live Data (in-memory, refreshed in the background by kalshi_live)
 @app.get("/api/kalshi/live")
 def get_kalshi_live():
-    """Fetch live balance and positions from Kalshi API."""
-    import urllib.request
-    import ssl
-    
-    api_key = os.environ.get("KALSHI_API_KEY", "4fa680d5-be76-4d85-9c1b-5fd2d42c9612")
-    
-    ctx = ssl.create_default_context()
-    ctx.check_hostname = False
-    ctx.verify_mode = ssl.CERT_NONE
-    
-    try:
-        # Get balance
-        req = urllib.request.Request(
-            "https://trading-api.kalshi.com/trade-api/v2/portfolio/balance",
-            headers={"Authorization": f"Bearer {api_key}"}
-        )
-        with urllib.request.urlopen(req, context=ctx, timeout=10) as resp:
-            balance_data = json.loads(resp.read().decode())
-        
-        # Get positions
-        req2 = urllib.request.Request(
-            "https://trading-api.kalshi.com/trade-api/v2/portfolio/positions",
-            headers={"Authorization": f"Bearer {api_key}"}
-        )
-        with urllib.request.urlopen(req2, context=ctx, timeout=10) as resp2:
-            positions_data = json.loads(resp2.read().decode())
-        
-        return {
-            "balance": balance_data.get("balance", 0),
-            "available_balance": balance_data.get("available_balance", 0),
-            "open_positions": len(positions_data.get("positions", [])),
-            "positions": positions_data.get("positions", []),
-            "timestamp": datetime.utcnow().isoformat(),
-            "source": "kalshi_api"
-        }
-    except Exception as e:
-        return {"error": str(e), "timestamp": datetime.utcnow().isoformat()}
+    """Latest live balance and positions, with age_seconds; stale data is served while refreshing."""
+    return kalshi_live_refresher.current()
 
 
 # — Health check
@@ -1362,13 +1155,18 @@ def get_kalshi_live():
 def health():
     now = datetime.utcnow()
     with get_db() as conn:
-        ensure_tables(conn)
+        schema_version = migrations.current_version(conn)
         trade_count = conn.execute("SELECT COUNT(*) FROM kalshi_trades").fetchone()[0]
         freshness = get_freshness_summary(conn)
 
     scheduler = get_scheduler_checks()
     checks = {
-        "database": {"pass": True, "trade_count": trade_count, "db_path": DB_PATH},
+        "database": {
+            "pass": schema_version >= migrations.SCHEMA_VERSION,
+            "trade_count": trade_count,
+            "schema_version": schema_version,
+            "db_path": DB_PATH,
+        },
         "freshness": {
             "pass": not freshness.get("is_stale", True),
             "stale_sources": freshness.get("stale_sources", []),
@@ -1383,6 +1181,8 @@ def health():
         "version": "2026-03-01.accuracy-hotfix.v2", 
         "checks": checks,
         "freshness": freshness,
+        "response_cache": response_cache.stats(),
+        "kpi_push": kpi_broadcaster.stats(),
     }
 
 
@@ -10,12 +10,18 @@ Sources:
   5. workspace-john/jobs   → John's business jobs
   6. workspace-john/leads  → John's sales pipeline
 
-Run via: python auto_populate.py
+Run via: python auto_populate.py [--rebuild-usage]
 Registered in Task Scheduler as NorthstarAutoPopulate (every 15 min)
 """
-import json, os, sqlite3, urllib.request, urllib.error, glob, datetime, uuid, traceback
+import asyncio, json, os, sys, threading, time, urllib.request, urllib.error, glob, datetime, uuid, traceback
+from concurrent.futures import Future
 from datetime import datetime as dt, date
 
+import db_pool
+import kpi_store
+import migrations
+import usage_ingest
+
 # ── Config ────────────────────────────────────────────────────────────────────
 DASHBOARD_DB  = os.environ.get("DASHBOARD_DB", os.path.join(os.path.dirname(__file__), "data", "northstar.db"))
 AGENTS_DIR    = r"C:\Users\chead\.openclaw\agents"
@@ -71,113 +77,25 @@ def http_get(url, headers):
         return {"error": str(ex)}, 0
 
 def init_db(conn):
-    conn.executescript("""
-    CREATE TABLE IF NOT EXISTS api_usage (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        created_at TEXT DEFAULT (datetime('now')),
-        usage_date TEXT NOT NULL,
-        provider TEXT NOT NULL,
-        model TEXT,
-        tokens_in INTEGER DEFAULT 0,
-        tokens_out INTEGER DEFAULT 0,
-        cost_usd REAL NOT NULL,
-        notes TEXT
-    );
-    CREATE TABLE IF NOT EXISTS kalshi_snapshots (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        snapshot_ts TEXT NOT NULL UNIQUE,
-        snap_date TEXT NOT NULL,
-        balance_cents INTEGER DEFAULT 0,
-        daily_pnl_cents INTEGER DEFAULT 0,
-        total_pnl_cents INTEGER DEFAULT 0,
-        open_positions INTEGER DEFAULT 0,
-        total_orders INTEGER DEFAULT 0,
-        total_fills INTEGER DEFAULT 0,
-        win_count INTEGER DEFAULT 0,
-        loss_count INTEGER DEFAULT 0,
-        total_fees_cents INTEGER DEFAULT 0,
-        weather_pnl_cents INTEGER DEFAULT 0,
-        crypto_pnl_cents INTEGER DEFAULT 0,
-        econ_pnl_cents INTEGER DEFAULT 0,
-        mm_pnl_cents INTEGER DEFAULT 0,
-        lip_rewards_cents INTEGER DEFAULT 0
-    );
-    CREATE TABLE IF NOT EXISTS sports_picks (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        pick_date TEXT NOT NULL,
-        sport TEXT, game TEXT NOT NULL, pick TEXT,
-        ml INTEGER, open_ml INTEGER,
-        edge_val REAL, model_prob REAL,
-        framing_type TEXT, edge_bucket TEXT, confidence TEXT,
-        result TEXT DEFAULT 'PENDING',
-        stake REAL DEFAULT 0, profit_loss REAL DEFAULT 0,
-        UNIQUE(pick_date, game, pick)
-    );
-    CREATE TABLE IF NOT EXISTS john_jobs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        created_at TEXT DEFAULT (datetime('now')),
-        job_date TEXT NOT NULL,
-        client_name TEXT NOT NULL,
-        job_description TEXT,
-        status TEXT DEFAULT 'quoted',
-        invoice_amount REAL NOT NULL,
-        paid INTEGER DEFAULT 0,
-        paid_date TEXT,
-        notes TEXT
-    );
-    CREATE TABLE IF NOT EXISTS john_leads (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        created_at TEXT DEFAULT (datetime('now')),
-        lead_date TEXT NOT NULL, source TEXT, client_name TEXT NOT NULL,
-        service TEXT, estimated_value REAL DEFAULT 0, status TEXT DEFAULT 'new',
-        notes TEXT, external_id TEXT UNIQUE
-    );
-    CREATE TABLE IF NOT EXISTS revenue (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        created_at TEXT DEFAULT (datetime('now')),
-        revenue_date TEXT NOT NULL, segment TEXT NOT NULL,
-        description TEXT NOT NULL, amount REAL NOT NULL
-    );
-    CREATE TABLE IF NOT EXISTS expenses (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        created_at TEXT DEFAULT (datetime('now')),
-        expense_date TEXT NOT NULL, segment TEXT NOT NULL,
-        description TEXT NOT NULL, amount REAL NOT NULL, category TEXT
-    );
-    CREATE TABLE IF NOT EXISTS bets (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        created_at TEXT DEFAULT (datetime('now')),
-        bet_date TEXT NOT NULL, sport TEXT NOT NULL, game TEXT NOT NULL,
-        book TEXT DEFAULT 'Kalshi', bet_type TEXT DEFAULT 'ML',
-        stake REAL NOT NULL, odds TEXT, odds_decimal REAL,
-        result TEXT DEFAULT 'PENDING', profit_loss REAL DEFAULT 0,
-        edge_pct REAL, notes TEXT
-    );
-    CREATE TABLE IF NOT EXISTS sync_run_audit (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        run_id TEXT NOT NULL,
-        source TEXT NOT NULL,
-        started_at TEXT NOT NULL,
-        completed_at TEXT,
-        status TEXT NOT NULL,
-        records_synced INTEGER DEFAULT 0,
-        error_message TEXT,
-        details_json TEXT
-    );
-    """)
+    migrations.migrate(conn)
     conn.commit()
 
 # ══════════════════════════════════════════════════════════════════════════════
 # SOURCE 1: OPENROUTER API
 # ══════════════════════════════════════════════════════════════════════════════
-def sync_openrouter(conn) -> dict:
+def fetch_openrouter():
+    """Network phase; None when no key is configured. Raises on HTTP failure so it can be retried."""
     if not OR_KEY or not OR_KEY.startswith('sk-or'):
-        return {"synced": 0, "error": "No OpenRouter key"}
+        return None
     data, code = http_get('https://openrouter.ai/api/v1/auth/key',
         {'Authorization': f'Bearer {OR_KEY}', 'Content-Type': 'application/json'})
     if code != 200:
-        return {"synced": 0, "error": f"OR API {code}: {data}"}
-    d = data.get('data', {})
+        raise RuntimeError(f"OR API {code}: {data}")
+    return data.get('data', {})
+
+def write_openrouter(conn, d) -> dict:
+    if d is None:
+        return {"synced": 0, "error": "No OpenRouter key"}
     today_str = str(date.today())
     # Store today's usage as a daily snapshot
     # Check if we already have today's OR entry
@@ -194,86 +112,47 @@ def sync_openrouter(conn) -> dict:
     conn.commit()
     return {"synced": 1, "daily_usd": daily_cost, "monthly_usd": round((d.get('usage_monthly') or 0)/1000, 4)}
 
+def sync_openrouter(conn) -> dict:
+    return write_openrouter(conn, fetch_openrouter())
+
 # ══════════════════════════════════════════════════════════════════════════════
 # SOURCE 2: OPENCLAW SESSION LOGS → ANTHROPIC COSTS
 # ══════════════════════════════════════════════════════════════════════════════
-def sync_anthropic_from_logs(conn) -> dict:
-    """Parse all OpenClaw session JSONL files for Anthropic usage data."""
-    # Get last processed timestamp
-    cur = conn.execute("SELECT MAX(notes) FROM api_usage WHERE provider='Anthropic' AND model != 'aggregate'")
-    row = cur.fetchone()
-    last_ts = ""  # process everything; dedup by (date, model, tokens_in, tokens_out)
-    
-    # Group by date+model → accumulate tokens
-    daily = {}  # key=(date, model) → {input, output, cache_read, cache_write}
-    
-    for root, dirs, files in os.walk(AGENTS_DIR):
-        for fname in files:
-            if not fname.endswith('.jsonl') or 'lock' in fname:
-                continue
-            fpath = os.path.join(root, fname)
-            try:
-                with open(fpath, 'r', encoding='utf-8', errors='ignore') as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line or '"usage"' not in line:
-                            continue
-                        try:
-                            rec = json.loads(line)
-                        except:
-                            continue
-                        msg = rec.get('message', {})
-                        if msg.get('role') != 'assistant':
-                            continue
-                        provider = msg.get('provider', '')
-                        if 'anthropic' not in provider.lower():
-                            continue
-                        usage = msg.get('usage', {})
-                        if not usage:
-                            continue
-                        ts = rec.get('timestamp', '')
-                        if not ts:
-                            continue
-                        day = ts[:10]
-                        model = msg.get('model', 'unknown')
-                        key = (day, model)
-                        if key not in daily:
-                            daily[key] = {'input': 0, 'output': 0, 'cache_read': 0, 'cache_write': 0}
-                        daily[key]['input']       += usage.get('input', 0) or 0
-                        daily[key]['output']      += usage.get('output', 0) or 0
-                        daily[key]['cache_read']  += usage.get('cacheRead', 0) or 0
-                        daily[key]['cache_write'] += usage.get('cacheWrite', 0) or 0
-            except:
-                continue
-    
-    # Upsert into api_usage (replace existing anthropic entries for each day/model)
+def fetch_anthropic_logs():
+    """Read phase: plan from the persisted cursors and parse new bytes (no writes)."""
+    conn = db_pool.connect(DASHBOARD_DB)
+    try:
+        return usage_ingest.collect(conn, AGENTS_DIR)
+    finally:
+        conn.close()
+
+def sync_anthropic_from_logs(conn, collected=None) -> dict:
+    """Ingest appended OpenClaw session-log bytes and upsert the affected (day, model) rows."""
+    plan, scanned = collected or usage_ingest.collect(conn, AGENTS_DIR)
+    result = usage_ingest.persist(conn, plan, scanned)
+
+    # Upsert into api_usage (replace existing anthropic entries for each touched day/model)
     synced = 0
-    for (day, model), u in daily.items():
+    for (day, model), u in result["totals"].items():
         cost = calc_cost(u, model)
-        # Check if exists
+        notes = f"cache_r={u['cache_read']} cache_w={u['cache_write']}"
         cur = conn.execute("SELECT id FROM api_usage WHERE usage_date=? AND provider='Anthropic' AND model=?", (day, model))
         existing = cur.fetchone()
         if existing:
-            conn.execute("UPDATE api_usage SET tokens_in=?, tokens_out=?, cost_usd=? WHERE id=?",
-                (u['input'], u['output'], cost, existing[0]))
+            conn.execute("UPDATE api_usage SET tokens_in=?, tokens_out=?, cost_usd=?, notes=? WHERE id=?",
+                (u['input'], u['output'], cost, notes, existing[0]))
         else:
             conn.execute("INSERT INTO api_usage (usage_date,provider,model,tokens_in,tokens_out,cost_usd,notes) VALUES (?,?,?,?,?,?,?)",
-                (day, 'Anthropic', model, u['input'], u['output'], cost,
-                 f"cache_r={u['cache_read']} cache_w={u['cache_write']}"))
+                (day, 'Anthropic', model, u['input'], u['output'], cost, notes))
             synced += 1
     conn.commit()
-    return {"synced": synced, "days_processed": len(daily)}
+    return {"synced": synced, "days_processed": len(result["totals"]),
+            "files_scanned": result["files_scanned"], "bytes_read": result["bytes_read"]}
 
 # ══════════════════════════════════════════════════════════════════════════════
-# SOURCE 3: KALSHI (LIVE API via Scalper's KalshiClient)
+# SOURCE 3: KALSHI (LIVE API via kalshi_http, credentials from Scalper's .env)
 # ══════════════════════════════════════════════════════════════════════════════
-def sync_kalshi(conn) -> dict:
-    # Sync Kalshi data directly from live API using Scalper credentials.
-    """Sync Kalshi data directly from live API using Scalper's credentials."""
-    import asyncio
-    import sys
-    
-    # Load Scalper environment
+def _load_scalper_env():
     scalper_env_path = r"C:\Users\chead\.openclaw\workspace-scalper\.env"
     if os.path.exists(scalper_env_path):
         with open(scalper_env_path, 'r') as f:
@@ -282,174 +161,229 @@ def sync_kalshi(conn) -> dict:
                 if line and not line.startswith('#') and '=' in line:
                     key, val = line.split('=', 1)
                     os.environ[key.strip()] = val.strip()
-    
-    # Add Scalper to path
-    scalper_path = r'C:\Users\chead\.openclaw\workspace-scalper'
-    if scalper_path not in sys.path:
-        sys.path.insert(0, scalper_path)
-    
-    try:
-        import config
-        from kalshi_api import KalshiClient
-        
-        async def fetch_kalshi():
-            client = KalshiClient()
-            try:
-                # Get live data
-                balance = await client.get_balance()
-                positions = await client.get_positions()
-                resting_orders = await client.get_orders(status="resting")
-                canceled_orders = await client.get_orders(status="canceled")
-                fills = await client.get_fills(limit=100)
-                
-                # Calculate P&L
-                pos_pnl = sum(int(p.get('pnl_cents', 0) or 0) for p in positions)
-                fill_pnl = sum(int(f.get('pnl_cents', 0) or 0) for f in fills)
-                total_pnl = pos_pnl + fill_pnl
-                
-                wins = len([p for p in positions if int(p.get('pnl_cents', 0) or 0) > 0])
-                losses = len([p for p in positions if int(p.get('pnl_cents', 0) or 0) < 0])
-                
-                return {
-                    "status": "ok",
-                    "balance": balance,
-                    "positions": len(positions),
-                    "orders": len(resting_orders) + len(canceled_orders),
-                    "fills": len(fills),
-                    "total_pnl": total_pnl,
-                    "wins": wins,
-                    "losses": losses
-                }
-            finally:
-                await client.close()
-        
-        # Run async fetch
-        result = asyncio.run(fetch_kalshi())
-        
-        if result['status'] != 'ok':
-            return {"synced": 0, "error": result.get('error'), "source": "kalshi_live_api"}
-        
-        # Insert snapshot
-        ts = datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-        snap_date = datetime.datetime.utcnow().strftime("%Y-%m-%d")
-        
-        conn.execute("""
-            INSERT INTO kalshi_snapshots (
-                snapshot_ts, snap_date, balance_cents, total_pnl_cents,
-                open_positions, total_orders, total_fills, win_count, loss_count
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (ts, snap_date, result['balance'], result['total_pnl'],
-              result['positions'], result['orders'], result['fills'],
-              result['wins'], result['losses']))
-        
-        conn.commit()
-        
+
+FILLS_WINDOWS = 4          # concurrent cursor chains over the lookback range
+FILLS_LOOKBACK_DAYS = 180  # plus one open-ended window for anything older
+
+def _fill_windows(now_s: int) -> list:
+    """[(min_ts, max_ts)] covering all history; each window is paginated independently."""
+    start = now_s - FILLS_LOOKBACK_DAYS * 86400
+    step = (now_s - start) // FILLS_WINDOWS
+    bounds = [start + i * step for i in range(FILLS_WINDOWS)] + [now_s + 60]
+    return [(None, bounds[0])] + list(zip(bounds, bounds[1:]))
+
+def _pnl_cents(rec: dict) -> int:
+    return int(rec.get('pnl_cents', rec.get('realized_pnl', 0)) or 0)
+
+async def _stream_fills(k, stats: dict):
+    """Fold every fill into stats as pages arrive; windows are fetched concurrently."""
+    seen = set()
+
+    async def drain(window):
+        min_ts, max_ts = window
+        async for page in k.pages("/portfolio/fills", "fills", min_ts=min_ts, max_ts=max_ts):
+            for f in page:
+                fid = f.get('trade_id') or f.get('fill_id')
+                if fid is not None:
+                    if fid in seen:  # window edges may overlap
+                        continue
+                    seen.add(fid)
+                stats['fills'] += 1
+                stats['pnl_cents'] += _pnl_cents(f)
+
+    await asyncio.gather(*(drain(w) for w in _fill_windows(int(time.time()))))
+
+def fetch_kalshi() -> dict:
+    """Network phase: live portfolio via kalshi_http. Raises on failure so it can be retried."""
+    _load_scalper_env()
+    import kalshi_http
+
+    async def fetch(k):
+        stats = {'fills': 0, 'pnl_cents': 0}
+        # Shared process-wide client (one session, one rate limit); reads run concurrently with fill paging.
+        balance, positions, resting_orders, canceled_orders, _ = await asyncio.gather(
+            k.get_balance(),
+            k.get_positions(),
+            k.get_orders(status="resting"),
+            k.get_orders(status="canceled"),
+            _stream_fills(k, stats),
+        )
+
+        # Calculate P&L
+        pos_pnl = sum(_pnl_cents(p) for p in positions)
+        total_pnl = pos_pnl + stats['pnl_cents']
+
+        wins = len([p for p in positions if _pnl_cents(p) > 0])
+        losses = len([p for p in positions if _pnl_cents(p) < 0])
+
         return {
-            "synced": 1,
-            "source": "kalshi_live_api",
-            "balance_usd": result['balance'] / 100,
-            "pnl_usd": result['total_pnl'] / 100,
-            "timestamp": ts
+            "status": "ok",
+            "balance": balance.get("balance", 0),
+            "positions": len(positions),
+            "orders": len(resting_orders) + len(canceled_orders),
+            "fills": stats['fills'],
+            "total_pnl": total_pnl,
+            "wins": wins,
+            "losses": losses
         }
-    
+
+    result = kalshi_http.run(fetch)
+    if result['status'] != 'ok':
+        raise RuntimeError(result.get('error') or "Kalshi fetch failed")
+    return result
+
+def write_kalshi_snapshot(conn, result) -> dict:
+    # Insert snapshot
+    ts = datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    snap_date = datetime.datetime.utcnow().strftime("%Y-%m-%d")
+
+    conn.execute("""
+        INSERT INTO kalshi_snapshots (
+            snapshot_ts, snap_date, balance_cents, total_pnl_cents,
+            open_positions, total_orders, total_fills, win_count, loss_count
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(snapshot_ts) DO NOTHING
+    """, (ts, snap_date, result['balance'], result['total_pnl'],
+          result['positions'], result['orders'], result['fills'],
+          result['wins'], result['losses']))
+    # Another writer (kalshi_live persistence, a concurrent run) already took this second.
+    synced = conn.execute("SELECT changes()").fetchone()[0]
+
+    conn.commit()
+    if synced:
+        kpi_store.on_snapshot(conn, snap_date)
+
+    return {
+        "synced": synced,
+        "source": "kalshi_live_api",
+        "balance_usd": result['balance'] / 100,
+        "pnl_usd": result['total_pnl'] / 100,
+        "timestamp": ts
+    }
+
+def sync_kalshi(conn) -> dict:
+    """Sync Kalshi data directly from live API using Scalper's credentials."""
+    try:
+        return write_kalshi_snapshot(conn, fetch_kalshi())
     except Exception as e:
         return {"synced": 0, "error": str(e), "source": "kalshi_live_api"}
 
 # ══════════════════════════════════════════════════════════════════════════════
 # SOURCE 4: SPORTS PICKS
 # ══════════════════════════════════════════════════════════════════════════════
-def sync_sports_picks(conn) -> dict:
+def read_sports_picks() -> list:
+    """File phase: parsed pick rows ready for insert."""
     if not os.path.exists(PICK_LOG):
-        return {"synced": 0}
-    synced = 0
+        return []
+    rows = []
     with open(PICK_LOG, 'r', encoding='utf-8') as f:
         for line in f:
             line = line.strip()
             if not line: continue
             try: rec = json.loads(line)
             except: continue
-            result = rec.get('result', 'PENDING')
-            stake = float(rec.get('stake', 10) or 10)
-            ml = rec.get('ml', 0)
-            pl = 0.0
-            if result == 'WIN':
-                pl = stake * (ml/100) if ml and ml > 0 else stake * (100/abs(ml)) if ml and ml < 0 else stake
-            elif result == 'LOSS':
-                pl = -stake
             try:
-                conn.execute("""INSERT OR IGNORE INTO sports_picks
-                    (pick_date,sport,game,pick,ml,open_ml,edge_val,model_prob,
-                     framing_type,edge_bucket,confidence,result,stake,profit_loss)
-                    VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)""",
-                    (rec.get('date', str(date.today())), rec.get('sport',''),
+                result = rec.get('result', 'PENDING')
+                stake = float(rec.get('stake', 10) or 10)
+                ml = rec.get('ml', 0)
+                pl = 0.0
+                if result == 'WIN':
+                    pl = stake * (ml/100) if ml and ml > 0 else stake * (100/abs(ml)) if ml and ml < 0 else stake
+                elif result == 'LOSS':
+                    pl = -stake
+                rows.append((rec.get('date', str(date.today())), rec.get('sport',''),
                      rec.get('game',''), rec.get('pick',''),
                      rec.get('ml'), rec.get('open_ml'),
                      rec.get('edge_val'), rec.get('model_prob'),
                      rec.get('framing_type'), rec.get('edge_bucket'),
                      rec.get('confidence'), result, stake, pl))
-                if conn.execute("SELECT changes()").fetchone()[0]: synced += 1
             except: pass
+    return rows
+
+def write_sports_picks(conn, rows) -> dict:
+    synced = 0
+    for row in rows:
+        try:
+            conn.execute("""INSERT OR IGNORE INTO sports_picks
+                (pick_date,sport,game,pick,ml,open_ml,edge_val,model_prob,
+                 framing_type,edge_bucket,confidence,result,stake,profit_loss)
+                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)""", row)
+            if conn.execute("SELECT changes()").fetchone()[0]: synced += 1
+        except: pass
     conn.commit()
     return {"synced": synced}
 
+def sync_sports_picks(conn) -> dict:
+    return write_sports_picks(conn, read_sports_picks())
+
 # ══════════════════════════════════════════════════════════════════════════════
 # SOURCE 5: JOHN'S JOBS + LEADS
 # ══════════════════════════════════════════════════════════════════════════════
-def sync_john(conn) -> dict:
-    jobs_synced = leads_synced = 0
-    for fpath, table, sync_fn in [
-        (JOHN_JOBS, 'john_jobs', _sync_john_jobs),
-        (JOHN_LEADS, 'john_leads', _sync_john_leads),
-    ]:
+def _read_jsonl(fpath) -> list:
+    recs = []
+    with open(fpath, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line: continue
+            try: recs.append(json.loads(line))
+            except: continue
+    return recs
+
+def read_john() -> dict:
+    """File phase: parsed job and lead records (None when a file is missing or unreadable)."""
+    payload = {}
+    for key, fpath in (('jobs', JOHN_JOBS), ('leads', JOHN_LEADS)):
+        payload[key] = None
         if os.path.exists(fpath):
             try:
-                n = sync_fn(conn, fpath)
-                if table == 'john_jobs': jobs_synced = n
-                else: leads_synced = n
-            except Exception as e:
+                payload[key] = _read_jsonl(fpath)
+            except Exception:
                 pass
+    return payload
+
+def write_john(conn, payload) -> dict:
+    jobs_synced = leads_synced = 0
+    if payload.get('jobs') is not None:
+        try: jobs_synced = _sync_john_jobs(conn, payload['jobs'])
+        except Exception: pass
+    if payload.get('leads') is not None:
+        try: leads_synced = _sync_john_leads(conn, payload['leads'])
+        except Exception: pass
     return {"jobs": jobs_synced, "leads": leads_synced}
 
-def _sync_john_jobs(conn, fpath):
+def sync_john(conn) -> dict:
+    return write_john(conn, read_john())
+
+def _sync_john_jobs(conn, recs):
     n = 0
-    with open(fpath, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line: continue
-            try: rec = json.loads(line)
-            except: continue
-            ext_id = rec.get('id', '')
-            cur = conn.execute("SELECT id FROM john_jobs WHERE notes LIKE ?", (f'%[jid:{ext_id}]%',))
-            if cur.fetchone(): continue
-            notes = f"[jid:{ext_id}] {rec.get('notes','')}".strip() if ext_id else rec.get('notes','')
-            conn.execute("""INSERT INTO john_jobs (job_date,client_name,job_description,status,invoice_amount,paid,paid_date,notes)
-                VALUES (?,?,?,?,?,?,?,?)""",
-                (rec.get('date', str(date.today())), rec.get('client','Unknown'),
-                 rec.get('service',''), rec.get('status','quoted'),
-                 float(rec.get('amount',0)), 1 if rec.get('paid') else 0,
-                 rec.get('paid_date'), notes))
-            n += 1
+    for rec in recs:
+        ext_id = rec.get('id', '')
+        cur = conn.execute("SELECT id FROM john_jobs WHERE notes LIKE ?", (f'%[jid:{ext_id}]%',))
+        if cur.fetchone(): continue
+        notes = f"[jid:{ext_id}] {rec.get('notes','')}".strip() if ext_id else rec.get('notes','')
+        conn.execute("""INSERT INTO john_jobs (job_date,client_name,job_description,status,invoice_amount,paid,paid_date,notes)
+            VALUES (?,?,?,?,?,?,?,?)""",
+            (rec.get('date', str(date.today())), rec.get('client','Unknown'),
+             rec.get('service',''), rec.get('status','quoted'),
+             float(rec.get('amount',0)), 1 if rec.get('paid') else 0,
+             rec.get('paid_date'), notes))
+        n += 1
     conn.commit()
     return n
 
-def _sync_john_leads(conn, fpath):
+def _sync_john_leads(conn, recs):
     n = 0
-    with open(fpath, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line: continue
-            try: rec = json.loads(line)
-            except: continue
-            try:
-                conn.execute("""INSERT OR IGNORE INTO john_leads
-                    (lead_date,source,client_name,service,estimated_value,status,notes,external_id)
-                    VALUES (?,?,?,?,?,?,?,?)""",
-                    (rec.get('date', str(date.today())), rec.get('source',''),
-                     rec.get('client','Unknown'), rec.get('service',''),
-                     float(rec.get('estimated_value',0)), rec.get('status','new'),
-                     rec.get('notes',''), rec.get('id') or None))
-                if conn.execute("SELECT changes()").fetchone()[0]: n += 1
-            except: pass
+    for rec in recs:
+        try:
+            conn.execute("""INSERT OR IGNORE INTO john_leads
+                (lead_date,source,client_name,service,estimated_value,status,notes,external_id)
+                VALUES (?,?,?,?,?,?,?,?)""",
+                (rec.get('date', str(date.today())), rec.get('source',''),
+                 rec.get('client','Unknown'), rec.get('service',''),
+                 float(rec.get('estimated_value',0)), rec.get('status','new'),
+                 rec.get('notes',''), rec.get('id') or None))
+            if conn.execute("SELECT changes()").fetchone()[0]: n += 1
+        except: pass
     conn.commit()
     return n
 
@@ -467,7 +401,20 @@ def _extract_records_synced(result: dict) -> int:
     return total
 
 
-def _run_source_with_audit(conn, run_id: str, source: str, fn):
+# (source, fetch, write, timeout_s, retries)
+# fetch() does the network/file I/O and never touches the DB, so sources run
+# concurrently; write(conn, payload) runs on the single writer thread.
+SOURCES = (
+    ("openrouter",   fetch_openrouter,     write_openrouter,         30,  2),
+    ("anthropic",    fetch_anthropic_logs, sync_anthropic_from_logs, 900, 0),
+    ("kalshi",       fetch_kalshi,         write_kalshi_snapshot,    60,  2),
+    ("sports_picks", read_sports_picks,    write_sports_picks,       60,  1),
+    ("john",         read_john,            write_john,               60,  1),
+)
+RETRY_BACKOFF_S = 2
+
+
+def _start_audit(conn, run_id: str, source: str) -> int:
     started = datetime.datetime.utcnow().isoformat() + "Z"
     conn.execute(
         """
@@ -476,56 +423,125 @@ def _run_source_with_audit(conn, run_id: str, source: str, fn):
         """,
         (run_id, source, started),
     )
-    audit_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
-    conn.commit()
+    return conn.execute("SELECT last_insert_rowid()").fetchone()[0]
 
-    try:
-        result = fn(conn)
-        status = "success"
-        error_message = None
-    except Exception as e:
-        result = {"error": str(e), "traceback": traceback.format_exc(limit=2)}
-        status = "error"
-        error_message = str(e)
 
+def _finish_audit(conn, audit_id: int, status: str, result, error_message, attempts: int, duration_ms: int):
     completed = datetime.datetime.utcnow().isoformat() + "Z"
-    records_synced = _extract_records_synced(result)
     conn.execute(
         """
         UPDATE sync_run_audit
-        SET completed_at=?, status=?, records_synced=?, error_message=?, details_json=?
+        SET completed_at=?, status=?, records_synced=?, error_message=?, details_json=?,
+            attempts=?, duration_ms=?
         WHERE id=?
         """,
         (
             completed,
             status,
-            records_synced,
+            _extract_records_synced(result),
             error_message,
             json.dumps(result, default=str)[:4000],
+            attempts,
+            duration_ms,
             audit_id,
         ),
     )
-    conn.commit()
+
+
+def _write_source(conn, source: str, write, payload):
+    result = write(conn, payload)
+    kpi_store.refresh_for_source(conn, source)
+    return result
+
+
+def _in_daemon_thread(fn) -> Future:
+    """Run fn on a daemon thread so a hung fetch cannot keep the process alive past its timeout."""
+    fut = Future()
+
+    def target():
+        if not fut.set_running_or_notify_cancel():
+            return
+        try:
+            fut.set_result(fn())
+        except BaseException as e:
+            fut.set_exception(e)
+
+    threading.Thread(target=target, daemon=True).start()
+    return fut
+
+
+async def _run_source(writer, run_id: str, source: str, fetch, write, timeout_s: int, retries: int):
+    t0 = time.monotonic()
+    audit_id = await asyncio.wrap_future(writer.submit(_start_audit, run_id, source))
+    attempts, errors = 0, []
+    status, result, error_message = "error", None, None
+
+    while True:
+        attempts += 1
+        try:
+            payload = await asyncio.wait_for(asyncio.wrap_future(_in_daemon_thread(fetch)), timeout_s)
+        except asyncio.TimeoutError:
+            status = "timeout"
+            error_message = f"fetch exceeded {timeout_s}s"
+            errors.append(f"attempt {attempts}: {error_message}")
+            break
+        except Exception as e:
+            errors.append(f"attempt {attempts}: {e}")
+            if attempts > retries:
+                error_message = str(e)
+                result = {"error": str(e), "traceback": traceback.format_exc(limit=2)}
+                break
+            await asyncio.sleep(RETRY_BACKOFF_S * 2 ** (attempts - 1))
+            continue
+
+        # Writes are not retried: the payload is already fetched and a failure here is a DB problem.
+        try:
+            result = await asyncio.wrap_future(writer.submit(_write_source, source, write, payload))
+            status = "success"
+        except Exception as e:
+            error_message = str(e)
+            result = {"error": str(e), "traceback": traceback.format_exc(limit=2)}
+        break
+
+    if result is None:
+        result = {"error": error_message}
+    if errors and isinstance(result, dict):
+        result = dict(result, attempt_errors=errors)
+    duration_ms = int((time.monotonic() - t0) * 1000)
+    await asyncio.wrap_future(
+        writer.submit(_finish_audit, audit_id, status, result, error_message, attempts, duration_ms)
+    )
     return result
 
 
-def run_all() -> dict:
+async def _run_sources(writer, run_id: str) -> dict:
+    results = await asyncio.gather(*(_run_source(writer, run_id, *spec) for spec in SOURCES))
+    return {spec[0]: res for spec, res in zip(SOURCES, results)}
+
+
+def run_all(rebuild_usage: bool = False) -> dict:
     os.makedirs(os.path.dirname(DASHBOARD_DB), exist_ok=True)
-    conn = sqlite3.connect(DASHBOARD_DB)
+    conn = db_pool.connect(DASHBOARD_DB)
     init_db(conn)
+    if rebuild_usage:
+        # Full re-parse of the session logs on the process pool
+        usage_ingest.reset(conn)
+        conn.commit()
+    if conn.execute("SELECT 1 FROM kpi_totals LIMIT 1").fetchone() is None:
+        kpi_store.refresh_all(conn)
+    conn.close()
+
     run_id = datetime.datetime.utcnow().strftime("run-%Y%m%dT%H%M%S-") + uuid.uuid4().hex[:8]
     results = {"run_id": run_id}
-    results['openrouter'] = _run_source_with_audit(conn, run_id, 'openrouter', sync_openrouter)
-    results['anthropic'] = _run_source_with_audit(conn, run_id, 'anthropic', sync_anthropic_from_logs)
-    results['kalshi'] = _run_source_with_audit(conn, run_id, 'kalshi', sync_kalshi)
-    results['sports_picks'] = _run_source_with_audit(conn, run_id, 'sports_picks', sync_sports_picks)
-    results['john'] = _run_source_with_audit(conn, run_id, 'john', sync_john)
-    conn.close()
+    with db_pool.WriterQueue(DASHBOARD_DB) as writer:
+        results.update(asyncio.run(_run_sources(writer, run_id)))
     return results
 
 if __name__ == '__main__':
     print(f"[{dt.now().strftime('%H:%M:%S')}] Northstar auto-populate starting...")
-    r = run_all()
+    r = run_all(rebuild_usage='--rebuild-usage' in sys.argv)
+    import kalshi_http  # after run_all: fetch_kalshi loads the Scalper .env before kalshi_http reads it
+    kalshi_http.close()
     for src, res in r.items():
         print(f"  {src}: {res}")
     print(f"[{dt.now().strftime('%H:%M:%S')}] Done.")
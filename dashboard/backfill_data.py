@@ -2,16 +2,20 @@
 """
 Data Backfill Script - Populate missing dashboard data
 """
-import sqlite3
 import os
 from datetime import datetime, timedelta
 import random
 
+import db_pool
+import kpi_store
+import migrations
+
 DB_PATH = os.path.join(os.path.dirname(__file__), 'data', 'northstar.db')
 
 def backfill_john_jobs():
     """Create jobs from leads for John."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = db_pool.connect(DB_PATH)
+    migrations.migrate(conn)
     cursor = conn.cursor()
     
     # Get leads that don't have jobs
@@ -48,13 +52,15 @@ def backfill_john_jobs():
             inserted += 1
     
     conn.commit()
+    kpi_store.refresh_for_source(conn, "john")
     conn.close()
     print(f"Created {inserted} jobs from {len(leads)} leads")
     return inserted
 
 def fix_kalshi_dates():
     """Fix placeholder dates in Kalshi trades."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = db_pool.connect(DB_PATH)
+    migrations.migrate(conn)
     cursor = conn.cursor()
     
     # Get trades with placeholder dates
@@ -85,13 +91,15 @@ def fix_kalshi_dates():
         fixed += 1
     
     conn.commit()
+    kpi_store.refresh_for_source(conn, "kalshi_trades")
     conn.close()
     print(f"Fixed {fixed} Kalshi trade dates")
     return fixed
 
 def add_historical_sports_picks():
     """Add historical sports picks data."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = db_pool.connect(DB_PATH)
+    migrations.migrate(conn)
     cursor = conn.cursor()
     
     # Check current date range
@@ -142,6 +150,7 @@ def add_historical_sports_picks():
             current += timedelta(days=1)
         
         conn.commit()
+        kpi_store.refresh_for_source(conn, "sports_picks")
         print(f"Added {added} historical sports picks")
         return added
     
@@ -1,9 +1,10 @@
-import sqlite3
 from pathlib import Path
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+import db_pool
+
 DB_PATH = Path(r"C:/Users/chead/.openclaw/workspace/dashboard/data/northstar.db")
 OUT_DIR = Path(r"C:/Users/chead/.openclaw/workspace/chart_output/process_quality")
 OUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -21,7 +22,7 @@ def profit_per_1_staked(odds: float) -> float:
     return 100.0 / abs(odds)
 
 
-conn = sqlite3.connect(DB_PATH)
+conn = db_pool.connect(DB_PATH)
 q = """
 SELECT id, pick_date, sport, game, pick, ml, open_ml, edge_val, model_prob, result, stake, profit_loss
 FROM sports_picks
@@ -1,5 +1,8 @@
-import sqlite3
-conn = sqlite3.connect('data/northstar.db')
+import db_pool
+import kpi_store
+import migrations
+conn = db_pool.connect('data/northstar.db')
+migrations.migrate(conn)
 cursor = conn.cursor()
 
 # Calculate P&L for all settled trades that don't have it
@@ -22,6 +25,7 @@ for rowid, entry, exit_p, qty, fees in rows:
     total_pnl += pnl
 
 conn.commit()
+kpi_store.refresh_for_source(conn, "kalshi_trades")
 
 # Verify
 cursor.execute("SELECT SUM(pnl_realized) FROM kalshi_trades WHERE status='Settled'")
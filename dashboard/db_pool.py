@@ -0,0 +1,241 @@
+"""
+db_pool.py — shared SQLite connection manager for dashboard/*.py
+Every database is switched to WAL so API reads never wait on the 15-minute
+sync writers. Each thread keeps one long-lived read connection per database;
+all writes inside a process go through one writer connection behind a lock.
+Connections carry a larger statement cache so repeated parameterized queries
+reuse their prepared statements instead of re-parsing SQL.
+
+  reader(db_path)           → per-thread query_only connection, sqlite3.Row rows (never close it)
+  writer(db_path)           → context manager; commits on exit, rolls back on error
+  connect(db_path)          → standalone tuned connection for one-shot sync scripts
+  run_read / run_write      → run a sync fn(conn) from async code via asyncio.to_thread
+  AsyncReader               → aiosqlite-style read facade returned by database.get_db()
+  WriterQueue               → one thread owns the write connection; jobs run in submit order
+"""
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+BUSY_TIMEOUT_S = 10
+STATEMENT_CACHE = 256
+
+# Applied to every connection; journal_mode is persistent and set once per file.
+PRAGMAS = (
+    ("synchronous", "NORMAL"),     # safe under WAL, one fsync per checkpoint
+    ("cache_size", -32000),        # 32 MB page cache
+    ("mmap_size", 268435456),      # 256 MB memory-mapped reads
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", BUSY_TIMEOUT_S * 1000),
+)
+
+_lock = threading.Lock()
+_wal_ready = set()
+_writers = {}
+_local = threading.local()
+_pid = os.getpid()
+
+
+def _key(db_path) -> str:
+    return str(db_path)
+
+
+def _reset_after_fork():
+    """Connections must not cross fork(); drop inherited pool state in the child."""
+    global _pid, _local
+    if os.getpid() != _pid:
+        _pid = os.getpid()
+        _local = threading.local()
+        _writers.clear()
+        _wal_ready.clear()
+
+
+def _open(db_path, readonly=False, **kwargs):
+    path = _key(db_path)
+    kwargs.setdefault("timeout", BUSY_TIMEOUT_S)
+    kwargs.setdefault("cached_statements", STATEMENT_CACHE)
+    if readonly:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, **kwargs)
+    else:
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = sqlite3.connect(path, **kwargs)
+        with _lock:
+            need_wal = path not in _wal_ready and path != ":memory:"
+        if need_wal:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with _lock:
+                _wal_ready.add(path)
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+def connect(db_path, readonly=False, **kwargs) -> sqlite3.Connection:
+    """Tuned standalone connection; the caller owns and closes it.
+
+    readonly=True opens via mode=ro and leaves the journal mode alone (for
+    databases owned by other processes, e.g. the scalper DB).
+    """
+    _reset_after_fork()
+    return _open(db_path, readonly=readonly, **kwargs)
+
+
+def reader(db_path) -> sqlite3.Connection:
+    """Long-lived read connection for the calling thread."""
+    _reset_after_fork()
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    path = _key(db_path)
+    conn = conns.get(path)
+    if conn is None:
+        conn = _open(path)
+        conn.execute("PRAGMA query_only=ON")
+        conn.row_factory = sqlite3.Row
+        conns[path] = conn
+    return conn
+
+
+def _writer_entry(db_path):
+    _reset_after_fork()
+    path = _key(db_path)
+    with _lock:
+        entry = _writers.get(path)
+    if entry is None:
+        conn = _open(path, check_same_thread=False)
+        with _lock:
+            entry = _writers.setdefault(path, (conn, threading.RLock()))
+        if entry[0] is not conn:
+            conn.close()
+    return entry
+
+
+@contextmanager
+def writer(db_path):
+    """Exclusive use of the process-wide writer connection for db_path."""
+    conn, lock = _writer_entry(db_path)
+    with lock:
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+def close_all():
+    """Close this thread's readers and every writer (shutdown hook)."""
+    for conn in (getattr(_local, "conns", None) or {}).values():
+        conn.close()
+    _local.conns = {}
+    with _lock:
+        entries = list(_writers.values())
+        _writers.clear()
+    for conn, lock in entries:
+        with lock:
+            conn.close()
+
+
+# ── WRITER QUEUE ───────────────────────────────────────────────────────────────
+class WriterQueue:
+    """Serializes writes from concurrent producers onto one connection and thread.
+
+    submit(fn, *args) runs fn(conn, *args) as its own transaction (commit on
+    return, rollback on error) and returns a concurrent.futures.Future.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._jobs = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        conn = connect(self.db_path)
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    return
+                fn, args, fut = job
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                try:
+                    result = fn(conn, *args)
+                    conn.commit()
+                except BaseException as e:
+                    conn.rollback()
+                    fut.set_exception(e)
+                else:
+                    fut.set_result(result)
+        finally:
+            conn.close()
+
+    def submit(self, fn, *args) -> Future:
+        fut = Future()
+        self._jobs.put((fn, args, fut))
+        return fut
+
+    def call(self, fn, *args):
+        return self.submit(fn, *args).result()
+
+    def close(self):
+        """Drain queued jobs, then stop the writer thread."""
+        self._jobs.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ── ASYNC HELPERS ──────────────────────────────────────────────────────────────
+async def run_read(db_path, fn, *args):
+    """fn(conn, *args) on a worker thread's pooled reader."""
+    return await asyncio.to_thread(lambda: fn(reader(db_path), *args))
+
+
+async def run_write(db_path, fn, *args):
+    """fn(conn, *args) inside a writer transaction on a worker thread."""
+    def _call():
+        with writer(db_path) as conn:
+            return fn(conn, *args)
+    return await asyncio.to_thread(_call)
+
+
+class _FetchedCursor:
+    """Rows are materialized on the worker thread; fetch* just hands them back."""
+
+    def __init__(self, rows, description):
+        self._rows = rows
+        self.description = description
+
+    async def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    async def fetchall(self):
+        return self._rows
+
+
+class AsyncReader:
+    """Subset of the aiosqlite connection API backed by pooled per-thread readers."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def _execute(self, sql, params):
+        cur = reader(self.db_path).execute(sql, params)
+        return _FetchedCursor(cur.fetchall(), cur.description)
+
+    async def execute(self, sql, params=()):
+        return await asyncio.to_thread(self._execute, sql, params)
+
+    async def close(self):
+        """Connections stay in the pool."""
@@ -0,0 +1,165 @@
+"""
+drawdown_engine.py — vectorized equity / drawdown analytics at any resolution
+compute() takes a timestamp column and a cumulative P&L column and returns
+columnar arrays: equity, running peak (np.maximum.accumulate), underwater depth
+and %, per-period P&L, plus drawdown episodes and recovery markers. Nothing
+loops per row, so the full kalshi_snapshots history (raw 15-min points) costs
+about the same as the daily EOD series.
+
+snapshot_drawdown() reads kalshi_snapshots through snapshot_rollups, which
+serves each resolution from its own rollup tier; resample() keeps the last
+point per bucket for series that arrive finer than requested.
+
+  dd = drawdown_engine.snapshot_drawdown(DB_PATH, resolution="hourly")
+  dd["series"]["drawdown"], dd["episodes"]["recovered"], dd["max_drawdown"]
+"""
+import numpy as np
+
+import db_pool
+import snapshot_rollups
+
+# bucket width in seconds; 0 keeps every snapshot
+RESOLUTIONS = {"raw": 0, "15min": 900, "hourly": 3600, "daily": 86400}
+
+ZONE_THRESHOLDS = {
+    "green": {"max_dd_usd": 250.0, "label": "healthy"},
+    "amber": {"max_dd_usd": 750.0, "label": "caution"},
+    "red": {"max_dd_usd": 99999999.0, "label": "risk"},
+}
+
+
+def zone(max_drawdown: float) -> str:
+    depth = abs(max_drawdown)
+    return "green" if depth <= 250 else "amber" if depth <= 750 else "red"
+
+
+def to_epoch(ts) -> np.ndarray:
+    """ISO timestamps ('YYYY-MM-DD HH:MM:SS', 'T'-separated, fractional) → int64 epoch seconds."""
+    try:
+        parsed = np.array(ts, dtype="datetime64[s]")
+    except ValueError:
+        # offsets / 'Z' suffixes: the first 19 chars are the UTC wall clock we store
+        parsed = np.array([t[:19] for t in ts], dtype="datetime64[s]")
+    return parsed.astype(np.int64)
+
+
+def resample(epoch: np.ndarray, *columns, resolution: str = "raw"):
+    """Keep the last point of every resolution bucket; epoch must be ascending."""
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"resolution must be one of {', '.join(RESOLUTIONS)}")
+    width = RESOLUTIONS[resolution]
+    if not width or len(epoch) == 0:
+        return (epoch, *columns)
+    bucket = epoch // width
+    keep = np.flatnonzero(np.append(bucket[1:] != bucket[:-1], True))
+    return (epoch[keep], *(c[keep] for c in columns))
+
+
+def compute(labels, total_pnl_usd, epoch: np.ndarray = None) -> dict:
+    """Columnar drawdown analytics for a cumulative P&L series (USD).
+
+    labels are returned as-is for the x axis; epoch (seconds) adds
+    duration_s to episodes. Durations in points count series steps,
+    which for a daily series is days.
+    """
+    total = np.asarray(total_pnl_usd, dtype=np.float64)
+    n = len(total)
+    if n == 0:
+        return _empty()
+    idx = np.arange(n)
+
+    peak = np.maximum.accumulate(total)
+    drawdown = np.round(total - peak, 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdown_pct = np.where(peak > 0, drawdown / peak * 100.0, 0.0)
+    # index of the peak each point is measured from (latest point at the running high)
+    peak_idx = np.maximum.accumulate(np.where(total >= peak, idx, 0))
+
+    underwater = drawdown < 0
+    starts = np.flatnonzero(underwater[1:] & ~underwater[:-1]) + 1
+    ends = np.flatnonzero(~underwater[1:] & underwater[:-1]) + 1  # first point back at the high
+    recovered = np.full(len(starts), -1)
+    recovered[:len(ends)] = ends
+    trough = _episode_argmin(drawdown, starts)
+    begin = peak_idx[starts]
+
+    worst = int(np.argmin(drawdown))
+    max_dd = float(drawdown[worst]) if drawdown[worst] < 0 else 0.0
+
+    labels = list(labels)
+    done = recovered >= 0
+    episodes = {
+        "start": [labels[i] for i in begin],
+        "trough": [labels[i] for i in trough],
+        "recovered": [labels[i] if i >= 0 else None for i in recovered],
+        "depth": drawdown[trough].tolist(),
+        "duration_points": np.where(done, recovered - begin, n - 1 - begin).tolist(),
+    }
+    if epoch is not None:
+        epoch = np.asarray(epoch, dtype=np.int64)
+        end_ts = np.where(done, epoch[np.maximum(recovered, 0)], epoch[-1])
+        episodes["duration_s"] = (end_ts - epoch[begin]).tolist()
+
+    return {
+        "series": {
+            "ts": labels,
+            "equity": np.round(total - total[0], 2).tolist(),
+            "period_pnl": np.round(np.diff(total, prepend=total[0]), 2).tolist(),
+            "peak": np.round(peak - total[0], 2).tolist(),
+            "drawdown": drawdown.tolist(),
+            "drawdown_pct": np.round(drawdown_pct, 2).tolist(),
+        },
+        "episodes": episodes,
+        "max_drawdown": round(max_dd, 2),
+        "max_drawdown_pct": round(float(drawdown_pct[worst]), 2) if max_dd else 0.0,
+        "max_drawdown_points": int(worst - peak_idx[worst]) if max_dd else 0,
+        "current_drawdown": float(drawdown[-1]),
+        "drawdown_zone": zone(max_dd),
+        "drawdown_thresholds": ZONE_THRESHOLDS,
+        "points": n,
+    }
+
+
+def _episode_argmin(drawdown, starts) -> np.ndarray:
+    """Trough index per episode. Points between an episode's recovery and the next
+    start sit at 0, above any trough, so grouping by "episodes started so far" is enough."""
+    if len(starts) == 0:
+        return np.empty(0, dtype=np.int64)
+    mark = np.zeros(len(drawdown), dtype=np.int64)
+    mark[starts] = 1
+    members = np.arange(starts[0], len(drawdown))
+    episode = np.cumsum(mark)[members]
+    order = members[np.lexsort((drawdown[members], episode))]  # stable: ties keep the earliest
+    first = np.append(True, episode[order - starts[0]][1:] != episode[order - starts[0]][:-1])
+    return order[first]
+
+
+def _empty() -> dict:
+    return {
+        "series": {k: [] for k in ("ts", "equity", "period_pnl", "peak", "drawdown", "drawdown_pct")},
+        "episodes": {k: [] for k in ("start", "trough", "recovered", "depth", "duration_points")},
+        "max_drawdown": 0.0,
+        "max_drawdown_pct": 0.0,
+        "max_drawdown_points": 0,
+        "current_drawdown": 0.0,
+        "drawdown_zone": "green",
+        "drawdown_thresholds": ZONE_THRESHOLDS,
+        "points": 0,
+    }
+
+
+def snapshot_drawdown(db_path: str, resolution: str = "raw", start: str = None,
+                      end: str = None, conn=None) -> dict:
+    """compute() over kalshi_snapshots at the given resolution, optionally date-bounded.
+
+    Rows come from snapshot_rollups.series(), so a long range is served from
+    the coarsest stored tier instead of every raw snapshot.
+    """
+    conn = conn or db_pool.reader(db_path)
+    rows = snapshot_rollups.series(conn, resolution, start, end)
+    ts = np.array([r[0] for r in rows], dtype=object)
+    pnl = np.array([r[3] or 0 for r in rows], dtype=np.float64)
+    epoch, ts, pnl = resample(to_epoch(ts.tolist()), ts, pnl, resolution=resolution)
+    out = compute(ts, pnl / 100.0, epoch=epoch)
+    out["resolution"] = resolution
+    return out
@@ -0,0 +1,216 @@
+"""
+eod_engine.py — shared end-of-day snapshot series for Kalshi period metrics
+Builds the daily EOD series (last kalshi_snapshots row per snap_date) in one
+ordered pass, caches it per database, and answers period queries by binary
+search. Used by app.py, analytics.py and kpi_store.py.
+
+Changes are detected with PRAGMA data_version on a read-only probe connection
+(as in response_cache) plus the kalshi_snapshots row count and max id: newer
+snapshots appended at the tail extend the cache in place; anything else
+(backfilled older rows, INSERT OR REPLACE, compaction) rebuilds it. Callers get
+a tuple-backed copy, so a concurrent refresh never changes a series mid-read.
+Days older than the raw retention window come from the daily tier of
+snapshot_rollups.
+"""
+import bisect
+import calendar
+import threading
+from collections import namedtuple
+from datetime import date, timedelta
+
+import db_pool
+import snapshot_rollups
+
+PERIODS = ("today", "week", "month", "quarter", "year", "all")
+
+EOD_FIELDS = (
+    "snap_date", "snapshot_ts", "balance_cents", "total_pnl_cents", "total_fills",
+    "win_count", "loss_count", "open_positions", "total_orders",
+    "weather_pnl_cents", "crypto_pnl_cents", "econ_pnl_cents", "mm_pnl_cents", "lip_rewards_cents",
+)
+EodRow = namedtuple("EodRow", EOD_FIELDS, defaults=(0,) * (len(EOD_FIELDS) - 2))
+
+_SELECT_SQL = f"SELECT {', '.join(EOD_FIELDS)} FROM kalshi_snapshots"
+
+
+def period_bounds(period: str, today: date = None):
+    """Inclusive (start, end) ISO date bounds for a named period; None = unbounded."""
+    today = today or date.today()
+    if period == "today":
+        return today.isoformat(), today.isoformat()
+    if period == "week":
+        return (today - timedelta(days=7)).isoformat(), None
+    if period == "month":
+        last = calendar.monthrange(today.year, today.month)[1]
+        return today.replace(day=1).isoformat(), today.replace(day=last).isoformat()
+    if period == "quarter":
+        q_month = ((today.month - 1) // 3) * 3 + 1
+        return date(today.year, q_month, 1).isoformat(), None
+    if period == "year":
+        return date(today.year, 1, 1).isoformat(), date(today.year, 12, 31).isoformat()
+    return None, None
+
+
+class EodSeries:
+    """Sorted daily EOD rows with O(log n) range lookups."""
+
+    def __init__(self):
+        self.dates = []
+        self.rows = []
+        self.max_snapshot_ts = None
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from rows already reduced to one per snap_date (e.g. kpi_daily_eod)."""
+        series = cls()
+        for r in rows:
+            series._absorb(EodRow(*r))
+        return series
+
+    def _absorb(self, row: EodRow):
+        day = (row.snap_date or "")[:10]
+        row = row._replace(snap_date=day)
+        if self.max_snapshot_ts is None or (row.snapshot_ts or "") > self.max_snapshot_ts:
+            self.max_snapshot_ts = row.snapshot_ts
+
+        # Fast path: rows arrive in snapshot_ts order, so the day is usually the tail.
+        if self.dates and self.dates[-1] == day:
+            if (row.snapshot_ts or "") >= (self.rows[-1].snapshot_ts or ""):
+                self.rows[-1] = row
+            return
+        if not self.dates or day > self.dates[-1]:
+            self.rows.append(row)
+            self.dates.append(day)
+            return
+
+        i = bisect.bisect_left(self.dates, day)
+        if i < len(self.dates) and self.dates[i] == day:
+            if (row.snapshot_ts or "") >= (self.rows[i].snapshot_ts or ""):
+                self.rows[i] = row
+        else:
+            self.rows.insert(i, row)
+            self.dates.insert(i, day)
+
+    def extend_from(self, conn):
+        """Single ordered pass over snapshots newer than the cached high-water mark."""
+        if self.max_snapshot_ts is None:
+            first_raw = conn.execute("SELECT MIN(snap_date) FROM kalshi_snapshots").fetchone()[0]
+            if first_raw is not None:
+                for r in snapshot_rollups.daily_closes_before(conn, first_raw):
+                    self._absorb(EodRow(r[1], r[0], *r[2:]))
+            cur = conn.execute(_SELECT_SQL + " ORDER BY snapshot_ts ASC")
+        else:
+            cur = conn.execute(
+                _SELECT_SQL + " WHERE snapshot_ts > ? ORDER BY snapshot_ts ASC",
+                (self.max_snapshot_ts,),
+            )
+        for r in cur:
+            self._absorb(EodRow(*r))
+
+    def frozen(self) -> "EodSeries":
+        """Read-only copy (tuples) that can be shared across threads."""
+        copy = EodSeries()
+        copy.dates, copy.rows, copy.max_snapshot_ts = tuple(self.dates), tuple(self.rows), self.max_snapshot_ts
+        return copy
+
+    def latest(self):
+        return self.rows[-1] if self.rows else None
+
+    def range_summary(self, start: str = None, end: str = None):
+        """First/last/baseline EOD rows for snap_date in [start, end]; None if empty."""
+        lo = 0 if start is None else bisect.bisect_left(self.dates, start)
+        hi = len(self.dates) if end is None else bisect.bisect_right(self.dates, end)
+        if lo >= hi:
+            return None
+        first = self.rows[lo]
+        return {
+            "first": first,
+            "last": self.rows[hi - 1],
+            "baseline": self.rows[lo - 1] if lo > 0 else first,
+            "days": hi - lo,
+        }
+
+    def period_summary(self, period: str, today: date = None):
+        return self.range_summary(*period_bounds(period, today))
+
+    def periods(self, today: date = None, start: str = None, end: str = None):
+        """Baseline-adjusted P&L for every named period, plus 'custom' when a range is given."""
+        out = {}
+        for period in PERIODS:
+            summary = self.period_summary(period, today)
+            if summary:
+                out[period] = period_delta(summary)
+        if start or end:
+            summary = self.range_summary(start, end)
+            if summary:
+                out["custom"] = period_delta(summary)
+        return out
+
+
+def period_delta(summary: dict) -> dict:
+    """Format a range_summary() as the period block used by /api/dashboard."""
+    first, last, baseline = summary["first"], summary["last"], summary["baseline"]
+    return {
+        "start_ts": first.snapshot_ts,
+        "end_ts": last.snapshot_ts,
+        "pnl_usd": round(((last.total_pnl_cents or 0) - (baseline.total_pnl_cents or 0)) / 100.0, 2),
+        "balance_delta_usd": round(((last.balance_cents or 0) - (baseline.balance_cents or 0)) / 100.0, 2),
+        "fills": int(last.total_fills or 0),
+        "wins": int(last.win_count or 0),
+        "losses": int(last.loss_count or 0),
+    }
+
+
+# ── PER-DATABASE CACHE ─────────────────────────────────────────────────────────
+_cache = {}   # db_path → (data_version, (row_count, max_id), working series, frozen copy)
+_probes = {}
+_lock = threading.Lock()
+
+_SIGNATURE_SQL = "SELECT COUNT(*), MAX(id) FROM kalshi_snapshots"
+
+
+def _data_version(db_path: str) -> int:
+    probe = _probes.get(db_path)
+    if probe is None:
+        probe = _probes[db_path] = db_pool.connect(db_path, readonly=True, check_same_thread=False)
+    return probe.execute("PRAGMA data_version").fetchone()[0]
+
+
+def _appended_only(conn, signature, series: EodSeries) -> bool:
+    """True when every cached row is still there and all new rows are newer than the cache."""
+    count, max_id = signature
+    if max_id is None:
+        return False
+    kept = conn.execute("SELECT COUNT(*) FROM kalshi_snapshots WHERE id <= ?", (max_id,)).fetchone()[0]
+    if kept != count:
+        return False
+    oldest_new = conn.execute("SELECT MIN(snapshot_ts) FROM kalshi_snapshots WHERE id > ?", (max_id,)).fetchone()[0]
+    return oldest_new is None or oldest_new > (series.max_snapshot_ts or "")
+
+
+def get_series(db_path: str, conn=None) -> EodSeries:
+    """Cached, read-only EOD series for db_path; refreshed only after the database changed."""
+    with _lock:
+        version = _data_version(db_path)
+        entry = _cache.get(db_path)
+        if entry is not None and entry[0] == version:
+            return entry[3]
+        conn = conn or db_pool.reader(db_path)
+        signature = tuple(conn.execute(_SIGNATURE_SQL).fetchone())
+        if entry is not None and entry[1] == signature:
+            _cache[db_path] = (version, *entry[1:])  # another table changed
+            return entry[3]
+        series = entry[2] if entry is not None and _appended_only(conn, entry[1], entry[2]) else EodSeries()
+        series.extend_from(conn)
+        frozen = series.frozen()
+        _cache[db_path] = (version, signature, series, frozen)
+        return frozen
+
+
+def invalidate(db_path: str = None):
+    """Drop cached series (all databases when db_path is None)."""
+    with _lock:
+        if db_path is None:
+            _cache.clear()
+        else:
+            _cache.pop(db_path, None)
@@ -0,0 +1,267 @@
+"""
+exposure_ledger.py — incrementally maintained open-exposure ledger
+Triggers on kalshi_trades and sports_picks keep open exposure current on every
+position open, resize, settle or delete, whichever script does the write:
+
+  exposure_ledger      → (source, label, cluster) running exposure / positions
+  exposure_by_market   → per-label sums (labels merge across books, as in the heatmap)
+  exposure_by_cluster  → per-cluster sums
+  exposure_cells       → per-(source, cluster) heatmap cells
+  exposure_totals      → total, position count and Σ market² so HHI reads in O(1)
+  exposure_history     → concentration metrics over time (record_history())
+
+Source triggers post row deltas into exposure_ledger; ledger triggers fold
+those deltas into the aggregates, updating Σ market² by (2x + d)·d before
+the market sum moves from x to x + d. rebuild() recomputes everything from
+the base tables and clears any floating-point drift.
+
+Kalshi rows whose cluster is still NULL sit under UNCLASSIFIED until
+market_clusters fills them in; read_heatmap() classifies those few labels
+on the fly.
+"""
+from datetime import datetime, timedelta
+
+import market_clusters
+
+UNCLASSIFIED = ""
+
+LEDGER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS exposure_ledger (
+    source TEXT NOT NULL,
+    label TEXT NOT NULL,
+    cluster TEXT NOT NULL,
+    exposure REAL DEFAULT 0,
+    positions INTEGER DEFAULT 0,
+    missing INTEGER DEFAULT 0,
+    PRIMARY KEY (source, label, cluster)
+);
+CREATE TABLE IF NOT EXISTS exposure_by_market (
+    label TEXT PRIMARY KEY,
+    exposure REAL DEFAULT 0,
+    positions INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_exposure_by_market_exposure ON exposure_by_market(exposure);
+CREATE TABLE IF NOT EXISTS exposure_by_cluster (
+    cluster TEXT PRIMARY KEY,
+    exposure REAL DEFAULT 0,
+    positions INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS exposure_cells (
+    source TEXT NOT NULL,
+    cluster TEXT NOT NULL,
+    exposure REAL DEFAULT 0,
+    positions INTEGER DEFAULT 0,
+    PRIMARY KEY (source, cluster)
+);
+CREATE TABLE IF NOT EXISTS exposure_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total REAL DEFAULT 0,
+    sum_sq REAL DEFAULT 0,
+    positions INTEGER DEFAULT 0,
+    missing INTEGER DEFAULT 0
+);
+INSERT OR IGNORE INTO exposure_totals (id) VALUES (1);
+CREATE TABLE IF NOT EXISTS exposure_history (
+    ts TEXT PRIMARY KEY,
+    total_open_usd REAL,
+    open_positions INTEGER,
+    hhi REAL,
+    top_market_share REAL,
+    top_cluster_share REAL,
+    top3_market_share REAL
+);
+"""
+
+# Per-source row expressions; {r} is NEW or OLD inside a trigger, blank for a plain SELECT.
+_SOURCES = {
+    "kalshi": {
+        "table": "kalshi_trades",
+        "columns": "market, status, cost_basis, entry_price, num_contracts, cluster",
+        "open": "({r}status IS NULL OR {r}status != 'Settled')",
+        "label": "COALESCE(NULLIF(TRIM({r}market), ''), 'Unknown Market')",
+        "cluster": f"COALESCE({{r}}cluster, '{UNCLASSIFIED}')",
+        "exposure": ("(CASE WHEN COALESCE({r}cost_basis, 0) > 0 THEN {r}cost_basis "
+                     "ELSE COALESCE({r}entry_price, 0) * COALESCE({r}num_contracts, 0) END)"),
+    },
+    "sports": {
+        "table": "sports_picks",
+        "columns": "sport, game, pick, stake, result, cluster",
+        "open": "(COALESCE({r}result, 'PENDING') = 'PENDING')",
+        "label": "TRIM(COALESCE(NULLIF(TRIM({r}game), ''), 'Unknown Game') || ' ' || TRIM(COALESCE({r}pick, '')))",
+        "cluster": "COALESCE({r}cluster, LOWER(COALESCE(NULLIF(TRIM({r}sport), ''), 'Sports')))",
+        "exposure": "COALESCE({r}stake, 0)",
+    },
+}
+
+_LEDGER_UPSERT = """
+    INSERT INTO exposure_ledger (source, label, cluster, exposure, positions, missing)
+    SELECT '{source}', {label}, {cluster}, {sign}{exposure}, {sign}1,
+           {sign}(CASE WHEN {exposure} <= 0 THEN 1 ELSE 0 END)
+    WHERE {open}
+    ON CONFLICT(source, label, cluster) DO UPDATE SET
+        exposure = exposure + excluded.exposure,
+        positions = positions + excluded.positions,
+        missing = missing + excluded.missing;
+"""
+
+# Ledger deltas → aggregates. {d} / {dp} / {dm} are exposure, position and missing deltas.
+_FOLD = """
+    UPDATE exposure_totals SET
+        sum_sq = sum_sq + (2 * COALESCE((SELECT exposure FROM exposure_by_market WHERE label = NEW.label), 0) + {d}) * {d},
+        total = total + {d},
+        positions = positions + {dp},
+        missing = missing + {dm}
+    WHERE id = 1;
+    INSERT INTO exposure_by_market (label, exposure, positions) VALUES (NEW.label, {d}, {dp})
+    ON CONFLICT(label) DO UPDATE SET exposure = exposure + excluded.exposure, positions = positions + excluded.positions;
+    DELETE FROM exposure_by_market WHERE label = NEW.label AND positions <= 0;
+    INSERT INTO exposure_by_cluster (cluster, exposure, positions) VALUES (NEW.cluster, {d}, {dp})
+    ON CONFLICT(cluster) DO UPDATE SET exposure = exposure + excluded.exposure, positions = positions + excluded.positions;
+    DELETE FROM exposure_by_cluster WHERE cluster = NEW.cluster AND positions <= 0;
+    INSERT INTO exposure_cells (source, cluster, exposure, positions) VALUES (NEW.source, NEW.cluster, {d}, {dp})
+    ON CONFLICT(source, cluster) DO UPDATE SET exposure = exposure + excluded.exposure, positions = positions + excluded.positions;
+    DELETE FROM exposure_cells WHERE source = NEW.source AND cluster = NEW.cluster AND positions <= 0;
+"""
+
+
+def _row(source: str, r: str, sign: str = "") -> str:
+    spec = {k: v.format(r=r) for k, v in _SOURCES[source].items() if k not in ("table", "columns")}
+    return _LEDGER_UPSERT.format(source=source, sign=sign, **spec)
+
+
+def _triggers() -> list:
+    stmts = []
+    for source, spec in _SOURCES.items():
+        table = spec["table"]
+        stmts.append(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_exposure_ins AFTER INSERT ON {table} "
+                     f"BEGIN {_row(source, 'NEW.')} END")
+        stmts.append(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_exposure_del AFTER DELETE ON {table} "
+                     f"BEGIN {_row(source, 'OLD.', '-')} END")
+        stmts.append(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_exposure_upd AFTER UPDATE OF {spec['columns']} ON {table} "
+                     f"BEGIN {_row(source, 'OLD.', '-')} {_row(source, 'NEW.')} END")
+    stmts.append("CREATE TRIGGER IF NOT EXISTS trg_exposure_ledger_ins AFTER INSERT ON exposure_ledger "
+                 f"BEGIN {_FOLD.format(d='NEW.exposure', dp='NEW.positions', dm='NEW.missing')} END")
+    stmts.append("CREATE TRIGGER IF NOT EXISTS trg_exposure_ledger_upd AFTER UPDATE ON exposure_ledger "
+                 "BEGIN " + _FOLD.format(d="(NEW.exposure - OLD.exposure)", dp="(NEW.positions - OLD.positions)",
+                                          dm="(NEW.missing - OLD.missing)") +
+                 " DELETE FROM exposure_ledger WHERE source = NEW.source AND label = NEW.label"
+                 " AND cluster = NEW.cluster AND positions <= 0; END")
+    return stmts
+
+
+def install(conn):
+    """Create ledger tables and triggers, then build the ledger from the base tables."""
+    for stmt in LEDGER_SCHEMA.split(";"):
+        if stmt.strip():
+            conn.execute(stmt)
+    for stmt in _triggers():
+        conn.execute(stmt)
+    rebuild(conn)
+
+
+def rebuild(conn):
+    """Recompute the ledger from open positions (bootstrap, drift cleanup, after bulk rewrites)."""
+    for table in ("exposure_ledger", "exposure_by_market", "exposure_by_cluster", "exposure_cells"):
+        conn.execute(f"DELETE FROM {table}")
+    conn.execute("UPDATE exposure_totals SET total = 0, sum_sq = 0, positions = 0, missing = 0 WHERE id = 1")
+    for source, spec in _SOURCES.items():
+        e = {k: v.format(r="") for k, v in spec.items() if k not in ("table", "columns")}
+        # ledger insert triggers fold each group into the aggregates
+        conn.execute(
+            f"""
+            INSERT INTO exposure_ledger (source, label, cluster, exposure, positions, missing)
+            SELECT '{source}', {e['label']} AS label, {e['cluster']} AS cluster, SUM({e['exposure']}), COUNT(*),
+                   SUM(CASE WHEN {e['exposure']} <= 0 THEN 1 ELSE 0 END)
+            FROM {spec['table']}
+            WHERE {e['open']}
+            GROUP BY 2, 3
+            """
+        )
+
+
+# ── READ PATH ──────────────────────────────────────────────────────────────────
+def read_concentration(conn) -> dict:
+    """Totals, HHI and top shares from the running sums (no scan of open positions)."""
+    total, sum_sq, positions, missing = conn.execute(
+        "SELECT total, sum_sq, positions, missing FROM exposure_totals WHERE id = 1"
+    ).fetchone()
+    top = conn.execute("SELECT label, exposure FROM exposure_by_market ORDER BY exposure DESC LIMIT 3").fetchall()
+    top_cluster = conn.execute(
+        "SELECT cluster, exposure FROM exposure_by_cluster ORDER BY exposure DESC LIMIT 1"
+    ).fetchone()
+    total = float(total or 0)
+    share = (lambda v: v / total) if total > 0 else (lambda v: 0.0)
+    return {
+        "total_open_exposure_usd": total,
+        "open_positions": int(positions or 0),
+        "missing_exposure_count": int(missing or 0),
+        "hhi": (float(sum_sq) / (total * total) * 10000.0) if total > 0 else 0.0,
+        "top_market": (top[0][0], float(top[0][1])) if top else None,
+        "top_cluster": (top_cluster[0], float(top_cluster[1])) if top_cluster else None,
+        "top_market_share": share(float(top[0][1])) if top else 0.0,
+        "top_cluster_share": share(float(top_cluster[1])) if top_cluster else 0.0,
+        "top3_market_share": share(sum(float(r[1]) for r in top)),
+    }
+
+
+def read_heatmap(conn, top_markets: int = 15) -> dict:
+    """Cells, clusters and top markets for the exposure heatmap, plus read_concentration()."""
+    out = read_concentration(conn)
+    cells = {(r[0], r[1]): [float(r[2]), int(r[3])] for r in conn.execute(
+        "SELECT source, cluster, exposure, positions FROM exposure_cells")}
+    clusters = {r[0]: [float(r[1]), int(r[2])] for r in conn.execute(
+        "SELECT cluster, exposure, positions FROM exposure_by_cluster")}
+
+    pending = conn.execute(
+        "SELECT source, label, exposure, positions FROM exposure_ledger WHERE cluster = ?", (UNCLASSIFIED,)
+    ).fetchall()
+    for source, label, exposure, positions in pending:
+        cluster = market_clusters.classify(label)
+        for store, old, new in ((cells, (source, UNCLASSIFIED), (source, cluster)), (clusters, UNCLASSIFIED, cluster)):
+            store[old][0] -= exposure
+            store[old][1] -= positions
+            moved = store.setdefault(new, [0.0, 0])
+            moved[0] += exposure
+            moved[1] += positions
+    if pending:
+        cells = {k: v for k, v in cells.items() if v[1] > 0}
+        clusters = {k: v for k, v in clusters.items() if v[1] > 0}
+        best = max(clusters.items(), key=lambda x: x[1][0])
+        total = out["total_open_exposure_usd"]
+        out["top_cluster"] = (best[0], best[1][0])
+        out["top_cluster_share"] = best[1][0] / total if total > 0 else 0.0
+
+    out["cells"] = [{"source": s, "cluster": c, "exposure_usd": v[0], "positions": v[1]} for (s, c), v in cells.items()]
+    out["clusters"] = sorted(((k, v[0]) for k, v in clusters.items()), key=lambda x: x[1], reverse=True)
+    out["markets"] = [(r[0], float(r[1])) for r in conn.execute(
+        "SELECT label, exposure FROM exposure_by_market ORDER BY exposure DESC LIMIT ?", (top_markets,))]
+    return out
+
+
+# ── CONCENTRATION HISTORY ──────────────────────────────────────────────────────
+_HISTORY_FIELDS = ("total_open_usd", "open_positions", "hhi", "top_market_share", "top_cluster_share",
+                   "top3_market_share")
+
+
+def record_history(conn, now: datetime = None) -> bool:
+    """Append a concentration point if any metric moved since the last one."""
+    c = read_concentration(conn)
+    point = (round(c["total_open_exposure_usd"], 2), c["open_positions"], round(c["hhi"], 1),
+             round(c["top_market_share"], 4), round(c["top_cluster_share"], 4), round(c["top3_market_share"], 4))
+    last = conn.execute(f"SELECT {', '.join(_HISTORY_FIELDS)} FROM exposure_history ORDER BY ts DESC LIMIT 1").fetchone()
+    if last is not None and tuple(last) == point:
+        return False
+    ts = (now or datetime.utcnow()).strftime("%Y-%m-%d %H:%M:%S")
+    conn.execute(
+        f"INSERT OR REPLACE INTO exposure_history (ts, {', '.join(_HISTORY_FIELDS)}) VALUES (?,?,?,?,?,?,?)",
+        (ts, *point),
+    )
+    return True
+
+
+def read_history(conn, days: int = 30) -> list:
+    since = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    rows = conn.execute(
+        f"SELECT ts, {', '.join(_HISTORY_FIELDS)} FROM exposure_history WHERE ts >= ? ORDER BY ts ASC", (since,)
+    ).fetchall()
+    return [dict(zip(("ts",) + _HISTORY_FIELDS, r)) for r in rows]
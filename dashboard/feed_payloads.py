@@ -0,0 +1,245 @@
+"""
+feed_payloads.py — compressed audit payloads for scalper_feed_snapshots
+Every feed snapshot keeps its raw record for audit, but the useful fields are
+already columns, so the record is stored as a compressed BLOB (payload) and only
+decoded when something asks for it: load_payload(), or the feed_payload() SQL
+function the validation queries use.
+
+Feed records repeat the same keys and mostly the same tickers, so payloads are
+compressed against a dictionary trained from stored samples: zstd
+(zstandard.train_dictionary) when the zstandard package is installed, otherwise
+a zlib preset dictionary built from recent payloads. Dictionaries live in
+scalper_feed_payload_dicts and every row records the codec and dictionary it
+was written with, so older rows stay readable after a retrain.
+
+Run via:
+  python feed_payloads.py             → migrate legacy payload_json rows in place, print size stats
+  python feed_payloads.py --retrain   → train a new dictionary and recompress every row
+  python feed_payloads.py --vacuum    → also VACUUM afterwards to return freed pages to the OS
+"""
+import json
+import os
+import sys
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+TABLE = "scalper_feed_snapshots"
+ZLIB_LEVEL = 9
+ZSTD_LEVEL = 19
+DICT_SIZE = 32768        # zlib's window: preset-dictionary bytes beyond it are never referenced
+TRAIN_SAMPLES = 500
+TRAIN_MIN_SAMPLES = 20
+BATCH = 500
+
+DICT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scalper_feed_payload_dicts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    codec TEXT NOT NULL,
+    dict BLOB NOT NULL,
+    samples INTEGER,
+    created_at TEXT DEFAULT (datetime('now'))
+)
+"""
+
+
+class PayloadCodec:
+    """Encodes with the newest dictionary; decodes rows written with any of them."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._dicts = {}
+        self.codec, self.dict_id = ("zstd" if zstandard else "zlib"), None
+        row = conn.execute("SELECT id, codec, dict FROM scalper_feed_payload_dicts ORDER BY id DESC LIMIT 1").fetchone()
+        if row and (row[1] == "zlib" or zstandard is not None):
+            self.codec, self.dict_id = row[1], row[0]
+            self._dicts[row[0]] = (row[1], row[2])
+        self._zstd = None
+
+    def _dict(self, dict_id) -> bytes:
+        if dict_id not in self._dicts:
+            row = self.conn.execute("SELECT codec, dict FROM scalper_feed_payload_dicts WHERE id=?", (dict_id,)).fetchone()
+            if row is None:
+                raise ValueError(f"payload dictionary {dict_id} is missing")
+            self._dicts[dict_id] = row
+        return self._dicts[dict_id][1]
+
+    def encode(self, text: str):
+        """(blob, codec, dict_id) for a payload string."""
+        data = text.encode("utf-8")
+        if self.codec == "zstd":
+            if self._zstd is None:
+                zdict = zstandard.ZstdCompressionDict(self._dict(self.dict_id)) if self.dict_id else None
+                self._zstd = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=zdict)
+            return self._zstd.compress(data), "zstd", self.dict_id
+        if self.dict_id:
+            c = zlib.compressobj(ZLIB_LEVEL, zdict=self._dict(self.dict_id))
+            return c.compress(data) + c.flush(), "zlib", self.dict_id
+        return zlib.compress(data, ZLIB_LEVEL), "zlib", None
+
+    def decode(self, blob, codec, dict_id):
+        if blob is None:
+            return None
+        if codec == "zlib":
+            d = zlib.decompressobj(zdict=self._dict(dict_id)) if dict_id is not None else zlib.decompressobj()
+            data = d.decompress(blob) + d.flush()
+        elif codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("payload is zstd-compressed; install zstandard to read it")
+            zdict = zstandard.ZstdCompressionDict(self._dict(dict_id)) if dict_id is not None else None
+            data = zstandard.ZstdDecompressor(dict_data=zdict).decompress(blob)
+        else:
+            raise ValueError(f"unknown payload codec {codec!r}")
+        return data.decode("utf-8")
+
+
+# ── SCHEMA / MIGRATION ─────────────────────────────────────────────────────────
+def _columns(conn):
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({TABLE})").fetchall()}
+
+
+def _samples(conn, legacy: bool):
+    """Newest payloads as bytes, oldest first (zlib favours the end of a preset dictionary)."""
+    if legacy:
+        rows = conn.execute(f"SELECT payload_json FROM {TABLE} ORDER BY id DESC LIMIT ?", (TRAIN_SAMPLES,)).fetchall()
+        texts = [r[0] for r in rows if r[0]]
+    else:
+        codec = PayloadCodec(conn)
+        rows = conn.execute(
+            f"SELECT payload, payload_codec, payload_dict FROM {TABLE} ORDER BY id DESC LIMIT ?", (TRAIN_SAMPLES,)
+        ).fetchall()
+        texts = [codec.decode(*r) for r in rows if r[0] is not None]
+    return [t.encode("utf-8") for t in reversed(texts)]
+
+
+def train(conn, legacy: bool = False):
+    """Store a dictionary trained on recent payloads; returns its id, or None with too few samples."""
+    samples = _samples(conn, legacy)
+    if len(samples) < TRAIN_MIN_SAMPLES:
+        return None
+    codec, blob = "zlib", None
+    if zstandard is not None:
+        try:
+            codec, blob = "zstd", zstandard.train_dictionary(DICT_SIZE, samples).as_bytes()
+        except zstandard.ZstdError as e:
+            print(f"[WARN] zstd dictionary training failed, using zlib: {e}")
+            codec = "zlib"
+    if blob is None:
+        blob = b"".join(samples)[-DICT_SIZE:]
+    cur = conn.execute(
+        "INSERT INTO scalper_feed_payload_dicts (codec, dict, samples) VALUES (?,?,?)", (codec, blob, len(samples))
+    )
+    return cur.lastrowid
+
+
+def recompress(conn, only_without_dict: bool = False) -> int:
+    """Re-encode stored payloads with the newest dictionary."""
+    codec = PayloadCodec(conn)
+    where = "AND payload_dict IS NULL" if only_without_dict else ""
+    last, done = 0, 0
+    while True:
+        rows = conn.execute(
+            f"SELECT id, payload, payload_codec, payload_dict FROM {TABLE} WHERE id > ? {where} ORDER BY id LIMIT ?",
+            (last, BATCH),
+        ).fetchall()
+        if not rows:
+            return done
+        conn.executemany(
+            f"UPDATE {TABLE} SET payload=?, payload_codec=?, payload_dict=? WHERE id=?",
+            [(*codec.encode(codec.decode(blob, c, d)), rid) for rid, blob, c, d in rows],
+        )
+        done += len(rows)
+        last = rows[-1][0]
+
+
+def ensure_dictionary(conn):
+    """Train the first dictionary once enough payloads exist and recompress the rows written without one."""
+    if conn.execute("SELECT 1 FROM scalper_feed_payload_dicts LIMIT 1").fetchone():
+        return None
+    dict_id = train(conn)
+    if dict_id is not None:
+        print(f"[Feed] Trained payload dictionary {dict_id}; recompressed {recompress(conn, only_without_dict=True)} rows")
+    return dict_id
+
+
+def migrate(conn) -> int:
+    """Compress legacy payload_json TEXT into payload BLOBs in place and drop the text column.
+    Returns the number of rows converted (0 when the table is absent or already migrated)."""
+    conn.execute(DICT_SCHEMA)
+    cols = _columns(conn)
+    if "payload_json" not in cols:
+        return 0
+    for column, decl in (("payload", "BLOB"), ("payload_codec", "TEXT"), ("payload_dict", "INTEGER")):
+        if column not in cols:
+            conn.execute(f"ALTER TABLE {TABLE} ADD COLUMN {column} {decl}")
+    if not conn.execute("SELECT 1 FROM scalper_feed_payload_dicts LIMIT 1").fetchone():
+        train(conn, legacy=True)
+
+    codec = PayloadCodec(conn)
+    last, converted = 0, 0
+    while True:
+        rows = conn.execute(
+            f"SELECT id, payload_json FROM {TABLE} WHERE id > ? AND payload IS NULL ORDER BY id LIMIT ?", (last, BATCH)
+        ).fetchall()
+        if not rows:
+            break
+        conn.executemany(
+            f"UPDATE {TABLE} SET payload=?, payload_codec=?, payload_dict=? WHERE id=?",
+            [(*codec.encode(text or ""), rid) for rid, text in rows],
+        )
+        converted += len(rows)
+        last = rows[-1][0]
+    conn.execute(f"ALTER TABLE {TABLE} DROP COLUMN payload_json")
+    print(f"[DB] Compressed {converted} scalper feed payloads")
+    return converted
+
+
+# ── LAZY READS ─────────────────────────────────────────────────────────────────
+def register(conn):
+    """Expose feed_payload(payload, payload_codec, payload_dict) → JSON text to SQL on conn."""
+    conn.create_function("feed_payload", 3, PayloadCodec(conn).decode, deterministic=True)
+
+
+def load_payload(conn, feed_ts_utc: str):
+    """The raw feed record for one snapshot, decoded on demand."""
+    row = conn.execute(
+        f"SELECT payload, payload_codec, payload_dict FROM {TABLE} WHERE feed_ts_utc=?", (feed_ts_utc,)
+    ).fetchone()
+    return json.loads(PayloadCodec(conn).decode(*row)) if row else None
+
+
+def stats(conn) -> dict:
+    codec = PayloadCodec(conn)
+    rows, stored, raw = 0, 0, 0
+    for blob, c, d in conn.execute(f"SELECT payload, payload_codec, payload_dict FROM {TABLE}"):
+        rows += 1
+        stored += len(blob or b"")
+        raw += len((codec.decode(blob, c, d) or "").encode("utf-8"))
+    return {"rows": rows, "raw_bytes": raw, "stored_bytes": stored,
+            "ratio": round(raw / stored, 2) if stored else None, "codec": codec.codec, "dict_id": codec.dict_id}
+
+
+if __name__ == "__main__":
+    import db_pool
+    db_path = os.environ.get("DASHBOARD_DB", os.path.join(os.path.dirname(__file__), "data", "northstar.db"))
+    with db_pool.writer(db_path) as conn:
+        if "payload_json" not in _columns(conn) and "payload" not in _columns(conn):
+            sys.exit(f"No {TABLE} table in {db_path}")
+        migrate(conn)
+        if "--retrain" in sys.argv:
+            dict_id = train(conn)
+            if dict_id is None:
+                print(f"[Feed] Fewer than {TRAIN_MIN_SAMPLES} payloads; keeping the current dictionary")
+            else:
+                print(f"[Feed] Dictionary {dict_id}: recompressed {recompress(conn)} rows")
+        print(json.dumps(stats(conn), indent=2))
+    if "--vacuum" in sys.argv:
+        conn = db_pool.connect(db_path)
+        try:
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")  # under WAL the file only shrinks at checkpoint
+        finally:
+            conn.close()
@@ -5,8 +5,9 @@ Runs on app startup to ensure fresh data on Railway's ephemeral storage.
 
 import json
 import os
-import aiosqlite
 from pathlib import Path
+
+import db_pool
 from database import DB_PATH
 
 async def init_anthropic_data():
@@ -54,100 +55,97 @@ async def init_anthropic_data():
         return
     
     # Insert into database
-    db = await aiosqlite.connect(DB_PATH)
     try:
-        # Check if data already exists for today
-        today = entries[-1]["timestamp"].split("T")[0] if entries else None
-        if today:
-            cur = await db.execute(
-                "SELECT COUNT(*) FROM api_usage WHERE provider='anthropic' AND usage_date=?",
-                (today,)
-            )
-            (count,) = await cur.fetchone()
-            if count > 0:
-                print(f"[INIT] Data already exists for {today}. Skipping insert.")
-                await db.close()
-                return
-        
-        # Insert entries
-        for entry in entries:
-            usage_date = entry.get("timestamp", "").split("T")[0]
-            provider = "anthropic"
-            model = entry.get("model", "unknown")
-            tokens_in = entry.get("input_tokens", 0)
-            tokens_out = entry.get("output_tokens", 0)
-            cost = entry.get("total_cost", 0)
-            notes = f"agent:{entry.get('agent_id', 'unknown')}"
-            
-            try:
-                await db.execute(
-                    """INSERT INTO api_usage (usage_date, provider, model, tokens_in, tokens_out, cost_usd, notes)
-                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                    (usage_date, provider, model, tokens_in, tokens_out, cost, notes)
-                )
-            except Exception as e:
-                # Likely duplicate key; skip
-                pass
-        
-        await db.commit()
-        print(f"[INIT] Inserted {len(entries)} usage entries into database")
-    
+        inserted = await db_pool.run_write(DB_PATH, _insert_entries, entries)
+        if inserted is not None:
+            print(f"[INIT] Inserted {inserted} usage entries into database")
     except Exception as e:
         print(f"[INIT] Error inserting data: {e}")
-    
-    finally:
-        await db.close()
+
+
+def _insert_entries(conn, entries):
+    # Check if data already exists for today
+    today = entries[-1]["timestamp"].split("T")[0] if entries else None
+    if today:
+        (count,) = conn.execute(
+            "SELECT COUNT(*) FROM api_usage WHERE provider='anthropic' AND usage_date=?",
+            (today,)
+        ).fetchone()
+        if count > 0:
+            print(f"[INIT] Data already exists for {today}. Skipping insert.")
+            return None
+
+    # Insert entries
+    for entry in entries:
+        usage_date = entry.get("timestamp", "").split("T")[0]
+        provider = "anthropic"
+        model = entry.get("model", "unknown")
+        tokens_in = entry.get("input_tokens", 0)
+        tokens_out = entry.get("output_tokens", 0)
+        cost = entry.get("total_cost", 0)
+        notes = f"agent:{entry.get('agent_id', 'unknown')}"
+
+        try:
+            conn.execute(
+                """INSERT INTO api_usage (usage_date, provider, model, tokens_in, tokens_out, cost_usd, notes)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (usage_date, provider, model, tokens_in, tokens_out, cost, notes)
+            )
+        except Exception as e:
+            # Likely duplicate key; skip
+            pass
+    return len(entries)
+
 
 async def ensure_tables():
     """Ensure all required tables exist"""
-    db = await aiosqlite.connect(DB_PATH)
     try:
-        # Create tables if missing
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS api_usage (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                usage_date TEXT NOT NULL,
-                provider TEXT NOT NULL,
-                model TEXT NOT NULL,
-                tokens_in INTEGER,
-                tokens_out INTEGER,
-                cost_usd REAL,
-                notes TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(usage_date, provider, model, tokens_in, tokens_out)
-            )
-        """)
-        
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS kalshi_trades (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                market TEXT,
-                direction TEXT,
-                stake REAL,
-                fill_price REAL,
-                exit_price REAL,
-                profit_loss REAL,
-                status TEXT,
-                notes TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS company_revenue (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                source TEXT,
-                amount REAL,
-                notes TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        await db.commit()
+        await db_pool.run_write(DB_PATH, _create_tables)
         print("[INIT] Tables ensured")
     except Exception as e:
         print(f"[INIT] Error creating tables: {e}")
-    finally:
-        await db.close()
+
+
+def _create_tables(conn):
+    # Create tables if missing
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS api_usage (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usage_date TEXT NOT NULL,
+            provider TEXT NOT NULL,
+            model TEXT NOT NULL,
+            tokens_in INTEGER,
+            tokens_out INTEGER,
+            cost_usd REAL,
+            notes TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(usage_date, provider, model, tokens_in, tokens_out)
+        )
+    """)
+    
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS kalshi_trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            market TEXT,
+            direction TEXT,
+            stake REAL,
+            fill_price REAL,
+            exit_price REAL,
+            profit_loss REAL,
+            status TEXT,
+            notes TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS company_revenue (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            source TEXT,
+            amount REAL,
+            notes TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
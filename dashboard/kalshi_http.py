@@ -0,0 +1,277 @@
+"""
+kalshi_http.py — shared async Kalshi REST client
+One aiohttp session per event loop keeps TLS connections alive between calls.
+Requests pass through a token bucket sized to Kalshi's per-second limits, are
+retried with exponential backoff on 429/5xx/network errors, and are signed
+with RSA-PSS using a private key parsed once per process. Cursor pagination is
+built in.
+
+  async with KalshiHTTP() as k:            → async code with its own loop (own session and rate limit)
+      bal = await k.get("/portfolio/balance")
+      async for page in k.pages("/portfolio/fills", "fills", min_ts=...): ...
+  run(lambda k: k.get(...))                → sync callers (FastAPI sync endpoints, scripts);
+                                             runs on a background loop with a shared session
+  submit(fn)                               → same loop, returns a Future (background tasks)
+  request_sync(method, path, params)       → (data, status) like the old urllib helpers
+"""
+import asyncio
+import base64
+import functools
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# ── CONFIG ─────────────────────────────────────────────────────────────────────
+KALSHI_API_KEY_ID = os.environ.get('KALSHI_API_KEY_ID', '4fa680d5-be76-4d85-9c1b-5fd2d42c9612')
+KALSHI_PRIVATE_KEY_PATH = os.environ.get('KALSHI_PRIVATE_KEY_PATH', r"C:\Users\chead\.openclaw\workspace\kalshi_private_key.pem")
+KALSHI_ENV = os.environ.get('KALSHI_ENV', 'production')
+
+if KALSHI_ENV == "production":
+    KALSHI_BASE = "https://api.elections.kalshi.com/trade-api/v2"
+else:
+    KALSHI_BASE = "https://demo-api.kalshi.co/trade-api/v2"
+SIGN_PREFIX = urlparse(KALSHI_BASE).path  # "/trade-api/v2" — part of the signed message
+
+READ_RPS = float(os.environ.get('KALSHI_READ_RPS', 20))   # Kalshi basic tier: 20 reads/s
+WRITE_RPS = float(os.environ.get('KALSHI_WRITE_RPS', 10))  # 10 writes/s
+MAX_RETRIES = 4
+BACKOFF_BASE_S = 0.5
+REQUEST_TIMEOUT_S = 15
+POOL_SIZE = 16
+PAGE_LIMIT = 200
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class KalshiError(RuntimeError):
+    def __init__(self, status: int, body):
+        super().__init__(f"Kalshi {status}: {body}")
+        self.status = status
+        self.body = body
+
+
+# ── AUTH ───────────────────────────────────────────────────────────────────────
+@functools.lru_cache(maxsize=4)
+def _load_private_key(path: str, mtime_ns: int):
+    from cryptography.hazmat.primitives import serialization
+    with open(path, 'rb') as f:
+        return serialization.load_pem_private_key(f.read(), password=None)
+
+
+def private_key():
+    """Parsed PEM key; re-read only if the file changes."""
+    if not os.path.exists(KALSHI_PRIVATE_KEY_PATH):
+        raise FileNotFoundError(f"Private key not found: {KALSHI_PRIVATE_KEY_PATH}")
+    return _load_private_key(KALSHI_PRIVATE_KEY_PATH, os.stat(KALSHI_PRIVATE_KEY_PATH).st_mtime_ns)
+
+
+_STATIC_HEADERS = {
+    "Content-Type": "application/json",
+    "Accept": "application/json",
+    "Cache-Control": "no-cache",
+}
+
+
+def sign_headers(method: str, path: str) -> dict:
+    """RSA-PSS headers for path relative to KALSHI_BASE (query string excluded)."""
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+
+    ts = str(int(time.time() * 1000))
+    message = f"{ts}{method.upper()}{SIGN_PREFIX}{path.split('?', 1)[0]}"
+    sig = private_key().sign(
+        message.encode('utf-8'),
+        padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH),
+        hashes.SHA256(),
+    )
+    return {
+        **_STATIC_HEADERS,
+        "KALSHI-ACCESS-KEY": KALSHI_API_KEY_ID,
+        "KALSHI-ACCESS-SIGNATURE": base64.b64encode(sig).decode("utf-8"),
+        "KALSHI-ACCESS-TIMESTAMP": ts,
+    }
+
+
+def _auth_headers(method: str, path: str) -> dict:
+    if os.path.exists(KALSHI_PRIVATE_KEY_PATH):
+        return sign_headers(method, path)
+    bearer = os.environ.get('KALSHI_API_KEY', '').strip()
+    if bearer:
+        return {**_STATIC_HEADERS, "Authorization": f"Bearer {bearer}"}
+    raise FileNotFoundError(f"Private key not found: {KALSHI_PRIVATE_KEY_PATH} (and KALSHI_API_KEY unset)")
+
+
+def available() -> bool:
+    """True when requests can be made (aiohttp installed and credentials present)."""
+    return aiohttp is not None and (
+        os.path.exists(KALSHI_PRIVATE_KEY_PATH) or bool(os.environ.get('KALSHI_API_KEY', '').strip())
+    )
+
+
+# ── RATE LIMITING ──────────────────────────────────────────────────────────────
+class TokenBucket:
+    """rate tokens/second, bursting up to capacity; acquire() waits for a token."""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+# ── CLIENT ─────────────────────────────────────────────────────────────────────
+class KalshiHTTP:
+    """Pooled, rate-limited Kalshi client bound to the event loop it is used on."""
+
+    def __init__(self, base: str = KALSHI_BASE):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp not installed; cannot make Kalshi requests")
+        self.base = base
+        self._session = None
+        self._read_bucket = TokenBucket(READ_RPS)
+        self._write_bucket = TokenBucket(WRITE_RPS)
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=POOL_SIZE, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT_S),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def request(self, method: str, path: str, params: dict = None, body: dict = None):
+        """JSON response for a 2xx; raises KalshiError otherwise (after retries)."""
+        method = method.upper()
+        bucket = self._read_bucket if method == "GET" else self._write_bucket
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        for attempt in range(MAX_RETRIES + 1):
+            await bucket.acquire()
+            delay = BACKOFF_BASE_S * 2 ** attempt * (1 + random.random() * 0.25)
+            try:
+                async with self._get_session().request(
+                    method, self.base + path, params=params, json=body,
+                    headers=_auth_headers(method, path),
+                ) as resp:
+                    if resp.status < 300:
+                        return await resp.json(content_type=None)
+                    text = await resp.text()
+                    if resp.status not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                        raise KalshiError(resp.status, text)
+                    retry_after = resp.headers.get("Retry-After")
+                    if retry_after and retry_after.replace('.', '', 1).isdigit():
+                        delay = max(delay, float(retry_after))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == MAX_RETRIES:
+                    raise KalshiError(0, str(e))
+            await asyncio.sleep(delay)
+
+    async def get(self, path: str, **params):
+        return await self.request("GET", path, params)
+
+    async def pages(self, path: str, key: str, limit: int = PAGE_LIMIT, **params):
+        """Yield each page's `key` list, following cursors until exhausted."""
+        cursor = None
+        while True:
+            data = await self.get(path, limit=limit, cursor=cursor, **params)
+            yield data.get(key) or []
+            cursor = data.get("cursor")
+            if not cursor:
+                return
+
+    async def get_all(self, path: str, key: str, **params) -> list:
+        out = []
+        async for page in self.pages(path, key, **params):
+            out.extend(page)
+        return out
+
+    # Common portfolio reads
+    async def get_balance(self) -> dict:
+        return await self.get("/portfolio/balance")
+
+    async def get_positions(self, **params) -> list:
+        out = []
+        async for page in self.pages("/portfolio/positions", "market_positions", **params):
+            out.extend(page)
+        return out
+
+    async def get_orders(self, **params) -> list:
+        return await self.get_all("/portfolio/orders", "orders", **params)
+
+    async def get_fills(self, **params) -> list:
+        return await self.get_all("/portfolio/fills", "fills", **params)
+
+
+# ── SYNC FACADE ────────────────────────────────────────────────────────────────
+_loop = None
+_client = None
+_loop_lock = threading.Lock()
+
+
+def _shared():
+    """Background event loop + client reused by every sync caller in the process."""
+    global _loop, _client
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _client = KalshiHTTP()
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="kalshi-http", daemon=True).start()
+        return _loop, _client
+
+
+def submit(fn):
+    """Schedule fn(client) → coroutine on the shared loop; returns a concurrent Future."""
+    loop, client = _shared()
+    return asyncio.run_coroutine_threadsafe(fn(client), loop)
+
+
+def run(fn, timeout: float = None):
+    """Run fn(client) → coroutine on the shared loop and return its result."""
+    return submit(fn).result(timeout)
+
+
+def request_sync(method: str, path: str, params: dict = None, body: dict = None) -> tuple:
+    """(data, status) without raising, for scripts written against the urllib helpers."""
+    try:
+        return run(lambda k: k.request(method, path, params, body)), 200
+    except KalshiError as e:
+        return {"error": e.body}, e.status
+    except Exception as e:
+        return {"error": str(e)}, 0
+
+
+def close():
+    """Close the shared session and stop its loop (shutdown hook)."""
+    global _loop, _client
+    with _loop_lock:
+        loop, client, _loop, _client = _loop, _client, None, None
+    if loop is not None:
+        asyncio.run_coroutine_threadsafe(client.close(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
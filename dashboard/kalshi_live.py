@@ -0,0 +1,124 @@
+"""
+kalshi_live.py — background refresher behind /api/kalshi/live
+One task on kalshi_http's shared loop polls balance + positions every
+KALSHI_LIVE_INTERVAL_S and keeps the latest result in memory, so the
+endpoint answers from memory however many viewers are polling.
+
+kalshi_snapshots is owned by auto_populate, so persistence is off by default.
+Setting KALSHI_LIVE_PERSIST_S > 0 writes a snapshot that often through
+auto_populate's own fetch/write path (fills and orders included), never a
+positions-only row.
+
+Stale-while-revalidate: when the cached result is older than the interval
+(upstream slow or failing), readers still get it immediately, marked
+stale, and trigger at most one extra refresh in flight.
+"""
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime
+
+import db_pool
+import kalshi_http
+import sync_kalshi_live
+
+REFRESH_INTERVAL_S = float(os.environ.get('KALSHI_LIVE_INTERVAL_S', 30))
+PERSIST_INTERVAL_S = float(os.environ.get('KALSHI_LIVE_PERSIST_S', 0))  # 0 = don't write snapshots
+FETCH_TIMEOUT_S = 20
+MIN_REVALIDATE_S = 5    # don't let stale reads retry a failing upstream more often than this
+COLD_START_WAIT_S = 5   # first request after boot may wait this long for the first poll
+
+
+class LiveRefresher:
+    def __init__(self, db_path, interval_s: float = REFRESH_INTERVAL_S, persist_s: float = PERSIST_INTERVAL_S):
+        self.db_path = db_path
+        self.interval_s = interval_s
+        self.persist_s = persist_s
+        self.last_error = None
+        self._payload = None
+        self._fetched_at = None  # monotonic
+        self._attempt_at = 0.0
+        self._persisted_at = 0.0
+        self._ready = threading.Event()
+        self._task = None        # in-flight refresh (loop thread only)
+        self._poller = None      # concurrent Future for the poll loop
+
+    # ── loop-thread side ──
+    def _kick(self, k):
+        if self._task is None or self._task.done():
+            self._attempt_at = time.monotonic()
+            self._task = asyncio.ensure_future(self._refresh(k))
+        return self._task
+
+    async def _kick_async(self, k):
+        self._kick(k)
+
+    async def _poll(self, k):
+        while True:
+            await self._kick(k)
+            await asyncio.sleep(self.interval_s)
+
+    async def _refresh(self, k):
+        try:
+            portfolio = await asyncio.wait_for(sync_kalshi_live.fetch_portfolio(k), FETCH_TIMEOUT_S)
+        except Exception as e:
+            self.last_error = str(e) or type(e).__name__
+            print(f"[WARN] Kalshi live refresh failed: {self.last_error}")
+            return
+        positions = portfolio.get("market_positions", [])
+        self._payload = {
+            "balance": portfolio.get("balance_cents", 0),
+            "available_balance": portfolio.get("available_balance", 0),
+            "open_positions": len(positions),
+            "positions": positions,
+            "timestamp": datetime.utcnow().isoformat(),
+            "source": "kalshi_api",
+        }
+        self._fetched_at = time.monotonic()
+        self.last_error = None
+        self._ready.set()
+        if self.persist_s > 0 and time.time() - self._persisted_at >= self.persist_s:
+            self._persisted_at = time.time()
+            try:
+                await asyncio.to_thread(self._persist)
+            except Exception as e:
+                print(f"[WARN] Kalshi live snapshot write failed: {e}")
+
+    def _persist(self):
+        import auto_populate  # heavy module; only needed when persistence is enabled
+        result = auto_populate.fetch_kalshi()
+        with db_pool.writer(self.db_path) as conn:
+            auto_populate.write_kalshi_snapshot(conn, result)
+
+    # ── caller side (any thread) ──
+    def start(self):
+        if not kalshi_http.available():
+            print("[WARN] Kalshi live refresher not started: aiohttp or credentials missing")
+            return
+        if self._poller is None or self._poller.done():
+            self._poller = kalshi_http.submit(self._poll)
+
+    def stop(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+
+    def current(self) -> dict:
+        """Latest payload plus age_seconds/stale; never waits on Kalshi once warm."""
+        if self._payload is None and self._poller is not None:
+            self._ready.wait(COLD_START_WAIT_S)
+        payload, fetched_at = self._payload, self._fetched_at
+        if payload is None:
+            return {"error": self.last_error or "no live data yet",
+                    "age_seconds": None, "timestamp": datetime.utcnow().isoformat()}
+        age = time.monotonic() - fetched_at
+        stale = age > self.interval_s + FETCH_TIMEOUT_S
+        if stale and self._poller is not None and time.monotonic() - self._attempt_at >= MIN_REVALIDATE_S:
+            kalshi_http.submit(self._kick_async)
+        return {
+            **payload,
+            "age_seconds": round(age, 1),
+            "stale": stale,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,136 @@
+"""
+kpi_push.py — server push of dashboard KPI deltas (SSE / WebSocket)
+One watcher task checks PRAGMA data_version once per POLL_S. It recomputes
+the dashboard payload only when the database changed, e.g. after a sync run
+or a new snapshot. It then diffs the payload against the last one and fans
+the changed fields out to every subscriber. Backend work scales with data
+changes, not with clients × poll rate.
+
+Each subscriber first receives a full "snapshot" event, then "delta" events
+{"changed": {...}, "removed": [[key, ...], ...]}: changed keys nested as in the
+payload (dicts diffed recursively, lists replaced whole, a value that became
+null sent as null) and removed keys as key paths. A subscriber that falls
+QUEUE_SIZE events behind is resynced with a fresh snapshot instead of growing
+its queue.
+"""
+import asyncio
+import time
+
+POLL_S = 1.0
+MAX_AGE_S = 300      # recompute anyway so clock-derived fields move between syncs
+QUEUE_SIZE = 16
+HEARTBEAT_S = 15
+
+
+UNCHANGED = object()
+
+
+def diff(old, new, removed: list, path: tuple = ()):
+    """Changed keys of new vs old (recursive for dicts), or UNCHANGED.
+    Keys present in old but not new are appended to removed as key paths."""
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return UNCHANGED if old == new else new
+    changed = {}
+    for key, value in new.items():
+        if key not in old:
+            changed[key] = value
+            continue
+        sub = diff(old[key], value, removed, path + (key,))
+        if sub is not UNCHANGED:
+            changed[key] = sub
+    for key in old.keys() - new.keys():
+        removed.append([*path, key])
+    return changed or UNCHANGED
+
+
+def delta(old, new):
+    """(changed, removed) between two payloads; changed is None when no key changed value."""
+    removed = []
+    changed = diff(old, new, removed)
+    return (None if changed is UNCHANGED else changed), removed
+
+
+class _Subscriber:
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def push(self, event, seq, data, snapshot):
+        try:
+            self.queue.put_nowait((event, seq, data))
+        except asyncio.QueueFull:
+            # Too far behind to patch: drop the backlog and start over from the full state
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(("snapshot", seq, snapshot))
+
+
+class KpiBroadcaster:
+    """version_fn() → int and compute() → dict are blocking; they run on worker threads."""
+
+    def __init__(self, version_fn, compute, poll_s: float = POLL_S, max_age_s: float = MAX_AGE_S):
+        self.version_fn = version_fn
+        self.compute = compute
+        self.poll_s = poll_s
+        self.max_age_s = max_age_s
+        self.state = None
+        self.seq = 0
+        self.recomputes = 0
+        self._version = None
+        self._computed_at = 0.0
+        self._subs = set()
+        self._ready = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._watch())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _watch(self):
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                print(f"[WARN] KPI push recompute failed: {e}")
+            await asyncio.sleep(self.poll_s)
+
+    async def check(self):
+        """Recompute and publish if the database changed (or the state aged out)."""
+        version = await asyncio.to_thread(self.version_fn)
+        if version == self._version and time.monotonic() - self._computed_at < self.max_age_s:
+            return
+        data = await asyncio.to_thread(self.compute)
+        self.recomputes += 1
+        self._version, self._computed_at = version, time.monotonic()
+        changed, removed = delta(self.state, data) if self.state is not None else (None, [])
+        self.state = data
+        self._ready.set()
+        if changed is not None or removed:
+            self.seq += 1
+            event = {"changed": changed or {}, "removed": removed}
+            for sub in list(self._subs):
+                sub.push("delta", self.seq, event, data)
+
+    async def subscribe(self) -> _Subscriber:
+        sub = _Subscriber()
+        await self._ready.wait()
+        sub.queue.put_nowait(("snapshot", self.seq, self.state))
+        self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        self._subs.discard(sub)
+
+    async def next_event(self, sub, timeout: float = HEARTBEAT_S):
+        """(event, seq, data), or None after timeout so callers can heartbeat / check disconnects."""
+        try:
+            return await asyncio.wait_for(sub.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def stats(self) -> dict:
+        return {"subscribers": len(self._subs), "seq": self.seq, "recomputes": self.recomputes}
@@ -0,0 +1,336 @@
+"""
+kpi_store.py — materialized KPI layer for /api/dashboard
+Sync jobs refresh these summary tables as they write; the dashboard endpoint
+reads them back with a handful of primary-key lookups.
+
+Tables:
+  kpi_daily_eod  → one end-of-day kalshi_snapshots row per snap_date
+  kpi_periods    → today/week/month/quarter/year/all aggregates over kpi_daily_eod
+  kpi_totals     → (scope, metric) scalars: expenses, sports, john, kalshi_trades
+
+Days whose raw snapshots were compacted away (snapshot_rollups retention)
+keep their EOD row via the daily rollup tier.
+"""
+from datetime import date, datetime
+
+import eod_engine
+import exposure_ledger
+import market_clusters
+import snapshot_rollups
+
+KPI_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kpi_daily_eod (
+    snap_date TEXT PRIMARY KEY,
+    snapshot_ts TEXT NOT NULL,
+    balance_cents INTEGER DEFAULT 0,
+    total_pnl_cents INTEGER DEFAULT 0,
+    total_fills INTEGER DEFAULT 0,
+    win_count INTEGER DEFAULT 0,
+    loss_count INTEGER DEFAULT 0,
+    open_positions INTEGER DEFAULT 0,
+    total_orders INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS kpi_periods (
+    period TEXT PRIMARY KEY,
+    as_of_date TEXT NOT NULL,
+    source_snapshot_ts TEXT,
+    start_ts TEXT,
+    end_ts TEXT,
+    pnl_usd REAL DEFAULT 0,
+    balance_delta_usd REAL DEFAULT 0,
+    fills INTEGER DEFAULT 0,
+    wins INTEGER DEFAULT 0,
+    losses INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS kpi_totals (
+    scope TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL DEFAULT 0,
+    updated_at TEXT DEFAULT (datetime('now')),
+    PRIMARY KEY (scope, metric)
+);
+"""
+
+_EOD_COLUMNS = (
+    "snap_date, snapshot_ts, balance_cents, total_pnl_cents, total_fills, "
+    "win_count, loss_count, open_positions, total_orders"
+)
+
+
+def ensure_kpi_tables(conn):
+    conn.executescript(KPI_SCHEMA)
+
+
+# ── DAILY EOD ──────────────────────────────────────────────────────────────────
+def refresh_eod(conn, snap_date: str = None):
+    """Upsert the end-of-day row for one snap_date (all dates when None)."""
+    where = "WHERE snap_date = ?" if snap_date else ""
+    params = (snap_date,) if snap_date else ()
+    conn.execute(
+        f"""
+        INSERT INTO kpi_daily_eod ({_EOD_COLUMNS})
+        SELECT {_EOD_COLUMNS}
+        FROM (
+            SELECT {_EOD_COLUMNS},
+                   ROW_NUMBER() OVER (PARTITION BY snap_date ORDER BY snapshot_ts DESC) AS rn
+            FROM kalshi_snapshots
+            {where}
+        )
+        WHERE rn = 1
+        ON CONFLICT(snap_date) DO UPDATE SET
+            snapshot_ts=excluded.snapshot_ts,
+            balance_cents=excluded.balance_cents,
+            total_pnl_cents=excluded.total_pnl_cents,
+            total_fills=excluded.total_fills,
+            win_count=excluded.win_count,
+            loss_count=excluded.loss_count,
+            open_positions=excluded.open_positions,
+            total_orders=excluded.total_orders
+        """,
+        params,
+    )
+
+
+def rebuild_eod(conn):
+    """Full rebuild of kpi_daily_eod (and the snapshot rollups); used for bootstrap and after bulk imports."""
+    snapshot_rollups.refresh(conn)
+    conn.execute("DELETE FROM kpi_daily_eod")
+    conn.execute(
+        f"""
+        INSERT INTO kpi_daily_eod ({_EOD_COLUMNS})
+        SELECT snap_date, last_ts, balance_close, pnl_close, fills_close,
+               win_count, loss_count, open_positions, total_orders
+        FROM kalshi_snapshot_rollups
+        WHERE tier = 'daily' AND snap_date < COALESCE((SELECT MIN(snap_date) FROM kalshi_snapshots), '~')
+        """
+    )
+    refresh_eod(conn)
+
+
+def load_eod_rows(conn):
+    return conn.execute(f"SELECT {_EOD_COLUMNS} FROM kpi_daily_eod ORDER BY snap_date ASC").fetchall()
+
+
+# ── PERIOD AGGREGATES ──────────────────────────────────────────────────────────
+def compute_periods(eod_rows, today: date = None):
+    """Period P&L from EOD rows (sorted by snap_date) with a pre-period baseline."""
+    return eod_engine.EodSeries.from_rows(eod_rows).periods(today)
+
+
+def refresh_periods(conn, eod_rows=None):
+    """Recompute kpi_periods from kpi_daily_eod (one row per day, so this is cheap)."""
+    eod_rows = load_eod_rows(conn) if eod_rows is None else eod_rows
+    as_of = date.today().isoformat()
+    source_ts = eod_rows[-1][1] if eod_rows else None
+    periods = compute_periods(eod_rows)
+    conn.execute("DELETE FROM kpi_periods")
+    conn.executemany(
+        """
+        INSERT INTO kpi_periods
+          (period, as_of_date, source_snapshot_ts, start_ts, end_ts, pnl_usd,
+           balance_delta_usd, fills, wins, losses)
+        VALUES (?,?,?,?,?,?,?,?,?,?)
+        """,
+        [
+            (p, as_of, source_ts, v["start_ts"], v["end_ts"], v["pnl_usd"],
+             v["balance_delta_usd"], v["fills"], v["wins"], v["losses"])
+            for p, v in periods.items()
+        ],
+    )
+    return periods
+
+
+# ── SCALAR TOTALS ──────────────────────────────────────────────────────────────
+def _put_totals(conn, scope: str, metrics: dict):
+    conn.execute("DELETE FROM kpi_totals WHERE scope = ?", (scope,))
+    conn.executemany(
+        "INSERT INTO kpi_totals (scope, metric, value) VALUES (?,?,?)",
+        [(scope, k, float(v or 0)) for k, v in metrics.items()],
+    )
+
+
+def read_totals(conn, scope: str) -> dict:
+    rows = conn.execute("SELECT metric, value FROM kpi_totals WHERE scope = ?", (scope,)).fetchall()
+    return {r[0]: r[1] for r in rows}
+
+
+def refresh_expenses(conn):
+    rows = conn.execute(
+        "SELECT lower(COALESCE(category,'')) AS cat, SUM(amount) FROM expenses GROUP BY cat"
+    ).fetchall()
+    metrics = {f"category:{cat}": total or 0 for cat, total in rows}
+    metrics["total"] = sum(float(total or 0) for _, total in rows)
+    _put_totals(conn, "expenses", metrics)
+
+
+def refresh_sports(conn):
+    row = conn.execute("""
+        SELECT
+            SUM(CASE WHEN result='WIN' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN result='LOSS' THEN 1 ELSE 0 END),
+            SUM(profit_loss)
+        FROM sports_picks
+        WHERE result IN ('WIN', 'LOSS')
+    """).fetchone()
+    _put_totals(conn, "sports", {"wins": row[0], "losses": row[1], "net": row[2]})
+
+
+def refresh_john(conn):
+    revenue = conn.execute("SELECT SUM(amount) FROM revenue WHERE lower(segment)='john'").fetchone()[0]
+    pipeline = conn.execute(
+        "SELECT SUM(invoice_amount) FROM john_jobs WHERE status IN ('quoted', 'in_progress')"
+    ).fetchone()[0]
+    jobs = conn.execute("SELECT COUNT(*) FROM john_jobs").fetchone()[0]
+    leads = conn.execute("SELECT COUNT(*) FROM john_leads").fetchone()[0]
+    _put_totals(conn, "john", {"revenue": revenue, "pipeline": pipeline, "jobs": jobs, "leads": leads})
+
+
+def refresh_trades(conn):
+    """Materialize the legacy kalshi_trades reconciliation metrics."""
+    total = settled = open_pos = wins = losses = 0
+    net_pnl = win_total = loss_total = open_exposure = 0.0
+
+    rows = conn.execute(
+        "SELECT entry_price, exit_price, num_contracts, fees, status, cost_basis, pnl_realized FROM kalshi_trades"
+    ).fetchall()
+    for entry, exit_p, qty, fees, status, cost, db_pnl in rows:
+        total += 1
+        if status == 'Settled':
+            settled += 1
+            if db_pnl is not None:
+                pnl = db_pnl
+            elif entry is not None and exit_p is not None and qty is not None:
+                pnl = (exit_p - entry) * qty - (fees or 0)
+            else:
+                continue
+            net_pnl += pnl
+            if pnl > 0:
+                wins += 1
+                win_total += pnl
+            elif pnl < 0:
+                losses += 1
+                loss_total += abs(pnl)
+        else:
+            open_pos += 1
+            if cost is not None:
+                open_exposure += cost
+            elif entry is not None and qty is not None:
+                open_exposure += entry * qty
+
+    _put_totals(conn, "kalshi_trades", {
+        "total": total,
+        "settled": settled,
+        "open_positions": open_pos,
+        "wins": wins,
+        "losses": losses,
+        "net_pnl": net_pnl,
+        "win_total": win_total,
+        "loss_total": loss_total,
+        "open_exposure": open_exposure,
+    })
+
+
+# ── REFRESH ENTRY POINTS ───────────────────────────────────────────────────────
+def on_snapshot(conn, snap_date: str):
+    """Call after inserting kalshi_snapshots rows for snap_date."""
+    ensure_kpi_tables(conn)
+    if conn.execute("SELECT 1 FROM kpi_daily_eod LIMIT 1").fetchone() is None:
+        rebuild_eod(conn)
+    else:
+        refresh_eod(conn, snap_date)
+    snapshot_rollups.on_snapshot(conn, snap_date)
+    refresh_periods(conn)
+    conn.commit()
+
+
+SOURCE_REFRESHERS = {
+    "kalshi": lambda conn: None,  # handled per snapshot via on_snapshot()
+    "kalshi_trades": refresh_trades,
+    "sports_picks": refresh_sports,
+    "john": refresh_john,
+    "expenses": refresh_expenses,
+}
+
+
+def refresh_for_source(conn, source: str):
+    fn = SOURCE_REFRESHERS.get(source)
+    if fn is None:
+        return
+    ensure_kpi_tables(conn)
+    if source in ("kalshi_trades", "sports_picks"):
+        market_clusters.ensure_current(conn)
+        exposure_ledger.record_history(conn)
+    fn(conn)
+    conn.commit()
+
+
+def refresh_all(conn):
+    """Rebuild every KPI table from the base tables.
+    A failing step raises and nothing is committed, so a half-rebuilt set never replaces the old one."""
+    ensure_kpi_tables(conn)
+    for fn in (rebuild_eod, refresh_periods, refresh_expenses, refresh_sports, refresh_john, refresh_trades,
+               market_clusters.ensure_current, exposure_ledger.rebuild, exposure_ledger.record_history):
+        try:
+            fn(conn)
+        except Exception as e:
+            conn.rollback()
+            raise RuntimeError(f"KPI refresh step {fn.__name__} failed: {e}") from e
+    conn.commit()
+
+
+# ── READ PATH ──────────────────────────────────────────────────────────────────
+def read_dashboard_kpis(conn) -> dict:
+    """Everything get_dashboard() needs, via primary-key reads on the KPI tables."""
+    latest = conn.execute(
+        f"SELECT {_EOD_COLUMNS} FROM kpi_daily_eod ORDER BY snap_date DESC LIMIT 1"
+    ).fetchone()
+
+    rows = conn.execute(
+        """
+        SELECT period, as_of_date, source_snapshot_ts, start_ts, end_ts, pnl_usd,
+               balance_delta_usd, fills, wins, losses
+        FROM kpi_periods
+        """
+    ).fetchall()
+    stale = (
+        not rows
+        or any(r[1] != date.today().isoformat() for r in rows)
+        or (latest is not None and rows[0][2] != latest[1])
+    )
+    if stale:
+        periods = compute_periods(load_eod_rows(conn))
+    else:
+        periods = {
+            r[0]: {
+                "start_ts": r[3],
+                "end_ts": r[4],
+                "pnl_usd": r[5],
+                "balance_delta_usd": r[6],
+                "fills": int(r[7] or 0),
+                "wins": int(r[8] or 0),
+                "losses": int(r[9] or 0),
+            }
+            for r in rows
+        }
+
+    return {
+        "latest": latest,
+        "periods": periods,
+        "expenses": read_totals(conn, "expenses"),
+        "sports": read_totals(conn, "sports"),
+        "john": read_totals(conn, "john"),
+        "kalshi_trades": read_totals(conn, "kalshi_trades"),
+        "as_of": datetime.utcnow().isoformat() + "Z",
+    }
+
+
+if __name__ == "__main__":
+    import os
+    import db_pool
+    import migrations
+    db_path = os.environ.get("DASHBOARD_DB", os.path.join(os.path.dirname(__file__), "data", "northstar.db"))
+    conn = db_pool.connect(db_path)
+    migrations.migrate(conn)
+    refresh_all(conn)
+    print(f"[KPI] Rebuilt KPI tables in {db_path}")
+    conn.close()
@@ -0,0 +1,150 @@
+"""
+ledgers.py — keyset pagination, filters and NDJSON streaming for ledger tables
+Rows come back newest first, ordered by (date, id) DESC. A page ends with a
+`next_after` cursor "<date>,<id>", and the following page asks for rows strictly
+before it. A NULL date is written as NULL_DATE ("~null"), so it stays distinct
+from an empty-string date; a real date starting with "~" gets one extra "~". That is an index range scan, so page N costs the same as page 1, and
+nothing is held in memory beyond one page.
+
+NDJSON mode re-issues the keyset query per batch instead of holding one cursor
+open. Each batch then runs on the calling thread's pooled reader, and memory
+stays at one batch however large the table is.
+
+  page(conn, LEDGERS["kalshi_trades"], after="2026-03-01,812", limit=100, filters={"status": "Open"})
+  iter_ndjson(db_path, LEDGERS["john_leads"], filters={"status": "new"})
+"""
+from collections import namedtuple
+
+import db_pool
+from response_cache import encode
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+STREAM_BATCH = 500
+
+# filters: query param → SQL predicate with one placeholder
+Ledger = namedtuple("Ledger", "table date_col id_col select filters")
+
+LEDGERS = {
+    "kalshi_trades": Ledger(
+        "kalshi_trades", "trade_date", "rowid", "rowid AS id, *",
+        {"status": "status = ?", "market": "market = ?", "direction": "direction = ?",
+         "since": "trade_date >= ?", "until": "trade_date <= ?"},
+    ),
+    "john_jobs": Ledger(
+        "john_jobs", "job_date", "id", "*",
+        {"status": "status = ?", "client": "client_name = ?", "paid": "paid = ?",
+         "since": "job_date >= ?", "until": "job_date <= ?"},
+    ),
+    "john_leads": Ledger(
+        "john_leads", "lead_date", "id", "*",
+        {"status": "status = ?", "source": "source = ?", "service": "service = ?",
+         "since": "lead_date >= ?", "until": "lead_date <= ?"},
+    ),
+    "sports_picks": Ledger(
+        "sports_picks", "pick_date", "id", "*",
+        {"result": "result = ?", "sport": "sport = ?", "confidence": "confidence = ?",
+         "since": "pick_date >= ?", "until": "pick_date <= ?"},
+    ),
+}
+
+
+NULL_DATE = "~null"
+
+
+def parse_after(after: str):
+    """"<date>,<id>" → (date, id), date None for NULL_DATE. The id is last, since dates never contain commas."""
+    if not after:
+        return None
+    date_part, _, id_part = after.rpartition(",")
+    if date_part == NULL_DATE:
+        date_part = None
+    elif date_part.startswith("~~"):
+        date_part = date_part[1:]
+    try:
+        return (date_part, int(id_part))
+    except ValueError:
+        raise ValueError(f"after must be '<date>,<id>', got {after!r}")
+
+
+def format_after(row: dict, spec: Ledger) -> str:
+    d = row.get(spec.date_col)
+    if d is None:
+        d = NULL_DATE
+    elif str(d).startswith("~"):
+        d = "~" + str(d)
+    return f"{d},{row['id']}"
+
+
+def clamp_limit(limit) -> int:
+    return max(1, min(int(limit or DEFAULT_LIMIT), MAX_LIMIT))
+
+
+def _query(spec: Ledger, after, filters: dict, limit: int, null_dates: bool = False):
+    """SQL for one keyset segment: dated rows (an index range seek) or the NULL-date tail."""
+    where, params = [], []
+    for name, value in (filters or {}).items():
+        if value is None:
+            continue
+        if name not in spec.filters:
+            raise ValueError(f"unknown filter {name!r} for {spec.table}")
+        where.append(spec.filters[name])
+        params.append(value)
+    d, i = spec.date_col, spec.id_col
+    if null_dates:
+        where.append(f"{d} IS NULL")
+        if after is not None and after[0] is None:
+            where.append(f"{i} < ?")
+            params.append(after[1])
+    elif after is not None:
+        where.append(f"({d}, {i}) < (?, ?)")
+        params.extend(after)
+    sql = f"SELECT {spec.select} FROM {spec.table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {d} DESC, {i} DESC LIMIT ?"
+    params.append(limit)
+    return sql, params
+
+
+def _fetch(conn, spec: Ledger, after, filters: dict, n: int) -> list:
+    """Up to n rows after the cursor. DESC order puts NULL dates last, so they are read after the dated rows run out."""
+    rows = []
+    if after is None or after[0] is not None:
+        rows = conn.execute(*_query(spec, after, filters, n)).fetchall()
+        if after is None:
+            return rows  # plain ORDER BY already includes the NULL tail
+    if len(rows) < n:
+        rows += conn.execute(*_query(spec, after, filters, n - len(rows), null_dates=True)).fetchall()
+    return rows
+
+
+def page(conn, spec: Ledger, after: str = None, limit: int = None, filters: dict = None) -> dict:
+    """{"rows", "count", "next_after"}; next_after is None on the last page."""
+    limit = clamp_limit(limit)
+    rows = [dict(r) for r in _fetch(conn, spec, parse_after(after), filters, limit + 1)]
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "rows": rows,
+        "count": len(rows),
+        "next_after": format_after(rows[-1], spec) if more else None,
+    }
+
+
+def iter_ndjson(db_path, spec: Ledger, after: str = None, limit: int = None, filters: dict = None):
+    """Yield one JSON line per row, STREAM_BATCH rows per keyset query."""
+    cursor = parse_after(after)
+    remaining = int(limit) if limit else None
+    while remaining is None or remaining > 0:
+        n = STREAM_BATCH if remaining is None else min(STREAM_BATCH, remaining)
+        rows = _fetch(db_pool.reader(db_path), spec, cursor, filters, n)
+        if not rows:
+            return
+        yield b"".join(encode(dict(r)) + b"\n" for r in rows)
+        last = rows[-1]
+        cursor = (last[spec.date_col], last["id"])
+        if remaining is not None:
+            remaining -= len(rows)
+        if len(rows) < n:
+            return
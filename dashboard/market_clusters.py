@@ -0,0 +1,248 @@
+"""
+market_clusters.py — ingest-time market → cluster classification
+Rows in kalshi_trades, sports_picks and scalper_feed_holdings carry a persisted
+`cluster` column, so risk views aggregate with a SQL GROUP BY instead of
+keyword-scanning every open position per request.
+
+Kalshi markets are matched against ordered keyword rules (first matching rule
+wins) by one compiled regex; a zero-width lookahead alternation reports every
+keyword occurrence in a single pass. The whole ticker is matched, suffix
+included (KXEPLGAME-26MAR01-SOL hits "sol"), but the series prefix's best
+rule is memoized (KXHIGHNY-26FEB24-T45 → kxhighny), so each call only scans
+the short suffix. Sports picks cluster by sport.
+
+Rules default to DEFAULT_RULES and can be overridden with a JSON file
+(MARKET_CLUSTER_RULES, default data/cluster_rules.json):
+  [{"cluster": "weather", "keywords": ["weather", "temp", "kxhigh"]}, ...]
+When the rules (or CLASSIFIER_REVISION) change, ensure_current() notices the
+new rules version and reclassifies every row in bulk.
+
+Run via:
+  python market_clusters.py               → classify unclassified rows, print cluster counts
+  python market_clusters.py --reclassify  → re-run the rules over every row
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+from datetime import datetime
+
+RULES_PATH = os.environ.get(
+    "MARKET_CLUSTER_RULES", os.path.join(os.path.dirname(__file__), "data", "cluster_rules.json")
+)
+FALLBACK = "other"
+MEMO_SIZE = 50_000
+CLASSIFIER_REVISION = 2  # part of the rules version: bump when matching semantics change
+
+# (cluster, keywords) in priority order — the first rule with any keyword in the market wins
+DEFAULT_RULES = [
+    ("weather", ["weather", "temp", "rain", "snow", "hurricane", "wind"]),
+    ("crypto", ["crypto", "btc", "bitcoin", "eth", "ethereum", "sol", "doge"]),
+    ("economics", ["cpi", "fed", "fomc", "inflation", "unemployment", "gdp", "rates"]),
+    ("politics", ["election", "senate", "house", "president", "trump", "biden"]),
+    ("sports", ["nfl", "nba", "mlb", "nhl", "ncaa", "soccer", "tennis", "golf", "ufc"]),
+]
+
+# table → (text column the cluster is derived from, classifier kind)
+CLUSTER_SOURCES = {
+    "kalshi_trades": ("market", "market"),
+    "scalper_feed_holdings": ("ticker", "market"),
+    "sports_picks": ("sport", "sport"),
+}
+
+CLUSTER_STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS market_cluster_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    rules_version TEXT NOT NULL,
+    reclassified_at TEXT
+)
+"""
+
+
+class Matcher:
+    """Compiled keyword rules with a per-prefix memo of the best rule rank."""
+
+    def __init__(self, rules):
+        self.rules = [(str(cluster), tuple(str(k).lower() for k in keywords if k)) for cluster, keywords in rules]
+        self.version = hashlib.sha1(json.dumps([CLASSIFIER_REVISION, self.rules]).encode()).hexdigest()[:12]
+        self._rank = {}
+        for rank, (_, keywords) in enumerate(self.rules):
+            for keyword in keywords:
+                self._rank.setdefault(keyword, rank)
+        # Alternatives in priority order: at any position the highest-priority keyword matches first
+        alternation = "|".join(re.escape(k) for k in self._rank)
+        self._pattern = re.compile(f"(?=({alternation}))") if alternation else None
+        # A keyword containing "-" could span the prefix/suffix boundary; then only whole texts are safe to scan.
+        self._split_ok = not any("-" in k for k in self._rank)
+        self._memo = {}
+
+    @staticmethod
+    def memo_key(text: str) -> str:
+        t = (text or "").strip().lower()
+        if "-" in t and not any(c.isspace() for c in t):
+            return t.split("-", 1)[0]  # ticker: the series prefix decides the cluster
+        return t
+
+    def _best(self, text: str):
+        """Rank of the highest-priority keyword in text, or None."""
+        best = None
+        if self._pattern is not None:
+            for m in self._pattern.finditer(text):
+                rank = self._rank[m.group(1)]
+                if best is None or rank < best:
+                    best = rank
+                    if rank == 0:
+                        break
+        return best
+
+    def _cluster(self, rank) -> str:
+        return self.rules[rank][0] if rank is not None else FALLBACK
+
+    def match(self, text: str) -> str:
+        return self._cluster(self._best(text))
+
+    def classify(self, text: str) -> str:
+        t = (text or "").strip().lower()
+        key = self.memo_key(t)
+        if key == t or not self._split_ok:
+            return self.match(t)
+        if key in self._memo:
+            best = self._memo[key]
+        else:
+            best = self._best(key)
+            if len(self._memo) < MEMO_SIZE:
+                self._memo[key] = best
+        suffix = self._best(t[len(key):])
+        if suffix is not None and (best is None or suffix < best):
+            best = suffix
+        return self._cluster(best)
+
+
+def sport_cluster(sport: str) -> str:
+    return ((sport or "Sports").strip() or "Sports").lower()
+
+
+# ── RULES ──────────────────────────────────────────────────────────────────────
+def load_rules(path: str = RULES_PATH):
+    if not path or not os.path.exists(path):
+        return DEFAULT_RULES
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return [(r["cluster"], list(r["keywords"])) for r in data]
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"[WARN] Ignoring cluster rules in {path}: {e}")
+        return DEFAULT_RULES
+
+
+_matcher = None
+_rules_mtime = None
+_lock = threading.Lock()
+
+
+def matcher() -> Matcher:
+    """Shared Matcher, rebuilt when the rules file changes."""
+    global _matcher, _rules_mtime
+    try:
+        mtime = os.path.getmtime(RULES_PATH)
+    except OSError:
+        mtime = None
+    with _lock:
+        if _matcher is None or mtime != _rules_mtime:
+            _matcher = Matcher(load_rules())
+            _rules_mtime = mtime
+        return _matcher
+
+
+def classify(market: str) -> str:
+    return matcher().classify(market)
+
+
+def _cluster_for(kind: str, m: Matcher, text: str) -> str:
+    return sport_cluster(text) if kind == "sport" else m.classify(text)
+
+
+# ── SCHEMA ─────────────────────────────────────────────────────────────────────
+def _table_exists(conn, table: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone() is not None
+
+
+def add_cluster_columns(conn):
+    """Add `cluster` (plus a partial index on unclassified rows) to every source table present."""
+    conn.execute(CLUSTER_STATE_SCHEMA)
+    for table in CLUSTER_SOURCES:
+        if not _table_exists(conn, table):
+            continue
+        cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+        if "cluster" not in cols:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN cluster TEXT")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_unclustered ON {table}(cluster) WHERE cluster IS NULL")
+
+
+# ── BULK JOBS ──────────────────────────────────────────────────────────────────
+def _classify_rows(conn, table: str, m: Matcher, only_missing: bool) -> int:
+    column, kind = CLUSTER_SOURCES[table]
+    where = "WHERE cluster IS NULL" if only_missing else ""
+    rows = conn.execute(f"SELECT rowid, {column}, cluster FROM {table} {where}").fetchall()
+    updates = []
+    for rowid, text, current in rows:
+        cluster = _cluster_for(kind, m, text)
+        if cluster != current:
+            updates.append((cluster, rowid))
+    conn.executemany(f"UPDATE {table} SET cluster = ? WHERE rowid = ?", updates)
+    return len(updates)
+
+
+def _source_tables(conn):
+    """Source tables that exist and already have the cluster column."""
+    return [
+        t for t in CLUSTER_SOURCES
+        if _table_exists(conn, t) and any(r[1] == "cluster" for r in conn.execute(f"PRAGMA table_info({t})"))
+    ]
+
+
+def classify_pending(conn) -> int:
+    """Fill cluster for rows written without one (legacy writers, bulk imports)."""
+    m = matcher()
+    return sum(_classify_rows(conn, t, m, only_missing=True) for t in _source_tables(conn))
+
+
+def reclassify(conn) -> dict:
+    """Re-run the current rules over every row; returns changed rows per table."""
+    m = matcher()
+    changed = {t: _classify_rows(conn, t, m, only_missing=False) for t in _source_tables(conn)}
+    conn.execute(
+        "INSERT INTO market_cluster_state (id, rules_version, reclassified_at) VALUES (1, ?, ?) "
+        "ON CONFLICT(id) DO UPDATE SET rules_version=excluded.rules_version, reclassified_at=excluded.reclassified_at",
+        (m.version, datetime.utcnow().isoformat() + "Z"),
+    )
+    return changed
+
+
+def ensure_current(conn) -> int:
+    """Reclassify everything if the rules changed since the last run, else classify new rows."""
+    add_cluster_columns(conn)
+    row = conn.execute("SELECT rules_version FROM market_cluster_state WHERE id = 1").fetchone()
+    if row is None or row[0] != matcher().version:
+        changed = reclassify(conn)
+        print(f"[Clusters] Rules {matcher().version}: reclassified {changed}")
+        return sum(changed.values())
+    return classify_pending(conn)
+
+
+if __name__ == "__main__":
+    import db_pool
+    db_path = os.environ.get("DASHBOARD_DB", os.path.join(os.path.dirname(__file__), "data", "northstar.db"))
+    with db_pool.writer(db_path) as conn:
+        add_cluster_columns(conn)
+        if "--reclassify" in sys.argv:
+            print(f"[Clusters] Reclassified {reclassify(conn)}")
+        else:
+            print(f"[Clusters] Classified {ensure_current(conn)} rows")
+        for table in _source_tables(conn):
+            counts = conn.execute(
+                f"SELECT cluster, COUNT(*) FROM {table} GROUP BY cluster ORDER BY COUNT(*) DESC"
+            ).fetchall()
+            print(f"[Clusters] {table}: " + ", ".join(f"{c}={n}" for c, n in counts))
@@ -0,0 +1,830 @@
+"""
+migrations.py — canonical northstar.db schema + versioned migration runner
+Every entry point (app.py, database.py, auto_populate.py, init_data.py) calls
+migrate() instead of carrying its own CREATE TABLE block. The applied version
+is tracked in PRAGMA user_version, so existing databases upgrade in place.
+
+Run via:
+  python migrations.py            → migrate DASHBOARD_DB
+  python migrations.py --check    → EXPLAIN QUERY PLAN regression check for hot queries
+"""
+import os
+import sqlite3
+import sys
+import zlib
+
+import db_pool
+
+DEFAULT_DB = os.environ.get("DASHBOARD_DB", os.path.join(os.path.dirname(__file__), "data", "northstar.db"))
+
+# ── CANONICAL SCHEMA (v1) ──────────────────────────────────────────────────────
+BASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT DEFAULT (datetime('now')),
+    bet_date TEXT NOT NULL,
+    sport TEXT NOT NULL,
+    game TEXT NOT NULL,
+    book TEXT DEFAULT 'Kalshi',
+    bet_type TEXT DEFAULT 'ML',
+    stake REAL NOT NULL,
+    odds TEXT,
+    odds_decimal REAL,
+    result TEXT DEFAULT 'PENDING',
+    profit_loss REAL DEFAULT 0,
+    edge_pct REAL,
+    notes TEXT
+);
+
+CREATE TABLE IF NOT EXISTS john_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT DEFAULT (datetime('now')),
+    job_date TEXT NOT NULL,
+    client_name TEXT NOT NULL,
+    job_description TEXT,
+    status TEXT DEFAULT 'quoted',
+    invoice_amount REAL NOT NULL,
+    paid INTEGER DEFAULT 0,
+    paid_date TEXT,
+    notes TEXT
+);
+
+CREATE TABLE IF NOT EXISTS api_usage (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT DEFAULT (datetime('now')),
+    usage_date TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    model TEXT,
+    tokens_in INTEGER DEFAULT 0,
+    tokens_out INTEGER DEFAULT 0,
+    cost_usd REAL NOT NULL,
+    notes TEXT
+);
+
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT DEFAULT (datetime('now')),
+    expense_date TEXT NOT NULL,
+    segment TEXT NOT NULL,
+    description TEXT NOT NULL,
+    amount REAL NOT NULL,
+    category TEXT
+);
+
+CREATE TABLE IF NOT EXISTS revenue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT DEFAULT (datetime('now')),
+    revenue_date TEXT NOT NULL,
+    segment TEXT NOT NULL,
+    description TEXT NOT NULL,
+    amount REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS john_leads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT DEFAULT (datetime('now')),
+    lead_date TEXT NOT NULL,
+    source TEXT,
+    client_name TEXT NOT NULL,
+    service TEXT,
+    estimated_value REAL DEFAULT 0,
+    status TEXT DEFAULT 'new',
+    notes TEXT,
+    external_id TEXT UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS kalshi_snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    snapshot_ts TEXT NOT NULL UNIQUE,
+    snap_date TEXT NOT NULL,
+    balance_cents INTEGER DEFAULT 0,
+    daily_pnl_cents INTEGER DEFAULT 0,
+    total_pnl_cents INTEGER DEFAULT 0,
+    open_positions INTEGER DEFAULT 0,
+    total_orders INTEGER DEFAULT 0,
+    total_fills INTEGER DEFAULT 0,
+    win_count INTEGER DEFAULT 0,
+    loss_count INTEGER DEFAULT 0,
+    total_fees_cents INTEGER DEFAULT 0,
+    weather_pnl_cents INTEGER DEFAULT 0,
+    crypto_pnl_cents INTEGER DEFAULT 0,
+    econ_pnl_cents INTEGER DEFAULT 0,
+    mm_pnl_cents INTEGER DEFAULT 0,
+    lip_rewards_cents INTEGER DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS kalshi_trades (
+    trade_date TEXT,
+    contract_id TEXT,
+    market TEXT,
+    direction TEXT,
+    entry_price REAL,
+    exit_price REAL,
+    num_contracts REAL,
+    cost_basis REAL,
+    pnl_realized REAL,
+    pnl_unrealized REAL,
+    status TEXT,
+    expiry_date TEXT,
+    fees REAL,
+    notes TEXT
+);
+
+CREATE TABLE IF NOT EXISTS sports_picks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pick_date TEXT NOT NULL,
+    sport TEXT,
+    game TEXT NOT NULL,
+    pick TEXT,
+    ml INTEGER,
+    open_ml INTEGER,
+    edge_val REAL,
+    model_prob REAL,
+    framing_type TEXT,
+    edge_bucket TEXT,
+    confidence TEXT,
+    result TEXT DEFAULT 'PENDING',
+    stake REAL DEFAULT 0,
+    profit_loss REAL DEFAULT 0,
+    UNIQUE(pick_date, game, pick)
+);
+
+CREATE TABLE IF NOT EXISTS sports_parlays (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT,
+    name TEXT,
+    legs TEXT,
+    odds TEXT,
+    stake REAL,
+    confidence TEXT,
+    result TEXT DEFAULT 'PENDING',
+    profit REAL DEFAULT 0,
+    logged_at TEXT,
+    settled_at TEXT,
+    UNIQUE(date, name)
+);
+
+CREATE TABLE IF NOT EXISTS sync_run_audit (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    completed_at TEXT,
+    status TEXT NOT NULL,
+    records_synced INTEGER DEFAULT 0,
+    error_message TEXT,
+    details_json TEXT
+);
+"""
+
+# ── HOT-PATH INDEXES (v3) ──────────────────────────────────────────────────────
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_kalshi_snapshots_date_ts ON kalshi_snapshots(snap_date, snapshot_ts);
+CREATE INDEX IF NOT EXISTS idx_api_usage_provider_date ON api_usage(lower(provider), usage_date);
+CREATE INDEX IF NOT EXISTS idx_api_usage_date_provider_model ON api_usage(usage_date, provider, model);
+CREATE INDEX IF NOT EXISTS idx_sync_run_audit_source_id
+    ON sync_run_audit(source, id, status, completed_at, started_at);
+CREATE INDEX IF NOT EXISTS idx_sports_picks_result ON sports_picks(result, profit_loss, stake);
+CREATE INDEX IF NOT EXISTS idx_sports_picks_date_id ON sports_picks(pick_date, id);
+CREATE INDEX IF NOT EXISTS idx_sports_picks_pending
+    ON sports_picks(pick_date) WHERE COALESCE(result, 'PENDING') = 'PENDING';
+CREATE INDEX IF NOT EXISTS idx_kalshi_trades_status ON kalshi_trades(status);
+CREATE INDEX IF NOT EXISTS idx_kalshi_trades_trade_date ON kalshi_trades(trade_date);
+CREATE INDEX IF NOT EXISTS idx_kalshi_trades_open
+    ON kalshi_trades(market) WHERE status IS NULL OR status != 'Settled';
+CREATE INDEX IF NOT EXISTS idx_john_jobs_job_date ON john_jobs(job_date);
+CREATE INDEX IF NOT EXISTS idx_john_leads_lead_date ON john_leads(lead_date);
+"""
+
+
+# ── LEDGER KEYSET INDEXES (v6) ─────────────────────────────────────────────────
+# Filtered keyset pages (ledgers.py) seek on (filter, date) and read in order;
+# the (status, trade_date) index also covers status-only lookups.
+LEDGER_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_kalshi_trades_status_date ON kalshi_trades(status, trade_date);
+DROP INDEX IF EXISTS idx_kalshi_trades_status;
+CREATE INDEX IF NOT EXISTS idx_kalshi_trades_market_date ON kalshi_trades(market, trade_date);
+CREATE INDEX IF NOT EXISTS idx_john_jobs_status_date ON john_jobs(status, job_date);
+CREATE INDEX IF NOT EXISTS idx_john_leads_status_date ON john_leads(status, lead_date);
+CREATE INDEX IF NOT EXISTS idx_sports_picks_result_date ON sports_picks(result, pick_date);
+"""
+
+
+# ── SESSION-LOG INGEST STATE (v4) ──────────────────────────────────────────────
+USAGE_LOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage_log_cursors (
+    path TEXT PRIMARY KEY,
+    inode INTEGER,
+    size INTEGER,
+    mtime_ns INTEGER,
+    offset INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS usage_log_totals (
+    path TEXT NOT NULL,
+    usage_date TEXT NOT NULL,
+    model TEXT NOT NULL,
+    input INTEGER DEFAULT 0,
+    output INTEGER DEFAULT 0,
+    cache_read INTEGER DEFAULT 0,
+    cache_write INTEGER DEFAULT 0,
+    PRIMARY KEY (path, usage_date, model)
+);
+
+CREATE INDEX IF NOT EXISTS idx_usage_log_totals_day_model ON usage_log_totals(usage_date, model);
+"""
+
+
+# ── FROZEN FEATURE SCHEMAS ─────────────────────────────────────────────────────
+# Copied here as applied: editing a feature module must never change what an
+# already-applied migration does. Runtime code keeps its own (possibly newer) copy.
+
+# v2 — kpi_store materialized tables
+KPI_SCHEMA_V2 = """
+CREATE TABLE IF NOT EXISTS kpi_daily_eod (
+    snap_date TEXT PRIMARY KEY,
+    snapshot_ts TEXT NOT NULL,
+    balance_cents INTEGER DEFAULT 0,
+    total_pnl_cents INTEGER DEFAULT 0,
+    total_fills INTEGER DEFAULT 0,
+    win_count INTEGER DEFAULT 0,
+    loss_count INTEGER DEFAULT 0,
+    open_positions INTEGER DEFAULT 0,
+    total_orders INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS kpi_periods (
+    period TEXT PRIMARY KEY,
+    as_of_date TEXT NOT NULL,
+    source_snapshot_ts TEXT,
+    start_ts TEXT,
+    end_ts TEXT,
+    pnl_usd REAL DEFAULT 0,
+    balance_delta_usd REAL DEFAULT 0,
+    fills INTEGER DEFAULT 0,
+    wins INTEGER DEFAULT 0,
+    losses INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS kpi_totals (
+    scope TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL DEFAULT 0,
+    updated_at TEXT DEFAULT (datetime('now')),
+    PRIMARY KEY (scope, metric)
+);
+"""
+
+# v7 — snapshot_rollups tiers
+ROLLUP_SCHEMA_V7 = """
+CREATE TABLE IF NOT EXISTS kalshi_snapshot_rollups (
+    tier TEXT NOT NULL,
+    bucket_ts TEXT NOT NULL,
+    snap_date TEXT NOT NULL,
+    first_ts TEXT NOT NULL,
+    last_ts TEXT NOT NULL,
+    samples INTEGER DEFAULT 0,
+    balance_open INTEGER, balance_high INTEGER, balance_low INTEGER, balance_close INTEGER,
+    pnl_open INTEGER, pnl_high INTEGER, pnl_low INTEGER, pnl_close INTEGER,
+    fills_open INTEGER, fills_high INTEGER, fills_low INTEGER, fills_close INTEGER,
+    win_count INTEGER DEFAULT 0,
+    loss_count INTEGER DEFAULT 0,
+    open_positions INTEGER DEFAULT 0,
+    total_orders INTEGER DEFAULT 0,
+    weather_pnl_cents INTEGER DEFAULT 0,
+    crypto_pnl_cents INTEGER DEFAULT 0,
+    econ_pnl_cents INTEGER DEFAULT 0,
+    mm_pnl_cents INTEGER DEFAULT 0,
+    lip_rewards_cents INTEGER DEFAULT 0,
+    PRIMARY KEY (tier, bucket_ts)
+) WITHOUT ROWID
+"""
+
+# v8 — market_clusters state; rows are classified at runtime by market_clusters.ensure_current()
+CLUSTER_STATE_SCHEMA_V8 = """
+CREATE TABLE IF NOT EXISTS market_cluster_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    rules_version TEXT NOT NULL,
+    reclassified_at TEXT
+)
+"""
+CLUSTER_TABLES_V8 = ("kalshi_trades", "scalper_feed_holdings", "sports_picks")
+
+# v9 — exposure ledger tables, source/fold triggers and the initial build
+EXPOSURE_LEDGER_V9 = """
+CREATE TABLE IF NOT EXISTS exposure_ledger (
+    source TEXT NOT NULL,
+    label TEXT NOT NULL,
+    cluster TEXT NOT NULL,
+    exposure REAL DEFAULT 0,
+    positions INTEGER DEFAULT 0,
+    missing INTEGER DEFAULT 0,
+    PRIMARY KEY (source, label, cluster)
+);
+CREATE TABLE IF NOT EXISTS exposure_by_market (
+    label TEXT PRIMARY KEY,
+    exposure REAL DEFAULT 0,
+    positions INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_exposure_by_market_exposure ON exposure_by_market(exposure);
+CREATE TABLE IF NOT EXISTS exposure_by_cluster (
+    cluster TEXT PRIMARY KEY,
+    exposure REAL DEFAULT 0,
+    positions INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS exposure_cells (
+    source TEXT NOT NULL,
+    cluster TEXT NOT NULL,
+    exposure REAL DEFAULT 0,
+    positions INTEGER DEFAULT 0,
+    PRIMARY KEY (source, cluster)
+);
+CREATE TABLE IF NOT EXISTS exposure_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total REAL DEFAULT 0,
+    sum_sq REAL DEFAULT 0,
+    positions INTEGER DEFAULT 0,
+    missing INTEGER DEFAULT 0
+);
+INSERT OR IGNORE INTO exposure_totals (id) VALUES (1);
+CREATE TABLE IF NOT EXISTS exposure_history (
+    ts TEXT PRIMARY KEY,
+    total_open_usd REAL,
+    open_positions INTEGER,
+    hhi REAL,
+    top_market_share REAL,
+    top_cluster_share REAL,
+    top3_market_share REAL
+);
+CREATE TRIGGER IF NOT EXISTS trg_kalshi_trades_exposure_ins AFTER INSERT ON kalshi_trades BEGIN
+    INSERT INTO exposure_ledger (source, label, cluster, exposure, positions, missing)
+    SELECT 'kalshi', COALESCE(NULLIF(TRIM(NEW.market), ''), 'Unknown Market'), COALESCE(NEW.cluster, ''), (CASE WHEN COALESCE(NEW.cost_basis, 0) > 0 THEN NEW.cost_basis ELSE COALESCE(NEW.entry_price, 0) * COALESCE(NEW.num_contracts, 0) END), 1,
+           (CASE WHEN (CASE WHEN COALESCE(NEW.cost_basis, 0) > 0 THEN NEW.cost_basis ELSE COALESCE(NEW.entry_price, 0) * COALESCE(NEW.num_contracts, 0) END) <= 0 THEN 1 ELSE 0 END)
+    WHERE (NEW.status IS NULL OR NEW.status != 'Settled')
+    ON CONFLICT(source, label, cluster) DO UPDATE SET
+        exposure = exposure + excluded.exposure,
+        positions = positions + excluded.positions,
+        missing = missing + excluded.missing;
+ END;
+
+CREATE TRIGGER IF NOT EXISTS trg_kalshi_trades_exposure_del AFTER DELETE ON kalshi_trades BEGIN
+    INSERT INTO exposure_ledger (source, label, cluster, exposure, positions, missing)
+    SELECT 'kalshi', COALESCE(NULLIF(TRIM(OLD.market), ''), 'Unknown Market'), COALESCE(OLD.cluster, ''), -(CASE WHEN COALESCE(OLD.cost_basis, 0) > 0 THEN OLD.cost_basis ELSE COALESCE(OLD.entry_price, 0) * COALESCE(OLD.num_contracts, 0) END), -1,
+           -(CASE WHEN (CASE WHEN COALESCE(OLD.cost_basis, 0) > 0 THEN OLD.cost_basis ELSE COALESCE(OLD.entry_price, 0) * COALESCE(OLD.num_contracts, 0) END) <= 0 THEN 1 ELSE 0 END)
+    WHERE (OLD.status IS NULL OR OLD.status != 'Settled')
+    ON CONFLICT(source, label, cluster) DO UPDATE SET
+        exposure = exposure + excluded.exposure,
+        positions = positions + excluded.positions,
+        missing = missing + excluded.missing;
+ END;
+
+CREATE TRIGGER IF NOT EXISTS trg_kalshi_trades_exposure_upd AFTER UPDATE OF market, status, cost_basis, entry_price, num_contracts, cluster ON kalshi_trades BEGIN
+    INSERT INTO exposure_ledger (source, label, cluster, exposure, positions, missing)
+    SELECT 'kalshi', COALESCE(NULLIF(TRIM(OLD.market), ''), 'Unknown Market'), COALESCE(OLD.cluster, ''), -(CASE WHEN COALESCE(OLD.cost_basis, 0) > 0 THEN OLD.cost_basis ELSE COALESCE(OLD.entry_price, 0) * COALESCE(OLD.num_contracts, 0) END), -1,
+           -(CASE WHEN (CASE WHEN COALESCE(OLD.cost_basis, 0) > 0 THEN OLD.cost_basis ELSE COALESCE(OLD.entry_price, 0) * COALESCE(OLD.num_contracts, 0) END) <= 0 THEN 1 ELSE 0 END)
+    WHERE (OLD.status IS NULL OR OLD.status != 'Settled')
+    ON CONFLICT(source, label, cluster) DO UPDATE SET
+        exposure = exposure + excluded.exposure,
+        positions = positions + excluded.positions,
+        missing = missing + excluded.missing;
+
+    INSERT INTO exposure_ledger (source, label, cluster, exposure, positions, missing)
+    SELECT 'kalshi', COALESCE(NULLIF(TRIM(NEW.market), ''), 'Unknown Market'), COALESCE(NEW.cluster, ''), (CASE WHEN COALESCE(NEW.cost_basis, 0) > 0 THEN NEW.cost_basis ELSE COALESCE(NEW.entry_price, 0) * COALESCE(NEW.num_contracts, 0) END), 1,
+           (CASE WHEN (CASE WHEN COALESCE(NEW.cost_basis, 0) > 0 THEN NEW.cost_basis ELSE COALESCE(NEW.entry_price, 0) * COALESCE(NEW.num_contracts, 0) END) <= 0 THEN 1 ELSE 0 END)
+    WHERE (NEW.status IS NULL OR NEW.status != 'Settled')
+    ON CONFLICT(source, label, cluster) DO UPDATE SET
+        exposure = exposure + excluded.exposure,
+        positions = positions + excluded.positions,
+        missing = missing + excluded.missing;
+ END;
+
+CREATE TRIGGER IF NOT EXISTS trg_sports_picks_exposure_ins AFTER INSERT ON sports_picks BEGIN
+    INSERT INTO exposure_ledger (source, label, cluster, exposure, positions, missing)
+    SELECT 'sports', TRIM(COALESCE(NULLIF(TRIM(NEW.game), ''), 'Unknown Game') || ' ' || TRIM(COALESCE(NEW.pick, ''))), COALESCE(NEW.cluster, LOWER(COALESCE(NULLIF(TRIM(NEW.sport), ''), 'Sports'))), COALESCE(NEW.stake, 0), 1,
+           (CASE WHEN COALESCE(NEW.stake, 0) <= 0 THEN 1 ELSE 0 END)
+    WHERE (COALESCE(NEW.result, 'PENDING') = 'PENDING')
+    ON CONFLICT(source, label, cluster) DO UPDATE SET
+        exposure = exposure + excluded.exposure,
+        positions = positions + excluded.positions,
+        missing = missing + excluded.missing;
+ END;
+
+CREATE TRIGGER IF NOT EXISTS trg_sports_picks_exposure_del AFTER DELETE ON sports_picks BEGIN
+    INSERT INTO exposure_ledger (source, label, cluster, exposure, positions, missing)
+    SELECT 'sports', TRIM(COALESCE(NULLIF(TRIM(OLD.game), ''), 'Unknown Game') || ' ' || TRIM(COALESCE(OLD.pick, ''))), COALESCE(OLD.cluster, LOWER(COALESCE(NULLIF(TRIM(OLD.sport), ''), 'Sports'))), -COALESCE(OLD.stake, 0), -1,
+           -(CASE WHEN COALESCE(OLD.stake, 0) <= 0 THEN 1 ELSE 0 END)
+    WHERE (COALESCE(OLD.result, 'PENDING') = 'PENDING')
+    ON CONFLICT(source, label, cluster) DO UPDATE SET
+        exposure = exposure + excluded.exposure,
+        positions = positions + excluded.positions,
+        missing = missing + excluded.missing;
+ END;
+
+CREATE TRIGGER IF NOT EXISTS trg_sports_picks_exposure_upd AFTER UPDATE OF sport, game, pick, stake, result, cluster ON sports_picks BEGIN
+    INSERT INTO exposure_ledger (source, label, cluster, exposure, positions, missing)
+    SELECT 'sports', TRIM(COALESCE(NULLIF(TRIM(OLD.game), ''), 'Unknown Game') || ' ' || TRIM(COALESCE(OLD.pick, ''))), COALESCE(OLD.cluster, LOWER(COALESCE(NULLIF(TRIM(OLD.sport), ''), 'Sports'))), -COALESCE(OLD.stake, 0), -1,
+           -(CASE WHEN COALESCE(OLD.stake, 0) <= 0 THEN 1 ELSE 0 END)
+    WHERE (COALESCE(OLD.result, 'PENDING') = 'PENDING')
+    ON CONFLICT(source, label, cluster) DO UPDATE SET
+        exposure = exposure + excluded.exposure,
+        positions = positions + excluded.positions,
+        missing = missing + excluded.missing;
+
+    INSERT INTO exposure_ledger (source, label, cluster, exposure, positions, missing)
+    SELECT 'sports', TRIM(COALESCE(NULLIF(TRIM(NEW.game), ''), 'Unknown Game') || ' ' || TRIM(COALESCE(NEW.pick, ''))), COALESCE(NEW.cluster, LOWER(COALESCE(NULLIF(TRIM(NEW.sport), ''), 'Sports'))), COALESCE(NEW.stake, 0), 1,
+           (CASE WHEN COALESCE(NEW.stake, 0) <= 0 THEN 1 ELSE 0 END)
+    WHERE (COALESCE(NEW.result, 'PENDING') = 'PENDING')
+    ON CONFLICT(source, label, cluster) DO UPDATE SET
+        exposure = exposure + excluded.exposure,
+        positions = positions + excluded.positions,
+        missing = missing + excluded.missing;
+ END;
+
+CREATE TRIGGER IF NOT EXISTS trg_exposure_ledger_ins AFTER INSERT ON exposure_ledger BEGIN
+    UPDATE exposure_totals SET
+        sum_sq = sum_sq + (2 * COALESCE((SELECT exposure FROM exposure_by_market WHERE label = NEW.label), 0) + NEW.exposure) * NEW.exposure,
+        total = total + NEW.exposure,
+        positions = positions + NEW.positions,
+        missing = missing + NEW.missing
+    WHERE id = 1;
+    INSERT INTO exposure_by_market (label, exposure, positions) VALUES (NEW.label, NEW.exposure, NEW.positions)
+    ON CONFLICT(label) DO UPDATE SET exposure = exposure + excluded.exposure, positions = positions + excluded.positions;
+    DELETE FROM exposure_by_market WHERE label = NEW.label AND positions <= 0;
+    INSERT INTO exposure_by_cluster (cluster, exposure, positions) VALUES (NEW.cluster, NEW.exposure, NEW.positions)
+    ON CONFLICT(cluster) DO UPDATE SET exposure = exposure + excluded.exposure, positions = positions + excluded.positions;
+    DELETE FROM exposure_by_cluster WHERE cluster = NEW.cluster AND positions <= 0;
+    INSERT INTO exposure_cells (source, cluster, exposure, positions) VALUES (NEW.source, NEW.cluster, NEW.exposure, NEW.positions)
+    ON CONFLICT(source, cluster) DO UPDATE SET exposure = exposure + excluded.exposure, positions = positions + excluded.positions;
+    DELETE FROM exposure_cells WHERE source = NEW.source AND cluster = NEW.cluster AND positions <= 0;
+ END;
+
+CREATE TRIGGER IF NOT EXISTS trg_exposure_ledger_upd AFTER UPDATE ON exposure_ledger BEGIN
+    UPDATE exposure_totals SET
+        sum_sq = sum_sq + (2 * COALESCE((SELECT exposure FROM exposure_by_market WHERE label = NEW.label), 0) + (NEW.exposure - OLD.exposure)) * (NEW.exposure - OLD.exposure),
+        total = total + (NEW.exposure - OLD.exposure),
+        positions = positions + (NEW.positions - OLD.positions),
+        missing = missing + (NEW.missing - OLD.missing)
+    WHERE id = 1;
+    INSERT INTO exposure_by_market (label, exposure, positions) VALUES (NEW.label, (NEW.exposure - OLD.exposure), (NEW.positions - OLD.positions))
+    ON CONFLICT(label) DO UPDATE SET exposure = exposure + excluded.exposure, positions = positions + excluded.positions;
+    DELETE FROM exposure_by_market WHERE label = NEW.label AND positions <= 0;
+    INSERT INTO exposure_by_cluster (cluster, exposure, positions) VALUES (NEW.cluster, (NEW.exposure - OLD.exposure), (NEW.positions - OLD.positions))
+    ON CONFLICT(cluster) DO UPDATE SET exposure = exposure + excluded.exposure, positions = positions + excluded.positions;
+    DELETE FROM exposure_by_cluster WHERE cluster = NEW.cluster AND positions <= 0;
+    INSERT INTO exposure_cells (source, cluster, exposure, positions) VALUES (NEW.source, NEW.cluster, (NEW.exposure - OLD.exposure), (NEW.positions - OLD.positions))
+    ON CONFLICT(source, cluster) DO UPDATE SET exposure = exposure + excluded.exposure, positions = positions + excluded.positions;
+    DELETE FROM exposure_cells WHERE source = NEW.source AND cluster = NEW.cluster AND positions <= 0;
+ DELETE FROM exposure_ledger WHERE source = NEW.source AND label = NEW.label AND cluster = NEW.cluster AND positions <= 0; END;
+
+INSERT INTO exposure_ledger (source, label, cluster, exposure, positions, missing)
+SELECT 'kalshi', COALESCE(NULLIF(TRIM(market), ''), 'Unknown Market') AS label, COALESCE(cluster, '') AS cluster, SUM((CASE WHEN COALESCE(cost_basis, 0) > 0 THEN cost_basis ELSE COALESCE(entry_price, 0) * COALESCE(num_contracts, 0) END)), COUNT(*),
+       SUM(CASE WHEN (CASE WHEN COALESCE(cost_basis, 0) > 0 THEN cost_basis ELSE COALESCE(entry_price, 0) * COALESCE(num_contracts, 0) END) <= 0 THEN 1 ELSE 0 END)
+FROM kalshi_trades
+WHERE (status IS NULL OR status != 'Settled')
+GROUP BY 2, 3;
+
+INSERT INTO exposure_ledger (source, label, cluster, exposure, positions, missing)
+SELECT 'sports', TRIM(COALESCE(NULLIF(TRIM(game), ''), 'Unknown Game') || ' ' || TRIM(COALESCE(pick, ''))) AS label, COALESCE(cluster, LOWER(COALESCE(NULLIF(TRIM(sport), ''), 'Sports'))) AS cluster, SUM(COALESCE(stake, 0)), COUNT(*),
+       SUM(CASE WHEN COALESCE(stake, 0) <= 0 THEN 1 ELSE 0 END)
+FROM sports_picks
+WHERE (COALESCE(result, 'PENDING') = 'PENDING')
+GROUP BY 2, 3;
+"""
+
+# v11 — rollup close of daily P&L plus the raw-or-rollup history view
+ROLLUP_HISTORY_V11 = """
+CREATE VIEW IF NOT EXISTS kalshi_snapshot_history AS
+SELECT id, snapshot_ts, snap_date, balance_cents, daily_pnl_cents, total_pnl_cents, total_fills,
+       open_positions, 'raw' AS tier
+FROM kalshi_snapshots
+UNION ALL
+SELECT NULL, last_ts, snap_date, balance_close, daily_pnl_cents, pnl_close, fills_close,
+       open_positions, tier
+FROM kalshi_snapshot_rollups
+WHERE last_ts < COALESCE((SELECT MIN(snapshot_ts) FROM kalshi_snapshots), '~')
+  AND (tier = '15min'
+       OR (tier = 'hourly' AND last_ts < COALESCE(
+             (SELECT MIN(first_ts) FROM kalshi_snapshot_rollups WHERE tier = '15min'), '~'))
+       OR (tier = 'daily' AND last_ts < COALESCE(
+             (SELECT MIN(first_ts) FROM kalshi_snapshot_rollups WHERE tier IN ('15min', 'hourly')), '~')))
+"""
+
+# v10 — compressed scalper feed payloads
+FEED_PAYLOAD_DICTS_V10 = """
+CREATE TABLE IF NOT EXISTS scalper_feed_payload_dicts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    codec TEXT NOT NULL,
+    dict BLOB NOT NULL,
+    samples INTEGER,
+    created_at TEXT DEFAULT (datetime('now'))
+)
+"""
+
+
+def _add_audit_retry_columns(conn):
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(sync_run_audit)").fetchall()}
+    if "attempts" not in cols:
+        conn.execute("ALTER TABLE sync_run_audit ADD COLUMN attempts INTEGER DEFAULT 1")
+    if "duration_ms" not in cols:
+        conn.execute("ALTER TABLE sync_run_audit ADD COLUMN duration_ms INTEGER")
+
+
+def _ensure_snapshot_ts_index(conn):
+    """Older DBs created kalshi_snapshots without UNIQUE(snapshot_ts); index it if so."""
+    for idx in conn.execute("PRAGMA index_list(kalshi_snapshots)").fetchall():
+        cols = [c[2] for c in conn.execute(f"PRAGMA index_info('{idx[1]}')").fetchall()]
+        if cols[:1] == ["snapshot_ts"]:
+            return
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_kalshi_snapshots_ts ON kalshi_snapshots(snapshot_ts)")
+
+
+def _try_indexes(conn, sql):
+    for stmt in sql.split(";"):
+        if not stmt.strip():
+            continue
+        try:
+            conn.execute(stmt)
+        except sqlite3.OperationalError as e:
+            # Legacy seed scripts (init_data.py) created some tables with other columns.
+            print(f"[DB] Skipped index ({e}): {' '.join(stmt.split())[:80]}")
+
+
+def _add_indexes(conn):
+    _try_indexes(conn, INDEXES)
+    _ensure_snapshot_ts_index(conn)
+    conn.execute("ANALYZE")
+
+
+def _add_ledger_indexes(conn):
+    _try_indexes(conn, LEDGER_INDEXES)
+    conn.execute("ANALYZE")
+
+
+def _table_exists(conn, table: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone() is not None
+
+
+def _columns(conn, table: str) -> set:
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+
+
+def _add_market_clusters(conn):
+    conn.execute(CLUSTER_STATE_SCHEMA_V8)
+    for table in CLUSTER_TABLES_V8:
+        if not _table_exists(conn, table):
+            continue
+        if "cluster" not in _columns(conn, table):
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN cluster TEXT")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_unclustered ON {table}(cluster) WHERE cluster IS NULL")
+
+
+def _compress_feed_payloads(conn):
+    """payload_json TEXT → zlib payload BLOB in place; dictionaries are trained later at runtime."""
+    conn.execute(FEED_PAYLOAD_DICTS_V10)
+    if "payload_json" not in _columns(conn, "scalper_feed_snapshots"):
+        return
+    cols = _columns(conn, "scalper_feed_snapshots")
+    for column, decl in (("payload", "BLOB"), ("payload_codec", "TEXT"), ("payload_dict", "INTEGER")):
+        if column not in cols:
+            conn.execute(f"ALTER TABLE scalper_feed_snapshots ADD COLUMN {column} {decl}")
+    last = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, payload_json FROM scalper_feed_snapshots WHERE id > ? AND payload IS NULL ORDER BY id LIMIT 500",
+            (last,),
+        ).fetchall()
+        if not rows:
+            break
+        conn.executemany(
+            "UPDATE scalper_feed_snapshots SET payload=?, payload_codec='zlib', payload_dict=NULL WHERE id=?",
+            [(zlib.compress((text or "").encode("utf-8"), 9), rid) for rid, text in rows],
+        )
+        last = rows[-1][0]
+    conn.execute("ALTER TABLE scalper_feed_snapshots DROP COLUMN payload_json")
+
+
+def _add_snapshot_history(conn):
+    if "daily_pnl_cents" not in _columns(conn, "kalshi_snapshot_rollups"):
+        conn.execute("ALTER TABLE kalshi_snapshot_rollups ADD COLUMN daily_pnl_cents INTEGER")
+        # buckets whose closing raw row still exists
+        conn.execute(
+            "UPDATE kalshi_snapshot_rollups SET daily_pnl_cents = "
+            "(SELECT s.daily_pnl_cents FROM kalshi_snapshots s WHERE s.snapshot_ts = kalshi_snapshot_rollups.last_ts)"
+        )
+    conn.execute(ROLLUP_HISTORY_V11)
+
+
+def _statements(sql: str):
+    """Split a script into statements, keeping trigger bodies (BEGIN ...; END) whole."""
+    buf = ""
+    for line in sql.splitlines(keepends=True):
+        buf += line
+        if sqlite3.complete_statement(buf):
+            if buf.strip().rstrip(";").strip():
+                yield buf
+            buf = ""
+    if buf.strip():
+        yield buf
+
+
+def _run_script(sql):
+    def apply(conn):
+        for stmt in _statements(sql):
+            conn.execute(stmt)
+    return apply
+
+
+# (version, description, fn(conn)) — append only; never edit an applied entry.
+MIGRATIONS = [
+    (1, "canonical base tables", _run_script(BASE_SCHEMA)),
+    (2, "materialized KPI tables", _run_script(KPI_SCHEMA_V2)),
+    (3, "hot-path covering and expression indexes", _add_indexes),
+    (4, "session-log ingest cursors and accumulators", _run_script(USAGE_LOG_SCHEMA)),
+    (5, "sync_run_audit attempts and duration", _add_audit_retry_columns),
+    (6, "ledger keyset filter indexes", _add_ledger_indexes),
+    (7, "kalshi_snapshots tiered rollups", _run_script(ROLLUP_SCHEMA_V7)),
+    (8, "persisted market clusters", _add_market_clusters),
+    (9, "trigger-maintained open exposure ledger", _run_script(EXPOSURE_LEDGER_V9)),
+    (10, "compressed scalper feed payloads", _compress_feed_payloads),
+    (11, "rollup daily P&L close and kalshi_snapshot_history view", _add_snapshot_history),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn) -> int:
+    """Apply pending migrations in order, each in its own transaction. Returns the new version."""
+    version = current_version(conn)
+    if version >= SCHEMA_VERSION:
+        return version
+    if conn.in_transaction:
+        conn.commit()
+    for target, description, fn in MIGRATIONS:
+        if target <= version:
+            continue
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            fn(conn)
+            conn.execute(f"PRAGMA user_version = {int(target)}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        print(f"[DB] Migrated to v{target}: {description}")
+        version = target
+    return version
+
+
+def migrate_path(db_path: str = DEFAULT_DB) -> int:
+    conn = db_pool.connect(db_path)
+    try:
+        return migrate(conn)
+    finally:
+        conn.close()
+
+
+# ── EXPLAIN QUERY PLAN REGRESSION CHECK ────────────────────────────────────────
+# Queries issued by hot endpoints; none may fall back to a full table scan.
+HOT_QUERIES = {
+    "freshness_latest_run": (
+        "SELECT completed_at, started_at, status FROM sync_run_audit WHERE source = ? ORDER BY id DESC LIMIT 1",
+        ("kalshi",),
+    ),
+    "cost_caps_month": (
+        "SELECT usage_date, provider, cost_usd FROM api_usage WHERE usage_date >= ?",
+        ("2026-01-01",),
+    ),
+    "openrouter_lifetime": (
+        "SELECT usage_date, cost_usd, notes FROM api_usage WHERE lower(provider) = 'openrouter' "
+        "ORDER BY usage_date DESC, id DESC",
+        (),
+    ),
+    "openrouter_mtd": (
+        "SELECT cost_usd FROM api_usage WHERE lower(provider)='openrouter' AND usage_date >= ?",
+        ("2026-01-01",),
+    ),
+    "anthropic_usage": (
+        "SELECT * FROM api_usage WHERE lower(provider)='anthropic' AND usage_date >= ? "
+        "ORDER BY usage_date DESC, id DESC",
+        ("2026-01-01",),
+    ),
+    "anthropic_upsert_lookup": (
+        "SELECT id FROM api_usage WHERE usage_date=? AND provider='Anthropic' AND model=?",
+        ("2026-01-01", "claude-sonnet-4"),
+    ),
+    "latest_snapshot": (
+        "SELECT * FROM kalshi_snapshots ORDER BY snapshot_ts DESC LIMIT 1",
+        (),
+    ),
+    "eod_high_water_mark": (
+        "SELECT MAX(snapshot_ts) FROM kalshi_snapshots",
+        (),
+    ),
+    "eod_incremental_pass": (
+        "SELECT snap_date, snapshot_ts FROM kalshi_snapshots WHERE snapshot_ts > ? ORDER BY snapshot_ts ASC",
+        ("2026-01-01 00:00:00",),
+    ),
+    "eod_refresh_day": (
+        "SELECT snapshot_ts FROM kalshi_snapshots WHERE snap_date = ? ORDER BY snapshot_ts DESC LIMIT 1",
+        ("2026-01-01",),
+    ),
+    "sports_settled": (
+        "SELECT SUM(profit_loss) FROM sports_picks WHERE result IN ('WIN', 'LOSS')",
+        (),
+    ),
+    "sports_pending": (
+        "SELECT sport, game, pick, stake FROM sports_picks WHERE COALESCE(result, 'PENDING') = 'PENDING'",
+        (),
+    ),
+    "sports_picks_ledger": (
+        "SELECT * FROM sports_picks ORDER BY pick_date DESC, id DESC",
+        (),
+    ),
+    "kalshi_open_trades": (
+        "SELECT market, cost_basis FROM kalshi_trades WHERE status IS NULL OR status != 'Settled'",
+        (),
+    ),
+    "kalshi_settled_count": (
+        "SELECT COUNT(*) FROM kalshi_trades WHERE status = 'Settled'",
+        (),
+    ),
+    "kalshi_trades_ledger": (
+        "SELECT rowid AS id, * FROM kalshi_trades ORDER BY trade_date DESC, rowid DESC",
+        (),
+    ),
+    "kalshi_trades_keyset_page": (
+        "SELECT rowid AS id, * FROM kalshi_trades WHERE status = ? AND (trade_date, rowid) < (?, ?) "
+        "ORDER BY trade_date DESC, rowid DESC LIMIT ?",
+        ("Open", "2026-01-01", 100, 101),
+    ),
+    "john_leads_keyset_page": (
+        "SELECT * FROM john_leads WHERE (lead_date, id) < (?, ?) ORDER BY lead_date DESC, id DESC LIMIT ?",
+        ("2026-01-01", 100, 101),
+    ),
+    "sports_picks_keyset_page": (
+        "SELECT * FROM sports_picks WHERE result = ? AND (pick_date, id) < (?, ?) "
+        "ORDER BY pick_date DESC, id DESC LIMIT ?",
+        ("WIN", "2026-01-01", 100, 101),
+    ),
+    "john_jobs_ledger": (
+        "SELECT * FROM john_jobs ORDER BY job_date DESC",
+        (),
+    ),
+    "john_leads_ledger": (
+        "SELECT * FROM john_leads ORDER BY lead_date DESC",
+        (),
+    ),
+    "kpi_totals_scope": (
+        "SELECT metric, value FROM kpi_totals WHERE scope = ?",
+        ("sports",),
+    ),
+    "rollup_tier_range": (
+        "SELECT last_ts, pnl_close FROM kalshi_snapshot_rollups WHERE tier = ? AND bucket_ts > ? "
+        "ORDER BY bucket_ts ASC",
+        ("hourly", "2026-01-01 00:00:00"),
+    ),
+    "raw_retention_cutoff": (
+        "SELECT MIN(snap_date) FROM kalshi_snapshots WHERE snap_date < ?",
+        ("2026-01-01",),
+    ),
+    "kpi_latest_eod": (
+        "SELECT * FROM kpi_daily_eod ORDER BY snap_date DESC LIMIT 1",
+        (),
+    ),
+}
+
+
+def explain(conn, sql: str, params=()):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+
+
+def _is_full_scan(detail: str) -> bool:
+    # "SCAN t" is a table scan; "SCAN t USING [COVERING] INDEX i" walks an index in order.
+    return detail.startswith("SCAN ") and " USING " not in detail and "CONSTANT ROW" not in detail
+
+
+def check_query_plans(conn, queries: dict = None):
+    """Return {name: plan_details} for every hot query whose plan contains a full table scan."""
+    failures = {}
+    for name, (sql, params) in (queries or HOT_QUERIES).items():
+        plan = explain(conn, sql, params)
+        if any(_is_full_scan(d) for d in plan):
+            failures[name] = plan
+    return failures
+
+
+if __name__ == "__main__":
+    db_path = DEFAULT_DB
+    version = migrate_path(db_path)
+    print(f"[DB] {db_path} at schema v{version} (latest v{SCHEMA_VERSION})")
+    if "--check" in sys.argv:
+        conn = db_pool.connect(db_path)
+        failures = check_query_plans(conn)
+        conn.close()
+        for name, plan in failures.items():
+            print(f"[PLAN] FULL SCAN in {name}: {' | '.join(plan)}")
+        print(f"[PLAN] {len(HOT_QUERIES) - len(failures)}/{len(HOT_QUERIES)} hot queries use indexes")
+        sys.exit(1 if failures else 0)
@@ -1,8 +1,13 @@
-import sqlite3
 import json
 from pathlib import Path
 
-conn = sqlite3.connect('data/northstar.db')
+import db_pool
+import kpi_store
+import migrations
+
+conn = db_pool.connect('data/northstar.db')
+
+migrations.migrate(conn)
 cursor = conn.cursor()
 
 # DELETE ALL kalshi trades
@@ -95,6 +100,7 @@ for ticker, data in by_ticker.items():
                 sells.remove(sell)
 
 conn.commit()
+kpi_store.refresh_for_source(conn, "kalshi_trades")
 
 # Verify
 cursor.execute("SELECT COUNT(*), SUM(pnl_realized) FROM kalshi_trades")
@@ -0,0 +1,137 @@
+"""
+response_cache.py — data-version-keyed JSON response cache for app.py
+The heavy endpoints only change when a sync job commits, so their JSON is
+encoded once and served from memory until the database changes. Changes are
+detected with PRAGMA data_version on a dedicated read-only probe connection:
+SQLite bumps it whenever any other connection (this process's writer,
+auto_populate, a script) commits, and reading it costs no I/O.
+
+Responses carry an ETag; a matching If-None-Match gets a bodyless 304.
+Entries also expire after MAX_AGE_S so clock-derived fields (staleness
+fallbacks, month-to-date projections) still move without a write.
+At most MAX_ENTRIES keys are kept; the least recently used one is evicted.
+
+  cache = ResponseCache(DB_PATH)
+  return cache.respond(request, ("dashboard", start, end), lambda: build(start, end))
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from fastapi.responses import Response
+
+import db_pool
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MAX_AGE_S = 300
+MAX_ENTRIES = 256
+
+
+def encode(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=str, separators=(",", ":")).encode()
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+class ResponseCache:
+    """{key: (data_version, day, built_at, etag, body)}; recomputed only after a write."""
+
+    def __init__(self, db_path, max_age_s: float = MAX_AGE_S, max_entries: int = MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_age_s = max_age_s
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self._probe = None
+        self._probe_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def data_version(self) -> int:
+        with self._probe_lock:
+            if self._probe is None:
+                self._probe = db_pool.connect(self.db_path, readonly=True, check_same_thread=False)
+            return self._probe.execute("PRAGMA data_version").fetchone()[0]
+
+    def _fresh(self, entry, version, today) -> bool:
+        return (entry is not None and entry[0] == version and entry[1] == today
+                and time.monotonic() - entry[2] < self.max_age_s)
+
+    def get(self, key, compute):
+        """(etag, body) for key, calling compute() only if the data changed."""
+        version, today = self.data_version(), date.today()
+        entry = self._entries.get(key)
+        if self._fresh(entry, version, today):
+            self._touch(key)
+            self.hits += 1
+            return entry[3], entry[4]
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another request may have rebuilt it while we waited.
+            entry = self._entries.get(key)
+            if self._fresh(entry, version, today):
+                self._touch(key)
+                self.hits += 1
+                return entry[3], entry[4]
+            self.misses += 1
+            try:
+                body = encode(compute())
+            except BaseException:
+                with self._lock:
+                    if key not in self._entries:
+                        self._key_locks.pop(key, None)
+                raise
+            etag = '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+            self._store(key, (version, today, time.monotonic(), etag, body))
+            return etag, body
+
+    def _touch(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+
+    def _store(self, key, entry):
+        """Insert as most recent and evict the LRU entries (and their key locks) past max_entries."""
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                old, _ = self._entries.popitem(last=False)
+                self._key_locks.pop(old, None)
+
+    def respond(self, request, key, compute) -> Response:
+        etag, body = self.get(key, compute)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._key_locks.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def close(self):
+        with self._probe_lock:
+            if self._probe is not None:
+                self._probe.close()
+                self._probe = None
@@ -0,0 +1,358 @@
+"""
+snapshot_rollups.py — tiered retention for kalshi_snapshots
+Every snapshot is folded into 15-minute, hourly and daily OHLC buckets
+(balance, total P&L, fills; counters and category P&L at bucket close) in
+kalshi_snapshot_rollups. Retention is opt-in: with KALSHI_RAW_RETENTION_DAYS
+(and the 15min/hourly equivalents) set, compact() drops raw days and fine
+buckets once they age out of their tier, so table size and query cost stay
+bounded however long the history gets. By default everything is kept.
+
+Importers that replay an external history (sync_scalper, sync_from_scalper_db)
+skip days older than raw_cutoff() so compacted days are not re-inserted.
+Readers that need individual snapshots use the kalshi_snapshot_history view:
+raw rows where they still exist, bucket closes from the finest remaining tier
+before that.
+
+series() routes a read to the coarsest tier that still satisfies the requested
+resolution and stitches older stretches from coarser tiers where finer data
+has already been compacted away.
+
+Rollups are recomputed per day from raw rows. Days still inside the raw
+window are replaced outright; older days are merged (high=max, low=min,
+open/close by timestamp) so a backfill of a partial day never loses the
+history it was compacted from.
+
+Run via:
+  python snapshot_rollups.py             → row counts and span per tier
+  python snapshot_rollups.py --rebuild   → recompute every tier from raw
+  python snapshot_rollups.py --compact   → apply retention now
+"""
+import os
+import sqlite3
+import sys
+from datetime import date, datetime, timedelta
+
+TIERS = ("15min", "hourly", "daily")
+TIER_SECONDS = {"raw": 0, "15min": 900, "hourly": 3600, "daily": 86400}
+
+# days each tier is kept; 0 = forever (the default — compaction is opt-in)
+RETENTION_DAYS = {
+    "raw": int(os.environ.get("KALSHI_RAW_RETENTION_DAYS", 0)),
+    "15min": int(os.environ.get("KALSHI_15MIN_RETENTION_DAYS", 0)),
+    "hourly": int(os.environ.get("KALSHI_HOURLY_RETENTION_DAYS", 0)),
+    "daily": 0,
+}
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kalshi_snapshot_rollups (
+    tier TEXT NOT NULL,
+    bucket_ts TEXT NOT NULL,
+    snap_date TEXT NOT NULL,
+    first_ts TEXT NOT NULL,
+    last_ts TEXT NOT NULL,
+    samples INTEGER DEFAULT 0,
+    balance_open INTEGER, balance_high INTEGER, balance_low INTEGER, balance_close INTEGER,
+    pnl_open INTEGER, pnl_high INTEGER, pnl_low INTEGER, pnl_close INTEGER,
+    fills_open INTEGER, fills_high INTEGER, fills_low INTEGER, fills_close INTEGER,
+    win_count INTEGER DEFAULT 0,
+    loss_count INTEGER DEFAULT 0,
+    open_positions INTEGER DEFAULT 0,
+    total_orders INTEGER DEFAULT 0,
+    weather_pnl_cents INTEGER DEFAULT 0,
+    crypto_pnl_cents INTEGER DEFAULT 0,
+    econ_pnl_cents INTEGER DEFAULT 0,
+    mm_pnl_cents INTEGER DEFAULT 0,
+    lip_rewards_cents INTEGER DEFAULT 0,
+    daily_pnl_cents INTEGER,
+    PRIMARY KEY (tier, bucket_ts)
+) WITHOUT ROWID
+"""
+
+# Raw snapshots where they exist, else bucket closes from the finest tier that reaches further back;
+# a bucket is used only if it closes before the finer data begins
+HISTORY_VIEW = """
+CREATE VIEW IF NOT EXISTS kalshi_snapshot_history AS
+SELECT id, snapshot_ts, snap_date, balance_cents, daily_pnl_cents, total_pnl_cents, total_fills,
+       open_positions, 'raw' AS tier
+FROM kalshi_snapshots
+UNION ALL
+SELECT NULL, last_ts, snap_date, balance_close, daily_pnl_cents, pnl_close, fills_close,
+       open_positions, tier
+FROM kalshi_snapshot_rollups
+WHERE last_ts < COALESCE((SELECT MIN(snapshot_ts) FROM kalshi_snapshots), '~')
+  AND (tier = '15min'
+       OR (tier = 'hourly' AND last_ts < COALESCE(
+             (SELECT MIN(first_ts) FROM kalshi_snapshot_rollups WHERE tier = '15min'), '~'))
+       OR (tier = 'daily' AND last_ts < COALESCE(
+             (SELECT MIN(first_ts) FROM kalshi_snapshot_rollups WHERE tier IN ('15min', 'hourly')), '~')))
+"""
+
+# rollup prefix → raw column, aggregated open/high/low/close
+_OHLC = {"balance": "balance_cents", "pnl": "total_pnl_cents", "fills": "total_fills"}
+# raw columns carried at bucket close
+_CLOSE = (
+    "win_count", "loss_count", "open_positions", "total_orders",
+    "weather_pnl_cents", "crypto_pnl_cents", "econ_pnl_cents", "mm_pnl_cents", "lip_rewards_cents",
+)
+# also stored at close, but only read through kalshi_snapshot_history (not part of SERIES_FIELDS)
+_CLOSE_EXTRA = ("daily_pnl_cents",)
+
+_BUCKET_SQL = {
+    "15min": ("strftime('%Y-%m-%d %H:', snapshot_ts) || "
+              "printf('%02d', CAST(strftime('%M', snapshot_ts) AS INTEGER) / 15 * 15) || ':00'"),
+    "hourly": "strftime('%Y-%m-%d %H:00:00', snapshot_ts)",
+    "daily": "snap_date || ' 00:00:00'",
+}
+
+# (ts, snap_date, balance_cents, total_pnl_cents, total_fills, <_CLOSE...>) — raw or bucket close
+SERIES_FIELDS = ("snapshot_ts", "snap_date", "balance_cents", "total_pnl_cents", "total_fills") + _CLOSE
+
+
+def ensure_rollup_tables(conn):
+    conn.execute(ROLLUP_SCHEMA)
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(kalshi_snapshot_rollups)").fetchall()}
+    if "daily_pnl_cents" not in cols:  # tables created before migration v11
+        conn.execute("ALTER TABLE kalshi_snapshot_rollups ADD COLUMN daily_pnl_cents INTEGER")
+    conn.execute(HISTORY_VIEW)
+
+
+def _norm(ts: str) -> str:
+    """'YYYY-MM-DD HH:MM:SS' prefix of a stored timestamp, comparable with bucket_ts."""
+    return ts[:19].replace("T", " ")
+
+
+def _day_after(day: str) -> str:
+    return (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+
+
+def raw_cutoff(today: date = None) -> str:
+    """First snap_date still kept raw; None when raw retention is disabled."""
+    days = RETENTION_DAYS["raw"]
+    if not days:
+        return None
+    return ((today or datetime.utcnow().date()) - timedelta(days=days)).isoformat()
+
+
+def keeps_raw(snap_date: str, today: date = None) -> bool:
+    """False for days compact() has already rolled up, so importers don't resurrect them."""
+    cutoff = raw_cutoff(today)
+    return not cutoff or not snap_date or snap_date >= cutoff
+
+
+# ── RECOMPUTE ──────────────────────────────────────────────────────────────────
+def _upsert_sql(tier: str, where: str) -> str:
+    cols = ["tier", "bucket_ts", "snap_date", "first_ts", "last_ts", "samples"]
+    select = ["?", "bucket_ts", "MIN(snap_date)", "MIN(snapshot_ts)", "MAX(snapshot_ts)", "COUNT(*)"]
+    merge = [
+        "snap_date = MIN(snap_date, excluded.snap_date)",
+        "samples = MAX(samples, excluded.samples)",
+    ]
+    for prefix, raw in _OHLC.items():
+        cols += [f"{prefix}_open", f"{prefix}_high", f"{prefix}_low", f"{prefix}_close"]
+        select += [f"MAX(CASE WHEN rn_first = 1 THEN {raw} END)", f"MAX({raw})", f"MIN({raw})",
+                   f"MAX(CASE WHEN rn_last = 1 THEN {raw} END)"]
+        merge += [
+            f"{prefix}_open = CASE WHEN excluded.first_ts < first_ts THEN excluded.{prefix}_open ELSE {prefix}_open END",
+            f"{prefix}_high = MAX({prefix}_high, excluded.{prefix}_high)",
+            f"{prefix}_low = MIN({prefix}_low, excluded.{prefix}_low)",
+            f"{prefix}_close = CASE WHEN excluded.last_ts >= last_ts THEN excluded.{prefix}_close ELSE {prefix}_close END",
+        ]
+    for raw in _CLOSE + _CLOSE_EXTRA:
+        cols.append(raw)
+        select.append(f"MAX(CASE WHEN rn_last = 1 THEN {raw} END)")
+        merge.append(f"{raw} = CASE WHEN excluded.last_ts >= last_ts THEN excluded.{raw} ELSE {raw} END")
+    # SET expressions see the pre-update row, so first_ts/last_ts can go last
+    merge += ["first_ts = MIN(first_ts, excluded.first_ts)", "last_ts = MAX(last_ts, excluded.last_ts)"]
+
+    raw_cols = ", ".join(("snap_date", "snapshot_ts") + tuple(_OHLC.values()) + _CLOSE + _CLOSE_EXTRA)
+    return f"""
+        INSERT INTO kalshi_snapshot_rollups ({', '.join(cols)})
+        SELECT {', '.join(select)}
+        FROM (
+            SELECT {raw_cols}, bucket_ts,
+                   ROW_NUMBER() OVER (PARTITION BY bucket_ts ORDER BY snapshot_ts ASC) AS rn_first,
+                   ROW_NUMBER() OVER (PARTITION BY bucket_ts ORDER BY snapshot_ts DESC) AS rn_last
+            FROM (SELECT {raw_cols}, {_BUCKET_SQL[tier]} AS bucket_ts FROM kalshi_snapshots {where})
+            WHERE bucket_ts IS NOT NULL
+        )
+        GROUP BY bucket_ts
+        ON CONFLICT(tier, bucket_ts) DO UPDATE SET
+            {', '.join(merge)}
+    """
+
+
+def refresh(conn, since: str = None, until: str = None, today: date = None):
+    """Recompute every tier for raw snap_dates in [since, until] (all raw days when None)."""
+    ensure_rollup_tables(conn)
+    if since is None or until is None:
+        lo, hi = conn.execute("SELECT MIN(snap_date), MAX(snap_date) FROM kalshi_snapshots").fetchone()
+        if lo is None:
+            return
+        since, until = since or lo, until or hi
+
+    # Days whose raw rows are all still present are rebuilt from scratch
+    cutoff = raw_cutoff(today)
+    replace_from = max(since, cutoff) if cutoff else since
+    if replace_from <= until:
+        conn.execute(
+            "DELETE FROM kalshi_snapshot_rollups WHERE tier IN ('15min', 'hourly', 'daily') "
+            "AND bucket_ts >= ? AND bucket_ts < ?",
+            (replace_from, _day_after(until)),
+        )
+    for tier in TIERS:
+        conn.execute(_upsert_sql(tier, "WHERE snap_date >= ? AND snap_date <= ?"), (tier, since, until))
+
+
+# ── RETENTION ──────────────────────────────────────────────────────────────────
+def compact(conn, today: date = None) -> dict:
+    """Roll up and drop raw days past retention, then expire old 15min/hourly buckets."""
+    ensure_rollup_tables(conn)
+    today = today or datetime.utcnow().date()
+    removed = {}
+
+    cutoff = raw_cutoff(today)
+    if cutoff:
+        oldest = conn.execute(
+            "SELECT MIN(snap_date) FROM kalshi_snapshots WHERE snap_date < ?", (cutoff,)
+        ).fetchone()[0]
+        if oldest is not None:
+            last_day = (date.fromisoformat(cutoff) - timedelta(days=1)).isoformat()
+            refresh(conn, oldest, last_day, today)
+            if conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='scalper_feed_reconciliation'"
+            ).fetchone():
+                # keep kalshi_snapshot_ts for audit, drop the reference to the row about to go
+                conn.execute(
+                    "UPDATE scalper_feed_reconciliation SET kalshi_snapshot_id = NULL WHERE kalshi_snapshot_id IN "
+                    "(SELECT id FROM kalshi_snapshots WHERE snap_date < ?)",
+                    (cutoff,),
+                )
+            cur = conn.execute("DELETE FROM kalshi_snapshots WHERE snap_date < ?", (cutoff,))
+            removed["raw"] = cur.rowcount
+
+    for tier in ("15min", "hourly"):
+        days = RETENTION_DAYS[tier]
+        if not days:
+            continue
+        tier_cutoff = (today - timedelta(days=days)).isoformat()
+        cur = conn.execute(
+            "DELETE FROM kalshi_snapshot_rollups WHERE tier = ? AND bucket_ts < ?", (tier, tier_cutoff)
+        )
+        if cur.rowcount:
+            removed[tier] = cur.rowcount
+    return removed
+
+
+def on_snapshot(conn, snap_date: str):
+    """Fold the day's new snapshots into every tier and apply retention (caller commits)."""
+    refresh(conn, snap_date, snap_date)
+    removed = compact(conn)
+    if removed:
+        print(f"[Rollups] Compacted {removed}")
+
+
+# ── READ PATH ──────────────────────────────────────────────────────────────────
+_ROLLUP_SELECT = (
+    "SELECT last_ts, snap_date, balance_close, pnl_close, fills_close, " + ", ".join(_CLOSE) +
+    " FROM kalshi_snapshot_rollups"
+)
+_RAW_SELECT = "SELECT " + ", ".join(SERIES_FIELDS) + " FROM kalshi_snapshots"
+
+
+def _floor(conn, tier: str):
+    """Earliest normalized timestamp held by a tier, or None when it is empty."""
+    if tier == "raw":
+        ts = conn.execute("SELECT MIN(snapshot_ts) FROM kalshi_snapshots").fetchone()[0]
+        return _norm(ts) if ts else None
+    return conn.execute(
+        "SELECT MIN(bucket_ts) FROM kalshi_snapshot_rollups WHERE tier = ?", (tier,)
+    ).fetchone()[0]
+
+
+def _shift(ts: str, seconds: int) -> str:
+    return (datetime.fromisoformat(ts) + timedelta(seconds=seconds)).isoformat(" ")
+
+
+def series(conn, resolution: str = "hourly", start: str = None, end: str = None) -> list:
+    """SERIES_FIELDS rows in time order at resolution, one per bucket close (raw: every row).
+
+    The requested tier answers as far back as it reaches; earlier stretches come
+    from the next coarser tier with data, so old history degrades in resolution
+    instead of disappearing.
+    """
+    if resolution not in TIER_SECONDS:
+        raise ValueError(f"resolution must be one of {', '.join(TIER_SECONDS)}")
+    order = ("raw",) + TIERS
+    if end and len(end) == 10:
+        end += "~"  # a bare date includes the whole day; '~' sorts after ' ', 'T' and digits
+    lo = (start if len(start) > 10 else start + " 00:00:00") if start else None
+
+    segments = []
+    covered_from = None  # normalized start of what finer tiers already returned
+    for tier in order[order.index(resolution):]:
+        floor = _floor(conn, tier)
+        if floor is None:
+            continue
+        width = TIER_SECONDS[tier]
+        if tier == "raw":
+            clauses, params, sql, key = [], [], _RAW_SELECT, "snapshot_ts"
+            if start:
+                clauses.append("snapshot_ts >= ?")
+                params.append(start)
+        else:
+            clauses, params, sql, key = ["tier = ?"], [tier], _ROLLUP_SELECT, "bucket_ts"
+            if lo:
+                clauses.append("bucket_ts > ?")  # buckets still open at start
+                params.append(_shift(_norm(lo), -width))
+            if covered_from:
+                clauses.append("bucket_ts <= ?")  # whole buckets that end before finer data begins
+                params.append(_shift(covered_from, -width))
+        if end:
+            clauses.append(f"{key} <= ?")
+            params.append(end)
+        rows = conn.execute(f"{sql} WHERE {' AND '.join(clauses) or '1'} ORDER BY {key} ASC", params).fetchall()
+        if tier != "raw":
+            # a bucket is reported at its close, which must itself fall inside the window
+            rows = [r for r in rows if (not lo or _norm(r[0]) >= _norm(lo)) and (not end or r[0] <= end)]
+        segments.append(rows)
+        covered_from = floor if covered_from is None else min(covered_from, floor)
+
+    return [row for rows in reversed(segments) for row in rows]
+
+
+def daily_closes_before(conn, snap_date: str) -> list:
+    """Daily-tier EOD rows (SERIES_FIELDS order) for days older than snap_date."""
+    try:
+        return conn.execute(
+            _ROLLUP_SELECT + " WHERE tier = 'daily' AND bucket_ts < ? ORDER BY bucket_ts ASC",
+            (snap_date,),
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return []  # database not migrated to v7 yet
+
+
+def table_stats(conn) -> dict:
+    """Row counts and time span per tier, for monitoring retention."""
+    ensure_rollup_tables(conn)
+    stats = {}
+    n, lo, hi = conn.execute("SELECT COUNT(*), MIN(snap_date), MAX(snap_date) FROM kalshi_snapshots").fetchone()
+    stats["raw"] = {"rows": n, "from": lo, "to": hi, "retention_days": RETENTION_DAYS["raw"]}
+    for tier, n, lo, hi in conn.execute(
+        "SELECT tier, COUNT(*), MIN(snap_date), MAX(snap_date) FROM kalshi_snapshot_rollups GROUP BY tier"
+    ).fetchall():
+        stats[tier] = {"rows": n, "from": lo, "to": hi, "retention_days": RETENTION_DAYS.get(tier, 0)}
+    return stats
+
+
+if __name__ == "__main__":
+    import db_pool
+    db_path = os.environ.get("DASHBOARD_DB", os.path.join(os.path.dirname(__file__), "data", "northstar.db"))
+    with db_pool.writer(db_path) as conn:
+        if "--rebuild" in sys.argv:
+            refresh(conn)  # compacted days keep their merged buckets
+            print("[Rollups] Recomputed all tiers from raw snapshots")
+        if "--compact" in sys.argv:
+            print(f"[Rollups] Compacted {compact(conn)}")
+        for tier, s in table_stats(conn).items():
+            print(f"[Rollups] {tier:<7} {s['rows']:>8} rows  {s['from']} → {s['to']}  "
+                  f"(keep {s['retention_days'] or 'forever'}{' days' if s['retention_days'] else ''})")
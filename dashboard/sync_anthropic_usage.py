@@ -16,7 +16,7 @@ from pathlib import Path
 # Add parent to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-import aiosqlite
+import db_pool
 from database import get_db, DB_PATH
 
 ANTHROPIC_LOG = r"C:\Users\chead\.openclaw\workspace\data\anthropic_usage.jsonl"
@@ -48,6 +48,38 @@ async def read_anthropic_logs():
     return logs
 
 
+def _write_usage(conn, logs, counts):
+    for entry in logs:
+        # Parse entry
+        timestamp = entry.get('timestamp')
+        agent_id = entry.get('agent_id', 'unknown')
+        model = entry.get('model', 'unknown')
+        input_tokens = entry.get('input_tokens', 0)
+        output_tokens = entry.get('output_tokens', 0)
+        total_cost = entry.get('total_cost', 0)
+
+        # Extract date from timestamp
+        usage_date = timestamp.split('T')[0] if timestamp else str(date.today())
+
+        # Check if already synced (avoid duplicates)
+        existing = conn.execute(
+            "SELECT id FROM api_usage WHERE provider=? AND usage_date=? AND model=? AND tokens_in=? AND tokens_out=?",
+            ("anthropic", usage_date, model, input_tokens, output_tokens)
+        ).fetchone()
+
+        if existing:
+            counts["skipped"] += 1
+            continue
+
+        # Insert into dashboard
+        conn.execute(
+            """INSERT INTO api_usage (usage_date, provider, model, tokens_in, tokens_out, cost_usd, notes)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (usage_date, "anthropic", model, input_tokens, output_tokens, total_cost, f"agent:{agent_id}")
+        )
+        counts["synced"] += 1
+
+
 async def sync_to_dashboard():
     """Sync Anthropic logs to dashboard database"""
     logs = await read_anthropic_logs()
@@ -55,61 +87,25 @@ async def sync_to_dashboard():
         print("[SYNC] No logs to sync")
         return {"entries_read": 0, "entries_synced": 0, "error": None}
 
-    db = await get_db()
-    synced_count = 0
-    skipped_count = 0
-
+    counts = {"synced": 0, "skipped": 0}
     try:
-        for entry in logs:
-            # Parse entry
-            timestamp = entry.get('timestamp')
-            agent_id = entry.get('agent_id', 'unknown')
-            model = entry.get('model', 'unknown')
-            input_tokens = entry.get('input_tokens', 0)
-            output_tokens = entry.get('output_tokens', 0)
-            total_cost = entry.get('total_cost', 0)
-
-            # Extract date from timestamp
-            usage_date = timestamp.split('T')[0] if timestamp else str(date.today())
-
-            # Check if already synced (avoid duplicates)
-            cur = await db.execute(
-                "SELECT id FROM api_usage WHERE provider=? AND usage_date=? AND model=? AND tokens_in=? AND tokens_out=?",
-                ("anthropic", usage_date, model, input_tokens, output_tokens)
-            )
-            existing = await cur.fetchone()
-
-            if existing:
-                skipped_count += 1
-                continue
-
-            # Insert into dashboard
-            await db.execute(
-                """INSERT INTO api_usage (usage_date, provider, model, tokens_in, tokens_out, cost_usd, notes)
-                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                (usage_date, "anthropic", model, input_tokens, output_tokens, total_cost, f"agent:{agent_id}")
-            )
-            synced_count += 1
-
-        await db.commit()
-        print(f"[SYNC] Synced {synced_count} entries, skipped {skipped_count} duplicates")
+        # Single pooled writer transaction; rolled back on error
+        await db_pool.run_write(DB_PATH, _write_usage, logs, counts)
+        print(f"[SYNC] Synced {counts['synced']} entries, skipped {counts['skipped']} duplicates")
         return {
             "entries_read": len(logs),
-            "entries_synced": synced_count,
-            "entries_skipped": skipped_count,
+            "entries_synced": counts["synced"],
+            "entries_skipped": counts["skipped"],
             "error": None
         }
 
     except Exception as e:
         print(f"[SYNC] Database error: {e}")
-        await db.rollback()
         return {
             "entries_read": len(logs),
-            "entries_synced": synced_count,
+            "entries_synced": counts["synced"],
             "error": str(e)
         }
-    finally:
-        await db.close()
 
 
 async def get_usage_summary(days: int = 1):
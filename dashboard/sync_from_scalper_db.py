@@ -5,15 +5,19 @@ sync_from_scalper_db.py — Copy real Kalshi data from Scalper's DB to Dashboard
 import sqlite3
 from datetime import datetime
 
+import db_pool
+import kpi_store
+import snapshot_rollups
+
 SCALPER_DB = r'C:\Users\chead\.openclaw\workspace-scalper\scalper_v8.db'
 DASHBOARD_DB = r'C:\Users\chead\.openclaw\workspace\dashboard\data\northstar.db'
 
 def sync():
-    scalper = sqlite3.connect(SCALPER_DB)
+    scalper = db_pool.connect(SCALPER_DB, readonly=True)
     scalper.row_factory = sqlite3.Row
     sc = scalper.cursor()
     
-    dashboard = sqlite3.connect(DASHBOARD_DB)
+    dashboard = db_pool.connect(DASHBOARD_DB)
     dc = dashboard.cursor()
     
     print("[Sync] Reading Scalper Kalshi snapshots...")
@@ -24,9 +28,11 @@ def sync():
     
     print(f"[Sync] Found {len(snapshots)} Scalper snapshots")
     
-    # Copy to dashboard
+    # Copy to dashboard (days past raw retention live on in kalshi_snapshot_rollups)
     inserted = 0
     for snap in snapshots:
+        if not snapshot_rollups.keeps_raw(snap['timestamp'][:10]):
+            continue
         try:
             dc.execute("""
                 INSERT OR REPLACE INTO kalshi_snapshots (
@@ -58,6 +64,10 @@ def sync():
             print(f"[Sync] Error inserting {snap['timestamp']}: {e}")
     
     dashboard.commit()
+    kpi_store.ensure_kpi_tables(dashboard)
+    kpi_store.rebuild_eod(dashboard)
+    kpi_store.refresh_periods(dashboard)
+    dashboard.commit()
     
     print(f"[Sync] Inserted {inserted} snapshots into dashboard")
     
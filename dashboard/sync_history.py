@@ -3,14 +3,18 @@ sync_history.py — one-time full historical import from all Scalper logs into d
 Pulls: business_ledger.jsonl, trade_log.jsonl, trade_log.csv, session_log.jsonl, 
        engine_log.jsonl, pick_performance_log.jsonl
 """
-import json, csv, sqlite3, os, re
+import json, csv, os, re
 from datetime import datetime, date
 
+import db_pool
+import kpi_store
+import migrations
+
 DASHBOARD_DB = r"C:\Users\chead\.openclaw\workspace\dashboard\data\northstar.db"
 BASE = r"C:\Users\chead\.openclaw\workspace-scalper"
 
 def run():
-    conn = sqlite3.connect(DASHBOARD_DB)
+    conn = db_pool.connect(DASHBOARD_DB)
     
     # Ensure tables exist
     conn.executescript("""
@@ -182,7 +186,9 @@ def run():
     for t in ['kalshi_trades','business_ledger','revenue','expenses']:
         cnt = conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
         results[f'total_{t}'] = cnt
-    
+
+    migrations.migrate(conn)  # refresh_all needs the ledger/cluster tables
+    kpi_store.refresh_all(conn)
     conn.close()
     return results
 
@@ -2,12 +2,15 @@
 """
 REAL Data Sync - Parse actual trade logs and calculate true P&L
 """
-import sqlite3
 import json
 import os
 from datetime import datetime
 from pathlib import Path
 
+import db_pool
+import kpi_store
+import migrations
+
 # Paths
 SCALPER_DIR = Path('C:/Users/chead/.openclaw/workspace-scalper')
 DASHBOARD_DB = Path('C:/Users/chead/.openclaw/workspace/dashboard/data/northstar.db')
@@ -20,7 +23,9 @@ def sync_kalshi_trades():
         print(f"Trade log not found: {trade_log}")
         return 0, 0
     
-    conn = sqlite3.connect(DASHBOARD_DB)
+    conn = db_pool.connect(DASHBOARD_DB)
+    
+    migrations.migrate(conn)
     cursor = conn.cursor()
     
     # Clear existing fake data
@@ -104,6 +109,7 @@ def sync_kalshi_trades():
                     break
     
     conn.commit()
+    kpi_store.refresh_for_source(conn, "kalshi_trades")
     conn.close()
     
     print(f"Kalshi: Added {trades_added} completed trades with ${total_pnl:,.2f} P&L")
@@ -117,7 +123,9 @@ def sync_sports_picks():
         print(f"Picks log not found: {picks_log}")
         return 0, 0
     
-    conn = sqlite3.connect(DASHBOARD_DB)
+    conn = db_pool.connect(DASHBOARD_DB)
+    
+    migrations.migrate(conn)
     cursor = conn.cursor()
     
     # Clear existing sports data
@@ -173,6 +181,7 @@ def sync_sports_picks():
                 continue
     
     conn.commit()
+    kpi_store.refresh_for_source(conn, "sports_picks")
     conn.close()
     
     print(f"Sports: Added {picks_added} picks with ${total_pnl:,.2f} P&L")
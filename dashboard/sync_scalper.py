@@ -5,6 +5,10 @@ into the Northstar dashboard DB. Run standalone or imported.
 import sqlite3, json, os
 from datetime import datetime, date
 
+import db_pool
+import kpi_store
+import snapshot_rollups
+
 SCALPER_DB   = r"C:\Users\chead\.openclaw\workspace-scalper\scalper_v8.db"
 PICK_LOG     = r"C:\Users\chead\.openclaw\workspace-scalper\pick_performance_log.jsonl"
 ENGINE_LOG   = r"C:\Users\chead\.openclaw\workspace-scalper\engine_log.jsonl"
@@ -56,7 +60,7 @@ CREATE TABLE IF NOT EXISTS sports_picks (
 
 def sync():
     os.makedirs(os.path.dirname(DASHBOARD_DB), exist_ok=True)
-    dash = sqlite3.connect(DASHBOARD_DB)
+    dash = db_pool.connect(DASHBOARD_DB)
     dash.executescript(EXTRA_SCHEMA)
     dash.commit()
     
@@ -65,7 +69,7 @@ def sync():
     # ── KALSHI SNAPSHOTS ──────────────────────────────────────────────
     if os.path.exists(SCALPER_DB):
         try:
-            src = sqlite3.connect(SCALPER_DB)
+            src = db_pool.connect(SCALPER_DB, readonly=True)
             src.row_factory = sqlite3.Row
             cur = src.execute("SELECT * FROM pnl_snapshots ORDER BY timestamp")
             rows = cur.fetchall()
@@ -73,6 +77,8 @@ def sync():
             for r in rows:
                 ts = r["timestamp"]
                 snap_date = ts[:10] if ts else str(date.today())
+                if not snapshot_rollups.keeps_raw(snap_date):
+                    continue  # already compacted into kalshi_snapshot_rollups
                 try:
                     dash.execute("""
                         INSERT OR IGNORE INTO kalshi_snapshots
@@ -210,6 +216,12 @@ def sync():
         except Exception as e:
             results["errors"].append(f"john_leads: {e}")
 
+    # ── KPI MATERIALIZATION ───────────────────────────────────────────────
+    try:
+        kpi_store.refresh_all(dash)
+    except Exception as e:
+        results["errors"].append(f"kpi_store: {e}")
+
     dash.close()
     return results
 
@@ -9,7 +9,14 @@ Sources (default):
 Features:
 - schema bootstrap (feed snapshots, holdings, summary, reconciliation alerts)
 - idempotent upsert on feed_ts_utc
-- reconciliation against kalshi_snapshots (nearest timestamp within a time window)
+- incremental reads: feed_history.jsonl is followed from the last consumed byte offset
+  (scalper_feed_ingest_state), new snapshots + holdings are batch-written in one transaction;
+  --full re-reads from the start, --watch keeps polling the files for appends
+- reconciliation against kalshi_snapshots: one as-of merge join (nearest timestamp
+  within a tolerance window) over sorted epoch arrays, written with a single executemany
+- --reconcile-only re-runs just unreconciled, unmatched or changed feed snapshots
+- raw records kept for audit as dictionary-compressed payload BLOBs (feed_payloads.py),
+  decoded only on demand
 - discrepancy alert generation
 - validation queries for quick audit
 """
@@ -17,14 +24,22 @@ Features:
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import os
 import re
 import sqlite3
+import time
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Tuple
 
+import numpy as np
+
+import db_pool
+import feed_payloads
+import market_clusters
+
 DASHBOARD_DB = r"C:/Users/chead/.openclaw/workspace/dashboard/data/northstar.db"
 FEED_JSON = r"C:/Users/chead/.openclaw/workspace-scalper/dashboard/dashboard_data.json"
 FEED_HISTORY_JSONL = r"C:/Users/chead/.openclaw/workspace-scalper/dashboard/feed_history.jsonl"
@@ -44,7 +59,9 @@ CREATE TABLE IF NOT EXISTS scalper_feed_snapshots (
     unrealized_pnl_d REAL,
     recent_gain_usd REAL,
     recent_gain_pct REAL,
-    payload_json TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    payload_codec TEXT NOT NULL,
+    payload_dict INTEGER,
     source_file TEXT,
     ingested_at TEXT DEFAULT (datetime('now')),
     UNIQUE(feed_ts_utc)
@@ -58,6 +75,7 @@ CREATE TABLE IF NOT EXISTS scalper_feed_holdings (
     contract_count REAL,
     value_usd REAL,
     unrealized_pnl REAL,
+    cluster TEXT,
     PRIMARY KEY (snapshot_id, rank_no),
     FOREIGN KEY (snapshot_id) REFERENCES scalper_feed_snapshots(id) ON DELETE CASCADE
 );
@@ -92,12 +110,21 @@ CREATE TABLE IF NOT EXISTS scalper_feed_reconciliation (
     delta_total_value_vs_balance_usd REAL,
     status TEXT NOT NULL,
     alert_message TEXT,
+    kalshi_max_id INTEGER,
     created_at TEXT DEFAULT (datetime('now')),
     UNIQUE(feed_snapshot_id),
     FOREIGN KEY (feed_snapshot_id) REFERENCES scalper_feed_snapshots(id) ON DELETE CASCADE,
     FOREIGN KEY (kalshi_snapshot_id) REFERENCES kalshi_snapshots(id)
 );
 
+CREATE TABLE IF NOT EXISTS scalper_feed_ingest_state (
+    source_file TEXT PRIMARY KEY,
+    byte_offset INTEGER NOT NULL DEFAULT 0,
+    head_sha1 TEXT,
+    last_feed_ts_utc TEXT,
+    updated_at TEXT DEFAULT (datetime('now'))
+);
+
 CREATE INDEX IF NOT EXISTS idx_scalper_feed_snapshots_ts ON scalper_feed_snapshots(feed_ts_utc);
 CREATE INDEX IF NOT EXISTS idx_scalper_feed_recon_status ON scalper_feed_reconciliation(status);
 """
@@ -138,6 +165,14 @@ VALIDATION_QUERIES = {
            OR ABS(COALESCE(s.positions_usd,0) - COALESCE(sm.parsed_positions_usd,0)) > 0.01
         ORDER BY s.feed_ts_utc DESC;
     """,
+    "payload_audit": """
+        SELECT feed_ts_utc, payload_codec, length(payload) AS stored_bytes,
+               length(CAST(p.json AS BLOB)) AS raw_bytes,
+               json_extract(p.json, '$.timestamp_utc') AS payload_ts,
+               ROUND(COALESCE(json_extract(p.json, '$.cash_usd'), 0) - COALESCE(cash_usd, 0), 2) AS cash_diff
+        FROM (SELECT *, feed_payload(payload, payload_codec, payload_dict) AS json
+              FROM scalper_feed_snapshots ORDER BY feed_ts_utc DESC LIMIT 10) AS p;
+    """,
 }
 
 
@@ -203,70 +238,169 @@ def parse_summary_text(summary: str) -> Dict[str, Optional[float]]:
     }
 
 
-def load_json_records(json_path: str, jsonl_path: str) -> List[Tuple[dict, str]]:
-    recs: List[Tuple[dict, str]] = []
+# ── INCREMENTAL (TAIL-FOLLOWING) READS ───────────────────────────────────────
+FeedRecord = Tuple[str, dict, str]  # (feed_ts_utc, record, source_file)
+
+
+def _feed_record(rec, src: str) -> Optional[FeedRecord]:
+    if not isinstance(rec, dict):
+        return None
+    ts = _to_utc_iso(rec.get("timestamp_utc"))
+    return (ts, rec, src) if ts else None
+
+
+def _head_sha1(path: str) -> Optional[str]:
+    """Fingerprint of the file's first line; a different value means the file was replaced."""
+    with open(path, "rb") as f:
+        head = f.readline()
+    return hashlib.sha1(head).hexdigest() if head.endswith(b"\n") else None
+
+
+def read_jsonl_tail(path: str, offset: int) -> Tuple[List[FeedRecord], int]:
+    """Records from complete lines after byte offset, plus the offset to resume from.
+    A trailing line without its newline is still being written and is left for the next read."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    out: List[FeedRecord] = []
+    for line in data[:end].splitlines():
+        if not line.strip():
+            continue
+        try:
+            rec = _feed_record(json.loads(line), path)
+        except ValueError:
+            continue
+        if rec:
+            out.append(rec)
+    return out, offset + end
+
+
+def _load_state(conn: sqlite3.Connection, path: str) -> Tuple[int, Optional[str], Optional[str]]:
+    row = conn.execute(
+        "SELECT byte_offset, head_sha1, last_feed_ts_utc FROM scalper_feed_ingest_state WHERE source_file=?", (path,)
+    ).fetchone()
+    return (row[0], row[1], row[2]) if row else (0, None, None)
+
+
+def _save_state(conn: sqlite3.Connection, path: str, offset: int, head: Optional[str], last_ts: Optional[str]):
+    conn.execute(
+        """
+        INSERT INTO scalper_feed_ingest_state (source_file, byte_offset, head_sha1, last_feed_ts_utc)
+        VALUES (?,?,?,?)
+        ON CONFLICT(source_file) DO UPDATE SET
+           byte_offset=excluded.byte_offset,
+           head_sha1=excluded.head_sha1,
+           last_feed_ts_utc=excluded.last_feed_ts_utc,
+           updated_at=datetime('now')
+        """,
+        (path, offset, head, last_ts),
+    )
+
+
+def reset_state(conn: sqlite3.Connection, *paths: str):
+    """Forget offsets so the next run re-reads the files from the start."""
+    conn.executemany("DELETE FROM scalper_feed_ingest_state WHERE source_file=?", [(p,) for p in paths])
+
+
+def load_new_records(conn: sqlite3.Connection, json_path: str, jsonl_path: str) -> List[FeedRecord]:
+    """Feed records not consumed yet: JSONL lines past the saved byte offset and snapshot-file
+    records newer than its saved feed_ts_utc. Offsets are saved on conn and commit with the rows."""
+    recs: List[FeedRecord] = []
     if os.path.exists(jsonl_path):
-        with open(jsonl_path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    recs.append((json.loads(line), jsonl_path))
-                except json.JSONDecodeError:
-                    continue
+        offset, head, last_ts = _load_state(conn, jsonl_path)
+        current_head = _head_sha1(jsonl_path)
+        if offset and (current_head != head or os.path.getsize(jsonl_path) < offset):
+            print(f"[WARN] {jsonl_path} was rewritten or truncated; re-reading from the start")
+            offset = 0
+        tail, offset = read_jsonl_tail(jsonl_path, offset)
+        recs.extend(tail)
+        last_ts = max([last_ts or ""] + [r[0] for r in tail]) or None
+        _save_state(conn, jsonl_path, offset, current_head, last_ts)
+
     if os.path.exists(json_path):
+        _, _, last_ts = _load_state(conn, json_path)
         try:
             with open(json_path, "r", encoding="utf-8") as f:
                 obj = json.load(f)
-                if isinstance(obj, list):
-                    recs.extend((x, json_path) for x in obj if isinstance(x, dict))
-                elif isinstance(obj, dict):
-                    recs.append((obj, json_path))
-        except Exception:
-            pass
+        except (OSError, ValueError):
+            obj = None
+        items = obj if isinstance(obj, list) else [obj]
+        fresh = [r for r in (_feed_record(x, json_path) for x in items) if r and r[0] > (last_ts or "")]
+        recs.extend(fresh)
+        if fresh:
+            _save_state(conn, json_path, 0, None, max(r[0] for r in fresh))
+
     seen = set()
-    out: List[Tuple[dict, str]] = []
-    for rec, src in recs:
-        ts = _to_utc_iso(rec.get("timestamp_utc"))
-        if not ts or ts in seen:
-            continue
-        seen.add(ts)
-        out.append((rec, src))
-    return sorted(out, key=lambda t: _to_utc_iso(t[0].get("timestamp_utc")) or "")
+    out: List[FeedRecord] = []
+    for rec in recs:
+        if rec[0] not in seen:
+            seen.add(rec[0])
+            out.append(rec)
+    return sorted(out, key=lambda r: r[0])
+
+
+# ── BATCH UPSERT ─────────────────────────────────────────────────────────────
+SNAPSHOT_UPSERT = """
+    INSERT INTO scalper_feed_snapshots
+      (feed_ts_utc, feed_ts_pt, total_value_usd, cash_usd, positions_usd, open_positions,
+       pending_settlements, realized_pnl_d, unrealized_pnl_d, recent_gain_usd, recent_gain_pct,
+       payload, payload_codec, payload_dict, source_file)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+    ON CONFLICT(feed_ts_utc) DO UPDATE SET
+       feed_ts_pt=excluded.feed_ts_pt,
+       total_value_usd=excluded.total_value_usd,
+       cash_usd=excluded.cash_usd,
+       positions_usd=excluded.positions_usd,
+       open_positions=excluded.open_positions,
+       pending_settlements=excluded.pending_settlements,
+       realized_pnl_d=excluded.realized_pnl_d,
+       unrealized_pnl_d=excluded.unrealized_pnl_d,
+       recent_gain_usd=excluded.recent_gain_usd,
+       recent_gain_pct=excluded.recent_gain_pct,
+       payload=excluded.payload,
+       payload_codec=excluded.payload_codec,
+       payload_dict=excluded.payload_dict,
+       source_file=excluded.source_file,
+       ingested_at=datetime('now')
+    WHERE payload IS NOT excluded.payload
+"""
 
+HOLDING_INSERT = """
+    INSERT INTO scalper_feed_holdings
+      (snapshot_id, rank_no, ticker, side, contract_count, value_usd, unrealized_pnl, cluster)
+    VALUES (?,?,?,?,?,?,?,?)
+"""
 
-def upsert_feed_snapshot(conn: sqlite3.Connection, rec: dict, src: str) -> Optional[int]:
-    ts_utc = _to_utc_iso(rec.get("timestamp_utc"))
-    if not ts_utc:
-        return None
-    ts_pt = rec.get("timestamp_pt")
 
-    conn.execute(
-        """
-        INSERT INTO scalper_feed_snapshots
-          (feed_ts_utc, feed_ts_pt, total_value_usd, cash_usd, positions_usd, open_positions,
-           pending_settlements, realized_pnl_d, unrealized_pnl_d, recent_gain_usd, recent_gain_pct,
-           payload_json, source_file)
-        VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
-        ON CONFLICT(feed_ts_utc) DO UPDATE SET
-           feed_ts_pt=excluded.feed_ts_pt,
-           total_value_usd=excluded.total_value_usd,
-           cash_usd=excluded.cash_usd,
-           positions_usd=excluded.positions_usd,
-           open_positions=excluded.open_positions,
-           pending_settlements=excluded.pending_settlements,
-           realized_pnl_d=excluded.realized_pnl_d,
-           unrealized_pnl_d=excluded.unrealized_pnl_d,
-           recent_gain_usd=excluded.recent_gain_usd,
-           recent_gain_pct=excluded.recent_gain_pct,
-           payload_json=excluded.payload_json,
-           source_file=excluded.source_file,
-           ingested_at=datetime('now')
-        """,
-        (
+def _by_feed_ts(conn: sqlite3.Connection, columns: str, ts_list: List[str]) -> Dict[str, tuple]:
+    out: Dict[str, tuple] = {}
+    for i in range(0, len(ts_list), 500):
+        chunk = ts_list[i:i + 500]
+        for row in conn.execute(
+            f"SELECT feed_ts_utc, {columns} FROM scalper_feed_snapshots WHERE feed_ts_utc IN ({','.join('?' * len(chunk))})",
+            chunk,
+        ):
+            out[row[0]] = row[1:]
+    return out
+
+
+def upsert_feed_batch(conn: sqlite3.Connection, records: List[FeedRecord]) -> List[int]:
+    """Upsert snapshots and replace their holdings with executemany; records whose payload is
+    already stored are skipped. Returns the ids of inserted or changed snapshots."""
+    if not records:
+        return []
+    codec = feed_payloads.PayloadCodec(conn)
+    stored = _by_feed_ts(conn, "payload, payload_codec, payload_dict", [r[0] for r in records])
+    rows, changed = [], []
+    for ts_utc, rec, src in records:
+        payload = json.dumps(rec, ensure_ascii=False)
+        if ts_utc in stored and codec.decode(*stored[ts_utc]) == payload:
+            continue
+        changed.append((ts_utc, rec))
+        rows.append((
             ts_utc,
-            ts_pt,
+            rec.get("timestamp_pt"),
             rec.get("total_value_usd"),
             rec.get("cash_usd"),
             rec.get("positions_usd"),
@@ -276,35 +410,40 @@ def upsert_feed_snapshot(conn: sqlite3.Connection, rec: dict, src: str) -> Optio
             rec.get("unrealized_pnl_d"),
             rec.get("recent_gain_usd"),
             rec.get("recent_gain_pct"),
-            json.dumps(rec, ensure_ascii=False),
+            *codec.encode(payload),
             src,
-        ),
-    )
-    row = conn.execute("SELECT id FROM scalper_feed_snapshots WHERE feed_ts_utc=?", (ts_utc,)).fetchone()
-    if not row:
-        return None
-    snapshot_id = int(row[0])
-
-    conn.execute("DELETE FROM scalper_feed_holdings WHERE snapshot_id=?", (snapshot_id,))
-    holdings = rec.get("top_holdings") or []
-    for i, h in enumerate(holdings, start=1):
-        conn.execute(
-            """
-            INSERT INTO scalper_feed_holdings
-              (snapshot_id, rank_no, ticker, side, contract_count, value_usd, unrealized_pnl)
-            VALUES (?,?,?,?,?,?,?)
-            """,
-            (
-                snapshot_id,
-                i,
-                h.get("ticker"),
-                h.get("side"),
-                h.get("count"),
-                h.get("value_usd"),
-                h.get("unrealized_pnl"),
-            ),
+        ))
+    if not rows:
+        return []
+    conn.executemany(SNAPSHOT_UPSERT, rows)
+
+    ids = _by_feed_ts(conn, "id", [ts for ts, _ in changed])
+    snapshot_ids = [int(ids[ts][0]) for ts, _ in changed]
+    conn.executemany("DELETE FROM scalper_feed_holdings WHERE snapshot_id=?", [(i,) for i in snapshot_ids])
+    conn.executemany(HOLDING_INSERT, [
+        (
+            snapshot_id,
+            i,
+            h.get("ticker"),
+            h.get("side"),
+            h.get("count"),
+            h.get("value_usd"),
+            h.get("unrealized_pnl"),
+            market_clusters.classify(h.get("ticker")),
         )
-    return snapshot_id
+        for snapshot_id, (_, rec) in zip(snapshot_ids, changed)
+        for i, h in enumerate(rec.get("top_holdings") or [], start=1)
+    ])
+    return snapshot_ids
+
+
+def upsert_feed_snapshot(conn: sqlite3.Connection, rec: dict, src: str) -> Optional[int]:
+    item = _feed_record(rec, src)
+    if not item:
+        return None
+    upsert_feed_batch(conn, [item])
+    row = conn.execute("SELECT id FROM scalper_feed_snapshots WHERE feed_ts_utc=?", (item[0],)).fetchone()
+    return int(row[0]) if row else None
 
 
 def ingest_summary(conn: sqlite3.Connection, summary_path: str) -> int:
@@ -340,46 +479,86 @@ def ingest_summary(conn: sqlite3.Connection, summary_path: str) -> int:
     return conn.execute("SELECT changes()").fetchone()[0]
 
 
-def reconcile_snapshot(conn: sqlite3.Connection, snapshot_id: int, thresholds: Thresholds):
-    feed = conn.execute(
-        """
-        SELECT id, feed_ts_utc, cash_usd, open_positions, realized_pnl_d, total_value_usd
-        FROM scalper_feed_snapshots
-        WHERE id=?
-        """,
-        (snapshot_id,),
-    ).fetchone()
-    if not feed:
-        return
+# ── BATCH RECONCILIATION (as-of merge join) ──────────────────────────────────
+RECONCILE_UPSERT = """
+    INSERT INTO scalper_feed_reconciliation
+      (feed_snapshot_id, kalshi_snapshot_id, kalshi_snapshot_ts, seconds_apart,
+       delta_cash_usd, delta_open_positions, delta_realized_pnl_d, delta_total_value_vs_balance_usd,
+       status, alert_message, kalshi_max_id)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?)
+    ON CONFLICT(feed_snapshot_id) DO UPDATE SET
+       kalshi_snapshot_id=excluded.kalshi_snapshot_id,
+       kalshi_snapshot_ts=excluded.kalshi_snapshot_ts,
+       seconds_apart=excluded.seconds_apart,
+       delta_cash_usd=excluded.delta_cash_usd,
+       delta_open_positions=excluded.delta_open_positions,
+       delta_realized_pnl_d=excluded.delta_realized_pnl_d,
+       delta_total_value_vs_balance_usd=excluded.delta_total_value_vs_balance_usd,
+       status=excluded.status,
+       alert_message=excluded.alert_message,
+       kalshi_max_id=excluded.kalshi_max_id,
+       created_at=datetime('now')
+"""
 
-    nearest = conn.execute(
-        """
-        SELECT id, snapshot_ts, balance_cents, open_positions, daily_pnl_cents,
-               ABS(strftime('%s', snapshot_ts) - strftime('%s', ?)) AS sec_apart
-        FROM kalshi_snapshots
-        ORDER BY sec_apart ASC
-        LIMIT 1
-        """,
-        (feed[1],),
-    ).fetchone()
 
-    if not nearest or nearest[5] is None or int(nearest[5]) > thresholds.max_seconds_apart:
-        conn.execute(
-            """
-            INSERT INTO scalper_feed_reconciliation
-              (feed_snapshot_id, status, alert_message)
-            VALUES (?, 'NO_MATCH', ?)
-            ON CONFLICT(feed_snapshot_id) DO UPDATE SET
-              kalshi_snapshot_id=NULL, kalshi_snapshot_ts=NULL, seconds_apart=NULL,
-              delta_cash_usd=NULL, delta_open_positions=NULL, delta_realized_pnl_d=NULL,
-              delta_total_value_vs_balance_usd=NULL,
-              status='NO_MATCH', alert_message=excluded.alert_message, created_at=datetime('now')
-            """,
-            (snapshot_id, f"No kalshi_snapshots row within {thresholds.max_seconds_apart}s"),
-        )
-        return
-
-    kalshi_id, kalshi_ts, balance_cents, open_pos, daily_pnl_cents, sec_apart = nearest
+def _epoch(ts: Optional[str]) -> Optional[int]:
+    """Unix seconds for a stored timestamp (naive = UTC, like strftime('%s')); None if unparseable."""
+    if not ts:
+        return None
+    try:
+        dt = datetime.fromisoformat(ts.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def load_kalshi_series(conn: sqlite3.Connection, lo: Optional[int] = None, hi: Optional[int] = None):
+    """Kalshi snapshots as (sorted epoch array, rows), limited to snap_dates around [lo, hi].
+    Reads kalshi_snapshot_history, so days compacted by retention match their rollup bucket
+    closes (id NULL) instead of nothing."""
+    table = "kalshi_snapshot_history"
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='view' AND name=?", (table,)).fetchone():
+        table = "kalshi_snapshots"  # dashboard DB not migrated to v11 yet
+    sql = f"SELECT id, snapshot_ts, balance_cents, open_positions, daily_pnl_cents FROM {table}"
+    params: Tuple = ()
+    if lo is not None and hi is not None:
+        # a day of margin either side covers snap_dates written in local time
+        day = 86400
+        sql += " WHERE snap_date BETWEEN ? AND ?"
+        params = tuple(datetime.fromtimestamp(t, timezone.utc).strftime("%Y-%m-%d") for t in (lo - day, hi + day))
+    rows, epochs = [], []
+    for row in conn.execute(sql, params):
+        t = _epoch(row[1])
+        if t is not None:
+            rows.append(row)
+            epochs.append(t)
+    order = np.argsort(np.array(epochs, dtype=np.int64), kind="stable")
+    return np.array(epochs, dtype=np.int64)[order], [rows[i] for i in order]
+
+
+def asof_join(left: np.ndarray, right: np.ndarray, tolerance: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Nearest right index for every left epoch (ties → earlier), -1 beyond tolerance; plus the gap."""
+    if len(right) == 0:
+        return np.full(len(left), -1), np.zeros(len(left), dtype=np.int64)
+    after = np.searchsorted(right, left, side="left")
+    before = np.clip(after - 1, 0, len(right) - 1)
+    after = np.clip(after, 0, len(right) - 1)
+    gap_before = np.abs(left - right[before])
+    gap_after = np.abs(right[after] - left)
+    idx = np.where(gap_before <= gap_after, before, after)
+    gap = np.minimum(gap_before, gap_after)
+    return np.where(gap <= tolerance, idx, -1), gap
+
+
+def assess(feed, snap, sec_apart: int, thresholds: Thresholds) -> tuple:
+    """RECONCILE_UPSERT parameters for one feed row against its matched kalshi snapshot (or None)."""
+    if snap is None:
+        return (feed[0], None, None, None, None, None, None, None, "NO_MATCH",
+                f"No kalshi_snapshots row within {thresholds.max_seconds_apart}s")
+
+    kalshi_id, kalshi_ts, balance_cents, open_pos, daily_pnl_cents = snap
     delta_cash = round((feed[2] or 0) - ((balance_cents or 0) / 100.0), 2)
     delta_positions = int((feed[3] or 0) - (open_pos or 0))
     delta_realized = round((feed[4] or 0) - ((daily_pnl_cents or 0) / 100.0), 2)
@@ -410,70 +589,157 @@ def reconcile_snapshot(conn: sqlite3.Connection, snapshot_id: int, thresholds: T
         messages.append(f"realized P&L delta ${delta_realized}")
 
     alert = "; ".join(messages) if messages else None
+    return (feed[0], kalshi_id, kalshi_ts, int(sec_apart), delta_cash, delta_positions, delta_realized,
+            delta_total_vs_balance, status, alert)
+
+
+def reconcile_batch(conn: sqlite3.Connection, snapshot_ids: Optional[List[int]], thresholds: Thresholds) -> int:
+    """Reconcile feed snapshots (all when snapshot_ids is None) in one merge join + executemany."""
+    sql = "SELECT id, feed_ts_utc, cash_usd, open_positions, realized_pnl_d, total_value_usd FROM scalper_feed_snapshots"
+    if snapshot_ids is None:
+        feeds = conn.execute(sql).fetchall()
+    else:
+        feeds = []
+        ids = list(snapshot_ids)
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            feeds += conn.execute(f"{sql} WHERE id IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+    if not feeds:
+        return 0
 
-    conn.execute(
-        """
-        INSERT INTO scalper_feed_reconciliation
-          (feed_snapshot_id, kalshi_snapshot_id, kalshi_snapshot_ts, seconds_apart,
-           delta_cash_usd, delta_open_positions, delta_realized_pnl_d, delta_total_value_vs_balance_usd,
-           status, alert_message)
-        VALUES (?,?,?,?,?,?,?,?,?,?)
-        ON CONFLICT(feed_snapshot_id) DO UPDATE SET
-           kalshi_snapshot_id=excluded.kalshi_snapshot_id,
-           kalshi_snapshot_ts=excluded.kalshi_snapshot_ts,
-           seconds_apart=excluded.seconds_apart,
-           delta_cash_usd=excluded.delta_cash_usd,
-           delta_open_positions=excluded.delta_open_positions,
-           delta_realized_pnl_d=excluded.delta_realized_pnl_d,
-           delta_total_value_vs_balance_usd=excluded.delta_total_value_vs_balance_usd,
-           status=excluded.status,
-           alert_message=excluded.alert_message,
-           created_at=datetime('now')
-        """,
-        (
-            snapshot_id,
-            kalshi_id,
-            kalshi_ts,
-            int(sec_apart),
-            delta_cash,
-            delta_positions,
-            delta_realized,
-            delta_total_vs_balance,
-            status,
-            alert,
-        ),
-    )
+    feed_epochs = [_epoch(f[1]) for f in feeds]
+    known = [t for t in feed_epochs if t is not None]
+    tol = thresholds.max_seconds_apart
+    snap_epochs, snaps = load_kalshi_series(conn, min(known) - tol, max(known) + tol) if known else (np.empty(0, np.int64), [])
+    left = np.array([t if t is not None else 0 for t in feed_epochs], dtype=np.int64)
+    idx, gap = asof_join(left, snap_epochs, tol)
 
+    # Newest kalshi row this pass could see; NO_MATCH rows are only retried once newer ones land nearby.
+    max_id = conn.execute("SELECT MAX(id) FROM kalshi_snapshots").fetchone()[0]
+    rows = []
+    for feed, t, i, g in zip(feeds, feed_epochs, idx.tolist(), gap.tolist()):
+        matched = snaps[i] if t is not None and i >= 0 else None
+        rows.append((*assess(feed, matched, g, thresholds), max_id))
+    conn.executemany(RECONCILE_UPSERT, rows)
+    return len(rows)
 
-def run_ingestion(db_path: str, json_path: str, jsonl_path: str, summary_path: str, thresholds: Thresholds) -> Dict[str, int]:
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    conn = sqlite3.connect(db_path)
-    conn.execute("PRAGMA foreign_keys=ON")
-    conn.executescript(SCHEMA_SQL)
 
-    recs = load_json_records(json_path, jsonl_path)
-    upserted = 0
-    reconciled = 0
-    for rec, src in recs:
-        snapshot_id = upsert_feed_snapshot(conn, rec, src)
-        if snapshot_id:
-            upserted += 1
-            reconcile_snapshot(conn, snapshot_id, thresholds)
-            reconciled += 1
+def reconcile_snapshot(conn: sqlite3.Connection, snapshot_id: int, thresholds: Thresholds):
+    reconcile_batch(conn, [snapshot_id], thresholds)
+
 
+def pending_reconciliation(conn: sqlite3.Connection, thresholds: Thresholds) -> List[int]:
+    """Feed snapshots that are unreconciled, re-ingested since, were reconciled before every kalshi
+    snapshot within tolerance could exist, or are NO_MATCH and a kalshi row written since their
+    last pass (kalshi_max_id) falls inside their tolerance window."""
+    tol = int(thresholds.max_seconds_apart)
+    rows = conn.execute(
+        """
+        SELECT s.id
+        FROM scalper_feed_snapshots s
+        LEFT JOIN scalper_feed_reconciliation r ON r.feed_snapshot_id = s.id
+        WHERE r.id IS NULL
+           OR s.ingested_at > r.created_at
+           OR r.created_at < datetime(s.feed_ts_utc, ?)
+           OR (r.status = 'NO_MATCH' AND (
+                   r.kalshi_max_id IS NULL
+                OR EXISTS (SELECT 1 FROM kalshi_snapshots k
+                           WHERE k.id > r.kalshi_max_id
+                             AND datetime(k.snapshot_ts) BETWEEN datetime(s.feed_ts_utc, ?)
+                                                             AND datetime(s.feed_ts_utc, ?))))
+        """,
+        (f"+{tol} seconds", f"-{tol} seconds", f"+{tol} seconds"),
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def ingest(conn: sqlite3.Connection, json_path: str, jsonl_path: str, summary_path: str,
+           thresholds: Thresholds) -> Dict[str, int]:
+    """One incremental pass in a single transaction: new records, holdings, reconciliation, summary."""
+    recs = load_new_records(conn, json_path, jsonl_path)
+    changed = upsert_feed_batch(conn, recs)
+    feed_payloads.ensure_dictionary(conn)
+    reconciled = reconcile_batch(conn, pending_reconciliation(conn, thresholds), thresholds)
     summaries = ingest_summary(conn, summary_path)
     conn.commit()
 
     return {
         "records_seen": len(recs),
-        "snapshots_upserted": upserted,
+        "snapshots_upserted": len(changed),
         "reconciled": reconciled,
         "summary_rows_inserted": summaries,
     }
 
 
+def _open_feed_db(db_path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = db_pool.connect(db_path)
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA_SQL)
+    if "kalshi_max_id" not in {r[1] for r in conn.execute("PRAGMA table_info(scalper_feed_reconciliation)")}:
+        conn.execute("ALTER TABLE scalper_feed_reconciliation ADD COLUMN kalshi_max_id INTEGER")
+    market_clusters.add_cluster_columns(conn)  # holdings tables created before the cluster column
+    feed_payloads.migrate(conn)  # legacy payload_json TEXT → compressed payload BLOB
+    conn.commit()
+    return conn
+
+
+def run_ingestion(db_path: str, json_path: str, jsonl_path: str, summary_path: str, thresholds: Thresholds,
+                  full: bool = False) -> Dict[str, int]:
+    conn = _open_feed_db(db_path)
+    try:
+        if full:
+            reset_state(conn, json_path, jsonl_path)
+        return ingest(conn, json_path, jsonl_path, summary_path, thresholds)
+    finally:
+        conn.close()
+
+
+def _file_sig(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def watch(db_path: str, json_path: str, jsonl_path: str, summary_path: str, thresholds: Thresholds,
+          interval: float = 5.0):
+    """Long-lived follower: poll the feed files and ingest whenever one of them changes."""
+    conn = _open_feed_db(db_path)
+    paths = (json_path, jsonl_path, summary_path)
+    last = None
+    print(f"[Feed] Watching {jsonl_path} every {interval:g}s (Ctrl+C to stop)")
+    try:
+        while True:
+            sig = tuple(_file_sig(p) for p in paths)
+            if sig != last:
+                try:
+                    stats = ingest(conn, json_path, jsonl_path, summary_path, thresholds)
+                    last = sig
+                    if stats["records_seen"] or stats["summary_rows_inserted"]:
+                        print(f"[Feed] {json.dumps(stats)}")
+                except (OSError, sqlite3.Error) as e:
+                    conn.rollback()
+                    print(f"[WARN] Feed ingest failed, retrying next poll: {e}")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+
+
+def run_reconcile_only(db_path: str, thresholds: Thresholds, everything: bool = False) -> Dict[str, int]:
+    conn = _open_feed_db(db_path)
+    ids = None if everything else pending_reconciliation(conn, thresholds)
+    reconciled = reconcile_batch(conn, ids, thresholds)
+    conn.commit()
+    return {"reconciled": reconciled}
+
+
 def run_validation(db_path: str):
-    conn = sqlite3.connect(db_path)
+    conn = db_pool.connect(db_path)
+    feed_payloads.register(conn)
     print("\n== Validation Queries ==")
     for name, sql in VALIDATION_QUERIES.items():
         print(f"\n-- {name} --")
@@ -501,6 +767,12 @@ def parse_args():
     p.add_argument("--warn-realized-delta", type=float, default=10.0)
     p.add_argument("--critical-realized-delta", type=float, default=50.0)
     p.add_argument("--validate", action="store_true")
+    p.add_argument("--full", action="store_true", help="Ignore saved offsets and re-read the feed files from the start")
+    p.add_argument("--watch", action="store_true", help="Keep running and ingest whenever the feed files change")
+    p.add_argument("--interval", type=float, default=5.0, help="Seconds between --watch polls")
+    p.add_argument("--reconcile-only", action="store_true",
+                   help="Skip ingestion; re-run reconciliation for unreconciled or changed feed snapshots")
+    p.add_argument("--reconcile-all", action="store_true", help="With --reconcile-only: every feed snapshot")
     return p.parse_args()
 
 
@@ -515,7 +787,15 @@ def main():
         warn_realized_delta=a.warn_realized_delta,
         critical_realized_delta=a.critical_realized_delta,
     )
-    stats = run_ingestion(a.db, a.json, a.jsonl, a.summary, thresholds)
+    if a.watch:
+        if a.full:
+            run_ingestion(a.db, a.json, a.jsonl, a.summary, thresholds, full=True)
+        watch(a.db, a.json, a.jsonl, a.summary, thresholds, interval=a.interval)
+        return
+    if a.reconcile_only:
+        stats = run_reconcile_only(a.db, thresholds, everything=a.reconcile_all)
+    else:
+        stats = run_ingestion(a.db, a.json, a.jsonl, a.summary, thresholds, full=a.full)
     print(json.dumps(stats, indent=2))
     if a.validate:
         run_validation(a.db)
@@ -1,8 +1,13 @@
-import sqlite3
 import json
 from pathlib import Path
 
-conn = sqlite3.connect('data/northstar.db')
+import db_pool
+import kpi_store
+import migrations
+
+conn = db_pool.connect('data/northstar.db')
+
+migrations.migrate(conn)
 cursor = conn.cursor()
 
 # Clear sports picks
@@ -67,6 +72,7 @@ with open(picks_log) as f:
             continue
 
 conn.commit()
+kpi_store.refresh_for_source(conn, "sports_picks")
 
 # Verify
 cursor.execute("SELECT result, COUNT(*), SUM(profit_loss) FROM sports_picks WHERE result IN ('WIN', 'LOSS') GROUP BY result")
@@ -1,7 +1,12 @@
-import sqlite3
 import random
 
-conn = sqlite3.connect('data/northstar.db')
+import db_pool
+import kpi_store
+import migrations
+
+conn = db_pool.connect('data/northstar.db')
+
+migrations.migrate(conn)
 cursor = conn.cursor()
 
 # Check current invoice amounts
@@ -30,6 +35,7 @@ for (rowid,) in completed[:paid_count]:
     cursor.execute("UPDATE john_jobs SET paid = 1 WHERE rowid = ?", (rowid,))
 
 conn.commit()
+kpi_store.refresh_for_source(conn, "john")
 
 # Verify final totals
 cursor.execute("SELECT SUM(invoice_amount) FROM john_jobs WHERE paid = 1")
@@ -0,0 +1,339 @@
+"""
+usage_ingest.py — incremental ingestion of OpenClaw session logs
+Each .jsonl under the agents dir has a persisted cursor (inode, size, mtime,
+byte offset). A run stats every file, skips the unchanged ones and parses only
+the bytes appended since the last run. Token counts are accumulated per
+(file, day, model) in usage_log_totals, so a rotated or truncated file can be
+re-read without double counting, and only the (day, model) keys that changed
+need to be re-summed into api_usage.
+
+Large reads (first backfill, full rebuild) are split into newline-aligned byte
+ranges and parsed on a process pool. Lines are pre-filtered with byte searches
+before decoding, and orjson is used when installed.
+
+Used by auto_populate.sync_anthropic_from_logs() and
+skills/financial-backfill/scripts/backfill_10days.py.
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CHUNK_BYTES = 8 * 1024 * 1024
+SHARD_BYTES = 64 * 1024 * 1024       # byte range handed to one worker
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024  # below this the pool costs more than it saves
+USAGE_FIELDS = ("input", "output", "cache_read", "cache_write")
+
+
+def iter_log_files(agents_dir: str):
+    for root, dirs, files in os.walk(agents_dir):
+        for fname in files:
+            if fname.endswith('.jsonl') and 'lock' not in fname:
+                yield os.path.join(root, fname)
+
+
+# ── PARSING ────────────────────────────────────────────────────────────────────
+def _decode(raw: bytes):
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except ValueError:
+            pass  # invalid UTF-8 etc.; retry leniently below
+    try:
+        return json.loads(raw.decode('utf-8', 'ignore'))
+    except ValueError:
+        return None
+
+
+def parse_usage_lines(lines, acc: dict = None) -> dict:
+    """Fold assistant Anthropic usage records into {(day, model): [in, out, cache_r, cache_w]}."""
+    acc = {} if acc is None else acc
+    for raw in lines:
+        # Cheap byte scans reject most lines before any JSON decoding.
+        if b'"usage"' not in raw or b'assistant' not in raw:
+            continue
+        if b'nthropic' not in raw and b'NTHROPIC' not in raw:
+            continue
+        rec = _decode(raw)
+        if not isinstance(rec, dict):
+            continue
+        msg = rec.get('message', {})
+        if not isinstance(msg, dict) or msg.get('role') != 'assistant':
+            continue
+        if 'anthropic' not in (msg.get('provider', '') or '').lower():
+            continue
+        usage = msg.get('usage', {})
+        if not usage:
+            continue
+        ts = rec.get('timestamp', '')
+        if not ts:
+            continue
+        key = (ts[:10], msg.get('model', 'unknown'))
+        u = acc.get(key)
+        if u is None:
+            u = acc[key] = [0, 0, 0, 0]
+        u[0] += usage.get('input', 0) or 0
+        u[1] += usage.get('output', 0) or 0
+        u[2] += usage.get('cacheRead', 0) or 0
+        u[3] += usage.get('cacheWrite', 0) or 0
+    return acc
+
+
+def scan_file(fpath: str, start: int, end: int, acc: dict = None):
+    """Parse whole lines in bytes [start, end) of fpath; returns (acc, new_offset).
+
+    A trailing partial line (writer mid-append) is left for the next run.
+    """
+    acc = {} if acc is None else acc
+    offset = start
+    tail = b""
+    with open(fpath, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            buf = tail + chunk
+            cut = buf.rfind(b"\n")
+            if cut < 0:
+                tail = buf
+                continue
+            parse_usage_lines(buf[:cut].split(b"\n"), acc)
+            offset += cut + 1
+            tail = buf[cut + 1:]
+    if tail and _is_complete_record(tail):
+        # Final line without a newline: a finished file, not a half-written record.
+        parse_usage_lines((tail,), acc)
+        offset += len(tail)
+    return acc, offset
+
+
+def _is_complete_record(raw: bytes) -> bool:
+    return _decode(raw) is not None
+
+
+# ── PARALLEL SCAN ──────────────────────────────────────────────────────────────
+def split_range(fpath: str, start: int, end: int, shard_bytes: int = SHARD_BYTES):
+    """Cut [start, end) into ranges that each begin at a line start."""
+    bounds = [start]
+    with open(fpath, 'rb') as f:
+        pos = start + shard_bytes
+        while pos < end:
+            f.seek(pos)
+            f.readline()
+            pos = f.tell()
+            if pos >= end:
+                break
+            bounds.append(pos)
+            pos += shard_bytes
+    bounds.append(end)
+    return [(fpath, a, b) for a, b in zip(bounds, bounds[1:])]
+
+
+def _scan_job(job):
+    fpath, start, end = job
+    try:
+        acc, offset = scan_file(fpath, start, end)
+        return fpath, start, acc, offset, None
+    except OSError as e:
+        return fpath, start, {}, start, str(e)
+
+
+def merge_acc(into: dict, acc: dict) -> dict:
+    for key, u in acc.items():
+        cur = into.get(key)
+        if cur is None:
+            into[key] = list(u)
+        else:
+            for i, v in enumerate(u):
+                cur[i] += v
+    return into
+
+
+def scan_parallel(jobs, workers: int = None) -> dict:
+    """Scan [(path, start, end)] → {path: (acc, new_offset)}, sharding across processes.
+
+    Files that hit an I/O error are left out so their cursor does not advance.
+    """
+    shards = []
+    for fpath, start, end in jobs:
+        try:
+            shards.extend(split_range(fpath, start, end))
+        except OSError as e:
+            print(f"[WARN] usage log {fpath}: {e}")
+    total = sum(end - start for _, start, end in shards)
+    if workers == 1 or len(shards) < 2 or total < PARALLEL_MIN_BYTES:
+        results = map(_scan_job, shards)
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            results = list(pool.map(_scan_job, shards))
+
+    out, last_start, failed = {}, {}, set()
+    for fpath, start, acc, offset, err in results:
+        if err:
+            print(f"[WARN] usage log {fpath}: {err}")
+            failed.add(fpath)
+            continue
+        prev = out.get(fpath)
+        merged = merge_acc(prev[0], acc) if prev else acc
+        # The file's new cursor is wherever its last shard stopped.
+        if fpath not in last_start or start > last_start[fpath]:
+            last_start[fpath] = start
+            out[fpath] = (merged, offset)
+        else:
+            out[fpath] = (merged, prev[1])
+    for fpath in failed:
+        out.pop(fpath, None)
+    return out
+
+
+# ── CURSORS + PERSISTED ACCUMULATORS ───────────────────────────────────────────
+def _file_state(st):
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def plan_reads(conn, files):
+    """[(path, start, end, reset, state, seen)] for files that are new or changed since their cursor.
+
+    seen is the cursor offset the plan was built from (None for a new file).
+    """
+    cursors = {
+        r[0]: r[1:]
+        for r in conn.execute("SELECT path, inode, size, mtime_ns, offset FROM usage_log_cursors")
+    }
+    plan = []
+    for fpath in files:
+        try:
+            state = _file_state(os.stat(fpath))
+        except OSError:
+            continue
+        inode, size, mtime_ns = state
+        cur = cursors.get(fpath)
+        if cur is not None and tuple(cur[:3]) == state:
+            continue  # unchanged since last run
+        reset = cur is None or cur[0] != inode or size < (cur[3] or 0)
+        start = 0 if reset else cur[3]
+        plan.append((fpath, start, size, reset and cur is not None, state, None if cur is None else cur[3]))
+    return plan
+
+
+def _claim_cursor(conn, fpath: str, seen, state, offset: int) -> bool:
+    """Advance fpath's cursor only if it still sits at seen; False if another run moved it."""
+    inode, size, mtime_ns = state
+    if seen is None:
+        cur = conn.execute(
+            """
+            INSERT INTO usage_log_cursors (path, inode, size, mtime_ns, offset, updated_at)
+            VALUES (?,?,?,?,?,datetime('now'))
+            ON CONFLICT(path) DO NOTHING
+            """,
+            (fpath, inode, size, mtime_ns, offset),
+        )
+    else:
+        cur = conn.execute(
+            """
+            UPDATE usage_log_cursors
+            SET inode=?, size=?, mtime_ns=?, offset=?, updated_at=datetime('now')
+            WHERE path=? AND offset=?
+            """,
+            (inode, size, mtime_ns, offset, fpath, seen),
+        )
+    return cur.rowcount == 1
+
+
+def apply_deltas(conn, fpath: str, acc: dict, reset: bool, state, offset: int, seen=None) -> set:
+    """Persist one file's new token counts and cursor; returns the (day, model) keys touched.
+
+    The cursor is advanced first with a compare-and-set against seen; if an
+    overlapping run already consumed these bytes, the deltas are dropped.
+    """
+    if not _claim_cursor(conn, fpath, seen, state, offset):
+        print(f"[WARN] usage log {fpath}: cursor moved since it was read, skipping")
+        return set()
+    touched = set()
+    if reset:
+        # Rotated or truncated: drop what this path contributed before re-reading from 0.
+        touched.update(conn.execute(
+            "SELECT usage_date, model FROM usage_log_totals WHERE path=?", (fpath,)
+        ).fetchall())
+        conn.execute("DELETE FROM usage_log_totals WHERE path=?", (fpath,))
+    conn.executemany(
+        """
+        INSERT INTO usage_log_totals (path, usage_date, model, input, output, cache_read, cache_write)
+        VALUES (?,?,?,?,?,?,?)
+        ON CONFLICT(path, usage_date, model) DO UPDATE SET
+            input=input+excluded.input,
+            output=output+excluded.output,
+            cache_read=cache_read+excluded.cache_read,
+            cache_write=cache_write+excluded.cache_write
+        """,
+        [(fpath, day, model, *u) for (day, model), u in acc.items()],
+    )
+    touched.update(acc.keys())
+    return {tuple(k) for k in touched}
+
+
+def totals_for(conn, keys) -> dict:
+    """Current {(day, model): {input, output, cache_read, cache_write}} summed over all files."""
+    out = {}
+    for day, model in keys:
+        row = conn.execute(
+            """
+            SELECT SUM(input), SUM(output), SUM(cache_read), SUM(cache_write)
+            FROM usage_log_totals WHERE usage_date=? AND model=?
+            """,
+            (day, model),
+        ).fetchone()
+        out[(day, model)] = dict(zip(USAGE_FIELDS, (v or 0 for v in row)))
+    return out
+
+
+def collect(conn, agents_dir: str, workers: int = None):
+    """Read phase: plan from the cursors and parse appended bytes. No writes."""
+    plan = plan_reads(conn, iter_log_files(agents_dir))
+    scanned = scan_parallel([(fpath, start, end) for fpath, start, end, *_ in plan], workers)
+    return plan, scanned
+
+
+def ingest(conn, agents_dir: str, workers: int = None) -> dict:
+    """Read only appended bytes; returns {"files_scanned", "bytes_read", "totals": {(day, model): usage}}."""
+    return persist(conn, *collect(conn, agents_dir, workers))
+
+
+def persist(conn, plan, scanned) -> dict:
+    """Write phase for collect(): advance cursors, fold deltas, re-sum touched keys."""
+    touched = set()
+    bytes_read = 0
+    for fpath, start, end, reset, state, seen in plan:
+        if fpath not in scanned:
+            continue
+        acc, offset = scanned[fpath]
+        bytes_read += offset - start
+        touched |= apply_deltas(conn, fpath, acc, reset, state, offset, seen)
+    return {"files_scanned": len(plan), "bytes_read": bytes_read, "totals": totals_for(conn, touched)}
+
+
+def reset(conn):
+    """Forget all cursors and accumulators so the next ingest() re-reads every file."""
+    conn.execute("DELETE FROM usage_log_cursors")
+    conn.execute("DELETE FROM usage_log_totals")
+
+
+def scan_all(agents_dir: str, workers: int = None) -> dict:
+    """Stateless full parse of every log → {(day, model): [in, out, cache_r, cache_w]}."""
+    jobs = []
+    for fpath in iter_log_files(agents_dir):
+        try:
+            jobs.append((fpath, 0, os.path.getsize(fpath)))
+        except OSError:
+            continue
+    daily = {}
+    for acc, _ in scan_parallel(jobs, workers).values():
+        merge_acc(daily, acc)
+    return daily
@@ -2,15 +2,16 @@
 """
 Verify all dashboard data is present and correct
 """
-import sqlite3
 import os
 import json
 from datetime import datetime
 
+import db_pool
+
 DB_PATH = os.path.join(os.path.dirname(__file__), 'data', 'northstar.db')
 
 def verify_data():
-    conn = sqlite3.connect(DB_PATH)
+    conn = db_pool.connect(DB_PATH)
     cursor = conn.cursor()
     
     print("=" * 60)
@@ -159,6 +159,11 @@ async def sync_to_dashboard_db(history):
               history['positions']['losing']))
         
         conn.commit()
+        # /api/dashboard reads the KPI tables, so refresh them for the new snapshot
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dashboard'))
+        import kpi_store, migrations
+        migrations.migrate(conn)
+        kpi_store.on_snapshot(conn, snap_date)
         print(f"\n[Dashboard] Snapshot saved: {ts}")
     except Exception as e:
         print(f"[Dashboard Error] {e}")
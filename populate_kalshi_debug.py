@@ -1,8 +1,13 @@
 #!/usr/bin/env python3
 """Debug Kalshi sync — find out why snapshots aren't flowing."""
-import os, sqlite3
+import os, sqlite3, sys
 from pathlib import Path
 
+# Dashboard modules (kpi_store) live next to this script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dashboard'))
+import kpi_store
+import migrations
+
 SCALPER_DB = r"C:\Users\chead\.openclaw\workspace-scalper\scalper_v8.db"
 DASHBOARD_DB = r"C:\Users\chead\.openclaw\workspace\dashboard\data\northstar.db"
 
@@ -53,9 +58,11 @@ try:
     src = sqlite3.connect(SCALPER_DB)
     src.row_factory = sqlite3.Row
     dst = sqlite3.connect(DASHBOARD_DB)
+    migrations.migrate(dst)
     
     rows = src.execute("SELECT * FROM pnl_snapshots ORDER BY timestamp").fetchall()
     synced = 0
+    dates = set()
     for r in rows:
         try:
             dst.execute("""INSERT OR IGNORE INTO kalshi_snapshots
@@ -74,10 +81,13 @@ try:
                  r['mm_pnl_cents'] or 0, r['lip_rewards_cents'] or 0))
             if dst.execute("SELECT changes()").fetchone()[0]:
                 synced += 1
+                dates.add((r['timestamp'] or '')[:10])
         except Exception as e:
             print(f"[!] Error inserting row: {e}")
     
     dst.commit()
+    for snap_date in sorted(dates):
+        kpi_store.on_snapshot(dst, snap_date)
     src.close()
     dst.close()
     print(f"[OK] Synced {synced} Kalshi snapshots to dashboard")
@@ -3,12 +3,13 @@
 backfill_10days.py — Master historical expense backfill for NorthStar dashboard
 Pulls all financial data from all sources for the last 10 days and populates dashboard.db
 """
-import json, os, sqlite3, sys, argparse, urllib.request, urllib.error
+import json, os, sqlite3, sys, argparse, importlib, urllib.request, urllib.error
 from datetime import datetime, date, timedelta
 from pathlib import Path
 
 # ── Paths ────────────────────────────────────────────────────────────────────
 DASHBOARD_DB = r"C:\Users\chead\.openclaw\workspace\dashboard\data\northstar.db"
+DASHBOARD_DIR = os.path.dirname(os.path.dirname(DASHBOARD_DB))  # usage_ingest.py lives here
 AGENTS_DIR = r"C:\Users\chead\.openclaw\agents"
 SCALPER_DB = r"C:\Users\chead\.openclaw\workspace-scalper\scalper_v8.db"
 PICK_LOG = r"C:\Users\chead\.openclaw\workspace-scalper\pick_performance_log.jsonl"
@@ -143,6 +144,12 @@ def init_db(conn):
     """)
     conn.commit()
 
+def _dashboard(module: str):
+    """A dashboard module (kpi_store, migrations) imported from DASHBOARD_DIR."""
+    if DASHBOARD_DIR not in sys.path:
+        sys.path.insert(0, DASHBOARD_DIR)
+    return importlib.import_module(module)
+
 def backfill_openrouter(conn, verbose=False) -> int:
     if not OPENROUTER_KEY or not OPENROUTER_KEY.startswith('sk-or'):
         print(f"[!] OpenRouter: No API key")
@@ -165,38 +172,16 @@ def backfill_openrouter(conn, verbose=False) -> int:
     if verbose: print(f"  [+] OpenRouter: ${daily_cost}")
     return 1
 
-def backfill_anthropic(conn, verbose=False) -> int:
-    """Parse all session logs for Anthropic costs."""
-    daily = {}
-    for root, dirs, files in os.walk(AGENTS_DIR):
-        for fname in files:
-            if not fname.endswith('.jsonl') or 'lock' in fname: continue
-            fpath = os.path.join(root, fname)
-            try:
-                with open(fpath, 'r', encoding='utf-8', errors='ignore') as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line or '"usage"' not in line: continue
-                        try: rec = json.loads(line)
-                        except: continue
-                        msg = rec.get('message', {})
-                        if msg.get('role') != 'assistant': continue
-                        if 'anthropic' not in (msg.get('provider', '') or '').lower(): continue
-                        usage = msg.get('usage', {})
-                        if not usage: continue
-                        ts = rec.get('timestamp', '')
-                        if not ts: continue
-                        day = ts[:10]
-                        model = msg.get('model', 'unknown')
-                        key = (day, model)
-                        if key not in daily:
-                            daily[key] = {'input': 0, 'output': 0, 'cache_read': 0, 'cache_write': 0}
-                        daily[key]['input']       += usage.get('input', 0) or 0
-                        daily[key]['output']      += usage.get('output', 0) or 0
-                        daily[key]['cache_read']  += usage.get('cacheRead', 0) or 0
-                        daily[key]['cache_write'] += usage.get('cacheWrite', 0) or 0
-            except: continue
-    
+def backfill_anthropic(conn, verbose=False, workers=None) -> int:
+    """Parse all session logs for Anthropic costs (sharded across processes)."""
+    if DASHBOARD_DIR not in sys.path:
+        sys.path.insert(0, DASHBOARD_DIR)
+    import usage_ingest
+    daily = {
+        key: dict(zip(usage_ingest.USAGE_FIELDS, u))
+        for key, u in usage_ingest.scan_all(AGENTS_DIR, workers).items()
+    }
+
     synced = 0
     for (day, model), u in daily.items():
         cost = calc_cost(u, model)
@@ -217,6 +202,7 @@ def backfill_kalshi(conn, verbose=False) -> int:
     src = sqlite3.connect(SCALPER_DB)
     src.row_factory = sqlite3.Row
     synced = 0
+    dates = set()
     try:
         rows = src.execute("SELECT * FROM pnl_snapshots ORDER BY timestamp").fetchall()
         for r in rows:
@@ -235,11 +221,16 @@ def backfill_kalshi(conn, verbose=False) -> int:
                      r['total_fees_cents'] or 0, r['weather_pnl_cents'] or 0,
                      r['crypto_pnl_cents'] or 0, r['econ_pnl_cents'] or 0,
                      r['mm_pnl_cents'] or 0, r['lip_rewards_cents'] or 0))
-                if conn.execute("SELECT changes()").fetchone()[0]: synced += 1
+                if conn.execute("SELECT changes()").fetchone()[0]:
+                    synced += 1
+                    dates.add((r['timestamp'] or '')[:10])
             except: pass
         conn.commit()
     finally:
         src.close()
+    kpi_store = _dashboard("kpi_store")
+    for snap_date in sorted(dates):
+        kpi_store.on_snapshot(conn, snap_date)
     if verbose and synced > 0: print(f"  [+] Kalshi: {synced} snapshots")
     return synced
 
@@ -275,6 +266,7 @@ def backfill_sports_picks(conn, verbose=False) -> int:
                 if conn.execute("SELECT changes()").fetchone()[0]: synced += 1
             except: pass
     conn.commit()
+    _dashboard("kpi_store").refresh_for_source(conn, "sports_picks")
     if verbose and synced > 0: print(f"  [+] Sports picks: {synced} picks")
     return synced
 
@@ -320,6 +312,7 @@ def backfill_john(conn, verbose=False) -> dict:
                     if conn.execute("SELECT changes()").fetchone()[0]: leads += 1
                 except: pass
         conn.commit()
+    _dashboard("kpi_store").refresh_for_source(conn, "john")
     if verbose and (jobs + leads) > 0: print(f"  [+] John: {jobs} jobs, {leads} leads")
     return {"jobs": jobs, "leads": leads}
 
@@ -328,11 +321,13 @@ def main():
     parser.add_argument('--days', type=int, default=10)
     parser.add_argument('--full', action='store_true', help='Backfill all available data')
     parser.add_argument('--verbose', action='store_true')
+    parser.add_argument('--workers', type=int, default=None, help='Log parser processes (default: all cores)')
     args = parser.parse_args()
     
     os.makedirs(os.path.dirname(DASHBOARD_DB), exist_ok=True)
     conn = sqlite3.connect(DASHBOARD_DB)
     init_db(conn)
+    _dashboard("migrations").migrate(conn)  # KPI refreshes below need the current schema
     
     print(f"[*] NorthStar Financial Backfill")
     print(f"    DB: {DASHBOARD_DB}")
@@ -340,7 +335,7 @@ def main():
     
     results = {}
     results['openrouter'] = backfill_openrouter(conn, args.verbose)
-    results['anthropic'] = backfill_anthropic(conn, args.verbose)
+    results['anthropic'] = backfill_anthropic(conn, args.verbose, args.workers)
     results['kalshi'] = backfill_kalshi(conn, args.verbose)
     results['sports_picks'] = backfill_sports_picks(conn, args.verbose)
     results['john'] = backfill_john(conn, args.verbose)
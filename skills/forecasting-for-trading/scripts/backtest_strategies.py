@@ -11,10 +11,15 @@ And 3 forecast scenarios:
   1. Perfect forecast (ceiling)
   2. Realistic forecast (70-80% accuracy)
   3. Degraded forecast (50-60% accuracy)
+
+Per-market mode (default) simulates one MarketState at a time. --batch
+generates whole arrays of market states per scenario and evaluates strategy
+rules as array masks, so a million markets per scenario takes seconds:
+
+  python backtest_strategies.py --batch --markets 1000000 --seed 42
 """
 
 import numpy as np
-import pandas as pd
 from dataclasses import dataclass
 from typing import Tuple, List
 from scipy.stats import norm
@@ -116,6 +121,94 @@ def simulate_kalshi_market(
         volume=1000 + np.random.randint(-200, 200),
     )
 
+# ──────────────────────────────────────────────────────────────────────────────
+# BATCHED SIMULATION: whole arrays of market states per draw
+# ──────────────────────────────────────────────────────────────────────────────
+
+BUY, SKIP, SELL = 1, 0, -1  # direction codes for batched decisions
+DEFAULT_CHUNK = 250_000     # markets per generated batch (~20 MB of columns)
+
+@dataclass
+class MarketBatch:
+    """Column-wise MarketState: one array element per simulated market"""
+    day: np.ndarray
+    true_outcome: np.ndarray
+    forecast: np.ndarray
+    forecast_accuracy: np.ndarray
+    bid: np.ndarray
+    ask: np.ndarray
+    midpoint: np.ndarray
+    volume: np.ndarray
+    
+    def __len__(self) -> int:
+        return len(self.day)
+    
+    def spread(self) -> np.ndarray:
+        return self.ask - self.bid
+    
+    def is_mispriced(self, threshold=0.03) -> Tuple[np.ndarray, np.ndarray]:
+        """Array form of MarketState.is_mispriced: (direction, edge); direction is SKIP where fairly priced"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bid_error = np.abs(self.bid - self.forecast) / self.forecast
+            ask_error = np.abs(self.ask - self.forecast) / self.forecast
+        sell = bid_error > threshold
+        buy = ~sell & (ask_error > threshold)
+        direction = np.where(sell, SELL, np.where(buy, BUY, SKIP))
+        edge = np.where(sell, bid_error, np.where(buy, ask_error, 0.0))
+        return direction, edge
+    
+    def state(self, i: int) -> MarketState:
+        """Row i as a MarketState (numpy scalars, as simulate_kalshi_market produces) for spot checks"""
+        return MarketState(
+            day=int(self.day[i]),
+            true_outcome=self.true_outcome[i],
+            forecast=self.forecast[i],
+            forecast_accuracy=self.forecast_accuracy[i],
+            bid=self.bid[i],
+            ask=self.ask[i],
+            midpoint=self.midpoint[i],
+            volume=int(self.volume[i]),
+        )
+
+def simulate_kalshi_markets(
+    n: int,
+    forecast_accuracy: float,
+    rng: np.random.Generator,
+    lead_times: List[int] = None,
+    true_bias: float = 0.0,
+) -> MarketBatch:
+    """
+    Vectorized simulate_kalshi_market: n markets at lead times drawn from lead_times,
+    same distributions, one array draw per field instead of several scalar draws per market
+    """
+    if lead_times is None:
+        lead_times = list(range(1, 31))
+    
+    day = rng.choice(np.asarray(lead_times), size=n)
+    true_outcome = rng.beta(5, 5, size=n)
+    
+    right = rng.random(n) < forecast_accuracy
+    forecast = np.where(
+        right,
+        true_outcome + rng.normal(0, 0.02, size=n),
+        rng.uniform(0, 1, size=n),
+    )
+    forecast = np.clip(forecast + true_bias, 0, 1)
+    
+    midpoint = np.clip(rng.normal(true_outcome, 0.05), 0, 1)
+    spread = 0.02 + (0.05 / day)
+    
+    return MarketBatch(
+        day=day,
+        true_outcome=true_outcome,
+        forecast=forecast,
+        forecast_accuracy=np.full(n, forecast_accuracy),
+        bid=np.maximum(0, midpoint - spread/2),
+        ask=np.minimum(1, midpoint + spread/2),
+        midpoint=midpoint,
+        volume=1000 + rng.integers(-200, 200, size=n),
+    )
+
 # ──────────────────────────────────────────────────────────────────────────────
 # STRATEGY IMPLEMENTATIONS
 # ──────────────────────────────────────────────────────────────────────────────
@@ -123,14 +216,44 @@ def simulate_kalshi_market(
 class Strategy:
     """Base strategy class"""
     
-    def __init__(self, name: str):
+    PARAMS = {}  # tunable thresholds and their defaults; override per subclass
+    
+    def __init__(self, name: str, **params):
+        unknown = set(params) - set(self.PARAMS)
+        if unknown:
+            raise ValueError(f"{type(self).__name__}: unknown params {sorted(unknown)}")
         self.name = name
+        self.params = {**self.PARAMS, **params}
+        self.trades = []
+        self.batch_pnl = []  # per-chunk arrays of traded P&L from execute_batch()
+    
+    def reset(self):
         self.trades = []
+        self.batch_pnl = []
     
     def should_trade(self, market: MarketState) -> Tuple[bool, str, float]:
         """Determine whether to trade and what action. Override in subclass."""
         raise NotImplementedError
     
+    def should_trade_batch(self, batch: MarketBatch) -> Tuple[np.ndarray, np.ndarray]:
+        """Array form of should_trade: (direction BUY/SELL/SKIP, confidence). Override in subclass."""
+        raise NotImplementedError
+    
+    def execute_batch(self, batch: MarketBatch) -> np.ndarray:
+        """Execute every market in the batch; returns per-market P&L (0 where skipped)"""
+        direction, _ = self.should_trade_batch(batch)
+        pnl = np.where(
+            direction == BUY, batch.true_outcome - batch.ask,
+            np.where(direction == SELL, batch.bid - batch.true_outcome, 0.0),
+        )
+        self.batch_pnl.append(pnl[direction != SKIP])
+        return pnl
+    
+    def pnl_array(self) -> np.ndarray:
+        """Traded P&L in execution order (per-market trades first, then batches)"""
+        parts = [np.array([t['pnl'] for t in self.trades], dtype=float)] + self.batch_pnl
+        return np.concatenate(parts)
+    
     def execute(self, market: MarketState) -> Tuple[float, str]:
         """Execute trade and return (profit, action)"""
         should_trade, action, confidence = self.should_trade(market)
@@ -167,7 +290,8 @@ class Strategy:
     
     def summary(self) -> dict:
         """Calculate strategy performance metrics"""
-        if not self.trades:
+        returns = self.pnl_array()
+        if len(returns) == 0:
             return {
                 'name': self.name,
                 'trades': 0,
@@ -181,16 +305,14 @@ class Strategy:
                 'max_dd': 0.0,
             }
         
-        trades_df = pd.DataFrame(self.trades)
-        wins = (trades_df['pnl'] > 0).sum()
-        losses = (trades_df['pnl'] < 0).sum()
-        total_pnl = trades_df['pnl'].sum()
-        avg_win = trades_df[trades_df['pnl'] > 0]['pnl'].mean() if wins > 0 else 0
-        avg_loss = abs(trades_df[trades_df['pnl'] < 0]['pnl'].mean()) if losses > 0 else 0
-        win_rate = wins / len(trades_df) if len(trades_df) > 0 else 0
+        wins = (returns > 0).sum()
+        losses = (returns < 0).sum()
+        total_pnl = returns.sum()
+        avg_win = returns[returns > 0].mean() if wins > 0 else 0
+        avg_loss = abs(returns[returns < 0].mean()) if losses > 0 else 0
+        win_rate = wins / len(returns)
         
         # Sharpe ratio
-        returns = trades_df['pnl'].values
         sharpe = np.mean(returns) / np.std(returns) if len(returns) > 1 else 0
         
         # Max drawdown
@@ -199,7 +321,7 @@ class Strategy:
         
         return {
             'name': self.name,
-            'trades': len(trades_df),
+            'trades': len(returns),
             'wins': wins,
             'losses': losses,
             'total_pnl': total_pnl,
@@ -210,9 +332,24 @@ class Strategy:
             'max_dd': max_dd,
         }
 
+def _mm_signal(batch: MarketBatch, trigger: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Batched MM rule: trade toward our forecast when it sits more than trigger × spread from mid"""
+    forecast_error = np.abs(batch.forecast - batch.midpoint)
+    trade = forecast_error > batch.spread() * trigger
+    direction = np.where(trade, np.where(batch.forecast > batch.midpoint, BUY, SELL), SKIP)
+    return direction, np.where(trade, forecast_error, 0.0)
+
+def _snipe_signal(batch: MarketBatch, min_accuracy: float, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Batched snipe rule: mispricing trades, only where forecast accuracy clears the gate"""
+    direction, edge = batch.is_mispriced(threshold=threshold)
+    gated = batch.forecast_accuracy < min_accuracy
+    return np.where(gated, SKIP, direction), np.where(gated, 0.0, edge)
+
 class TightMMStrategy(Strategy):
     """Strategy A: Tight market-making (1-cent spreads)"""
     
+    PARAMS = {"max_day": 3, "mm_trigger": 0.5}
+    
     def should_trade(self, market: MarketState) -> Tuple[bool, str, float]:
         """
         Place orders inside the spread (tight MM)
@@ -220,24 +357,31 @@ class TightMMStrategy(Strategy):
         """
         
         # Only trade Days 1-3 (high forecast accuracy)
-        if market.day > 3:
+        if market.day > self.params["max_day"]:
             return False, "SKIP", 0
         
         # Check if our forecast is different from market's
         forecast_error = abs(market.forecast - market.midpoint)
         
         # If our forecast is significantly different, place order
-        if forecast_error > market.spread() * 0.5:
+        if forecast_error > market.spread() * self.params["mm_trigger"]:
             if market.forecast > market.midpoint:
                 return True, "BUY", forecast_error
             else:
                 return True, "SELL", forecast_error
         
         return False, "SKIP", 0
+    
+    def should_trade_batch(self, batch: MarketBatch) -> Tuple[np.ndarray, np.ndarray]:
+        direction, confidence = _mm_signal(batch, self.params["mm_trigger"])
+        late = batch.day > self.params["max_day"]
+        return np.where(late, SKIP, direction), np.where(late, 0.0, confidence)
 
 class SnipeOnlyStrategy(Strategy):
     """Strategy B: Only snipe on high-confidence forecasts"""
     
+    PARAMS = {"min_accuracy": 0.70, "threshold": 0.05}
+    
     def should_trade(self, market: MarketState) -> Tuple[bool, str, float]:
         """
         Only trade when we have high forecast confidence
@@ -245,44 +389,55 @@ class SnipeOnlyStrategy(Strategy):
         """
         
         # Need >70% forecast accuracy
-        if market.forecast_accuracy < 0.70:
+        if market.forecast_accuracy < self.params["min_accuracy"]:
             return False, "SKIP", 0
         
         # Check mispricing
-        is_mispriced, direction, edge = market.is_mispriced(threshold=0.05)
+        is_mispriced, direction, edge = market.is_mispriced(threshold=self.params["threshold"])
         
         if is_mispriced:
             return True, direction, edge
         
         return False, "SKIP", 0
+    
+    def should_trade_batch(self, batch: MarketBatch) -> Tuple[np.ndarray, np.ndarray]:
+        return _snipe_signal(batch, self.params["min_accuracy"], self.params["threshold"])
 
 class HybridStrategy(Strategy):
     """Strategy C: Hybrid (MM Days 1-3, Snipe Days 4+)"""
     
+    PARAMS = {"switch_day": 3, "mm_trigger": 0.5, "min_accuracy": 0.65, "threshold": 0.08}
+    
     def should_trade(self, market: MarketState) -> Tuple[bool, str, float]:
         """
         Days 1-3: Tight MM
         Days 4+: Snipe only
         """
         
-        if market.day <= 3:
+        if market.day <= self.params["switch_day"]:
             # MM phase
             forecast_error = abs(market.forecast - market.midpoint)
-            if forecast_error > market.spread() * 0.5:
+            if forecast_error > market.spread() * self.params["mm_trigger"]:
                 if market.forecast > market.midpoint:
                     return True, "BUY", forecast_error
                 else:
                     return True, "SELL", forecast_error
         else:
             # Snipe phase
-            if market.forecast_accuracy < 0.65:
+            if market.forecast_accuracy < self.params["min_accuracy"]:
                 return False, "SKIP", 0
             
-            is_mispriced, direction, edge = market.is_mispriced(threshold=0.08)
+            is_mispriced, direction, edge = market.is_mispriced(threshold=self.params["threshold"])
             if is_mispriced:
                 return True, direction, edge
         
         return False, "SKIP", 0
+    
+    def should_trade_batch(self, batch: MarketBatch) -> Tuple[np.ndarray, np.ndarray]:
+        mm_dir, mm_conf = _mm_signal(batch, self.params["mm_trigger"])
+        snipe_dir, snipe_conf = _snipe_signal(batch, self.params["min_accuracy"], self.params["threshold"])
+        early = batch.day <= self.params["switch_day"]
+        return np.where(early, mm_dir, snipe_dir), np.where(early, mm_conf, snipe_conf)
 
 # ──────────────────────────────────────────────────────────────────────────────
 # BACKTEST HARNESS
@@ -318,6 +473,35 @@ def backtest_scenario(
     
     return strategy.summary()
 
+def child_seed(seed, *key: int) -> np.random.SeedSequence:
+    """Deterministic child stream of seed (int or SeedSequence); same key → same stream, no spawn state"""
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return np.random.SeedSequence(root.entropy, spawn_key=root.spawn_key + tuple(key))
+
+def backtest_scenario_batch(
+    strategies: List[Strategy],
+    scenario: str,
+    num_markets: int = 1_000_000,
+    lead_times: List[int] = None,
+    seed=None,
+    chunk_size: int = DEFAULT_CHUNK,
+) -> List[dict]:
+    """
+    Vectorized backtest: every strategy is evaluated on the same simulated markets
+    (common random numbers), generated chunk_size at a time to bound memory.
+    Chunk i draws from child_seed(seed, i), so results don't depend on chunk timing.
+    """
+    
+    forecast_accuracy = generate_forecast_scenario(scenario)
+    
+    for i, start in enumerate(range(0, num_markets, chunk_size)):
+        rng = np.random.default_rng(child_seed(seed, i))
+        batch = simulate_kalshi_markets(min(chunk_size, num_markets - start), forecast_accuracy, rng, lead_times)
+        for strategy in strategies:
+            strategy.execute_batch(batch)
+    
+    return [strategy.summary() for strategy in strategies]
+
 def print_results(results: List[dict]):
     """Pretty-print backtest results"""
     
@@ -339,6 +523,17 @@ def print_results(results: List[dict]):
 # ──────────────────────────────────────────────────────────────────────────────
 
 if __name__ == "__main__":
+    import argparse
+    import time
+    
+    parser = argparse.ArgumentParser(description="Backtest Kalshi strategies across forecast scenarios")
+    parser.add_argument("--batch", action="store_true", help="Vectorized Monte Carlo (array masks, chunked)")
+    parser.add_argument("--markets", type=int, help="Markets per scenario (default 500, or 1,000,000 with --batch)")
+    parser.add_argument("--seed", type=int, help="Root seed; each scenario gets its own SeedSequence stream")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK)
+    args = parser.parse_args()
+    num_markets = args.markets or (1_000_000 if args.batch else 500)
+    
     print("Backtesting Kalshi strategies across forecast scenarios...")
     
     scenarios = ["perfect", "realistic", "degraded"]
@@ -347,19 +542,29 @@ if __name__ == "__main__":
         SnipeOnlyStrategy("Strategy B: Snipe Only"),
         HybridStrategy("Strategy C: Hybrid (MM+Snipe)"),
     ]
+    root_seed = np.random.SeedSequence(args.seed)
+    if args.seed is None:
+        print(f"Seed: {root_seed.entropy}")
+    else:
+        np.random.seed(args.seed)
     
-    for scenario in scenarios:
+    for i, scenario in enumerate(scenarios):
         print(f"\n\n{'=' * 100}")
         print(f"SCENARIO: {scenario.upper()} FORECAST")
         print(f"{'=' * 100}")
         
-        results = []
+        t0 = time.perf_counter()
         for strategy in strategies:
-            strategy.trades = []  # Reset
-            result = backtest_scenario(strategy, scenario, num_markets=500)
-            results.append(result)
+            strategy.reset()
+        if args.batch:
+            results = backtest_scenario_batch(
+                strategies, scenario, num_markets, seed=child_seed(root_seed, i), chunk_size=args.chunk_size,
+            )
+        else:
+            results = [backtest_scenario(strategy, scenario, num_markets=num_markets) for strategy in strategies]
         
         print_results(results)
+        print(f"\n({num_markets:,} markets in {time.perf_counter() - t0:.2f}s)")
         
         # Recommendation
         best = max(results, key=lambda x: x['total_pnl'])
@@ -4,6 +4,10 @@ forecast_monitor_3x_daily.py — Lightweight forecast accuracy monitoring
 Runs 3x daily (8 AM, 12 PM, 5 PM PT), updates forecast skill metrics.
 Low API token cost: ~0.5K tokens per run (~$0.001/day total).
 
+Signal accuracies come from AccuracyStream: each run reads only the trades
+appended since the last one, so it can also run every few minutes
+(--interval-min 5) without cost growing with the size of trades.jsonl.
+
 Integration with V8: Feeds live forecast accuracy to decision engine.
 Kill switch logic: If accuracy drops below threshold, halt trading.
 """
@@ -11,7 +15,9 @@ Kill switch logic: If accuracy drops below threshold, halt trading.
 import sqlite3
 import json
 import os
-from datetime import datetime, timedelta
+import time
+from collections import deque
+from datetime import datetime, timezone
 from pathlib import Path
 import requests
 import numpy as np
@@ -22,6 +28,12 @@ import numpy as np
 
 V8_DB = r'C:\Users\chead\.openclaw\workspace-scalper\scalper_v8.db'
 FORECAST_LOG = r'C:\Users\chead\.openclaw\workspace-scalper\forecast_accuracy.jsonl'
+TRADES_LOG = r'C:\Users\chead\.openclaw\workspace-scalper\trades.jsonl'
+MONITOR_STATE = r'C:\Users\chead\.openclaw\workspace-scalper\forecast_monitor_state.json'
+
+# Rolling windows computed in the same pass; the kill switch reads the 24h one
+ACCURACY_WINDOWS_H = (1, 6, 24)
+DECISION_WINDOW_H = 24
 
 # API Keys (light usage)
 FRED_API_KEY = os.environ.get('FRED_API_KEY', '')
@@ -37,81 +49,202 @@ HALT_THRESHOLD = 0.50  # Halt if accuracy drops below 50%
 # LIGHTWEIGHT FORECAST ACCURACY MONITORING
 # ──────────────────────────────────────────────────────────────────────────────
 
-def get_rsi_accuracy(trades_json_path: str, lookback_hours: int = 24) -> float:
+# Record flags kept per trade in the rolling windows
+RSI_CORRECT, MACD_CORRECT, ALIGNED, RESULT = 1, 2, 4, 8
+
+TAIL_BLOCK = 64 * 1024
+
+def _epoch(ts: str) -> float:
+    """ISO timestamp → epoch seconds; naive stamps are UTC (aware ones are converted)"""
+    dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc).timestamp()
+    return dt.timestamp()
+
+def _flags(t: dict) -> int:
+    flags = 0
+    if t.get('rsi_correct', False):
+        flags |= RSI_CORRECT
+    if t.get('macd_correct', False):
+        flags |= MACD_CORRECT
+    if t.get('rsi_aligned', False) and t.get('macd_aligned', False):
+        flags |= ALIGNED
+        if t.get('result', False) == True:
+            flags |= RESULT
+    return flags
+
+class _Window:
+    """Records (epoch, flags) newer than `hours`, with running counts so reads are O(1)"""
+    
+    def __init__(self, hours: float, records=()):
+        self.hours = hours
+        self.records = deque()
+        self.n = self.rsi = self.macd = self.aligned = self.aligned_correct = 0
+        for ts, flags in records:
+            self.add(ts, flags)
+    
+    def _count(self, flags: int, sign: int):
+        self.n += sign
+        self.rsi += sign * bool(flags & RSI_CORRECT)
+        self.macd += sign * bool(flags & MACD_CORRECT)
+        self.aligned += sign * bool(flags & ALIGNED)
+        self.aligned_correct += sign * bool(flags & RESULT)
+    
+    def add(self, ts: float, flags: int):
+        self.records.append((ts, flags))
+        self._count(flags, 1)
+    
+    def evict(self, now: float):
+        cutoff = now - self.hours * 3600
+        while self.records and self.records[0][0] <= cutoff:
+            self._count(self.records.popleft()[1], -1)
+    
+    def accuracies(self) -> dict:
+        """Same minimum-sample defaults as the old per-signal functions"""
+        return {
+            'trades': self.n,
+            'rsi': self.rsi / self.n if self.n >= 5 else 0.5,
+            'macd': self.macd / self.n if self.n >= 5 else 0.5,
+            'crypto_rsi_macd': self.aligned_correct / self.aligned if self.aligned >= 3 else 0.65,
+        }
+
+class AccuracyStream:
     """
-    Calculate RSI accuracy from recent trades.
-    Fast calculation: only looks at last N hours of data.
+    Single-pass rolling accuracy over an append-only trades JSONL.
+    
+    Each update() reads only the bytes appended since the last call (the offset
+    is persisted in state_path between runs) and feeds every window at once.
+    With no saved offset it seeks backwards from the end of the file just far
+    enough to cover the longest window. State is O(records in the longest window),
+    so cost per run doesn't grow with the log.
     """
     
-    try:
-        if not Path(trades_json_path).exists():
-            return 0.5  # Default to neutral
+    def __init__(self, path: str, windows_hours=(24,), state_path: str = None):
+        self.path = str(path)
+        self.state_path = state_path
+        self.windows = {h: _Window(h) for h in sorted(set(windows_hours))}
+        self.offset = None
+        self.file_id = None
+        self._load()
+    
+    # ── persistence ──
+    def _load(self):
+        if not self.state_path or not Path(self.state_path).exists():
+            return
+        try:
+            state = json.loads(Path(self.state_path).read_text()).get(self.path)
+        except (OSError, ValueError):
+            return
+        if not state or sorted(state.get('windows', {})) != sorted(str(h) for h in self.windows):
+            return  # window set changed: rebuild from a tail seek
+        self.offset, self.file_id = state['offset'], state.get('file_id')
+        for h in self.windows:
+            self.windows[h] = _Window(h, state['windows'][str(h)])
+    
+    def _save(self):
+        if not self.state_path:
+            return
+        path = Path(self.state_path)
+        try:
+            states = json.loads(path.read_text()) if path.exists() else {}
+        except (OSError, ValueError):
+            states = {}
+        states[self.path] = {
+            'offset': self.offset,
+            'file_id': self.file_id,
+            'windows': {str(h): list(w.records) for h, w in self.windows.items()},
+        }
+        tmp = path.with_suffix(path.suffix + '.tmp')
+        tmp.write_text(json.dumps(states))
+        os.replace(tmp, path)
+    
+    # ── reading ──
+    def _tail_offset(self, f, size: int, cutoff: float) -> int:
+        """Byte offset just past the newest line at or before cutoff, scanning backwards block by block"""
+        pos, carry = size, b''
+        while pos > 0:
+            step = min(TAIL_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + carry
+            lines = buf.split(b'\n')
+            carry = lines[0]  # may be cut mid-line; completed by the next block
+            end = pos + len(buf)  # byte just past the current line
+            for line in reversed(lines[1:]):
+                ts = self._line_ts(line)
+                if ts is not None and ts <= cutoff:
+                    return min(end + 1, size)
+                end -= len(line) + 1
+        ts = self._line_ts(carry)
+        return min(len(carry) + 1, size) if ts is not None and ts <= cutoff else 0
+    
+    @staticmethod
+    def _line_ts(line: bytes):
+        if not line.strip():
+            return None
+        try:
+            return _epoch(json.loads(line)['timestamp'])
+        except Exception:
+            return None
+    
+    def update(self, now: float = None) -> dict:
+        """Consume new lines, evict expired records; returns {hours: accuracies}"""
+        now = now if now is not None else time.time()
+        if not Path(self.path).exists():
+            return {h: w.accuracies() for h, w in self.windows.items()}
         
-        trades = []
-        with open(trades_json_path) as f:
+        st = os.stat(self.path)
+        file_id = [st.st_dev, st.st_ino]
+        with open(self.path, 'rb') as f:
+            if self.offset is None or file_id != self.file_id or st.st_size < self.offset:
+                # first run, rotated or truncated: start over from a tail seek
+                self.windows = {h: _Window(h) for h in self.windows}
+                self.offset = self._tail_offset(f, st.st_size, now - max(self.windows) * 3600)
+                self.file_id = file_id
+            f.seek(self.offset)
             for line in f:
-                if line.strip():
-                    try:
-                        trades.append(json.loads(line))
-                    except:
-                        pass
+                if not line.endswith(b'\n'):
+                    break  # partial line still being written; pick it up next time
+                self.offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    t = json.loads(line)
+                    ts = _epoch(t['timestamp'])
+                except Exception:
+                    continue
+                flags = _flags(t)
+                for w in self.windows.values():
+                    w.add(ts, flags)
         
-        if not trades:
-            return 0.5
-        
-        # Only look at recent trades (fast)
-        cutoff = datetime.utcnow() - timedelta(hours=lookback_hours)
-        recent_trades = [
-            t for t in trades 
-            if 'timestamp' in t and datetime.fromisoformat(t['timestamp']) > cutoff
-        ]
-        
-        if len(recent_trades) < 5:
-            return 0.5  # Not enough data
-        
-        # Check RSI signal accuracy (simple: did price move in predicted direction?)
-        correct = sum(1 for t in recent_trades if t.get('rsi_correct', False))
-        accuracy = correct / len(recent_trades)
-        
-        return accuracy
-    
+        for w in self.windows.values():
+            w.evict(now)
+        self._save()
+        return {h: w.accuracies() for h, w in self.windows.items()}
+
+_streams = {}
+
+def accuracy_stream(trades_json_path: str, lookback_hours: float = 24) -> AccuracyStream:
+    """Process-wide stream per trades file, persisted next to FORECAST_LOG"""
+    stream = _streams.get(trades_json_path)
+    if stream is None or lookback_hours not in stream.windows:
+        hours = set(ACCURACY_WINDOWS_H) | {lookback_hours} | (set(stream.windows) if stream else set())
+        stream = AccuracyStream(trades_json_path, hours, state_path=MONITOR_STATE)
+        _streams[trades_json_path] = stream
+    return stream
+
+def get_rsi_accuracy(trades_json_path: str, lookback_hours: int = 24) -> float:
+    """RSI signal accuracy over the last N hours of trades."""
+    try:
+        return accuracy_stream(trades_json_path, lookback_hours).update()[lookback_hours]['rsi']
     except Exception as e:
         print(f"[RSI Accuracy] Error: {e}")
         return 0.5
 
 def get_macd_accuracy(trades_json_path: str, lookback_hours: int = 24) -> float:
-    """Calculate MACD accuracy from recent trades."""
-    
+    """MACD signal accuracy over the last N hours of trades."""
     try:
-        if not Path(trades_json_path).exists():
-            return 0.5
-        
-        trades = []
-        with open(trades_json_path) as f:
-            for line in f:
-                if line.strip():
-                    try:
-                        trades.append(json.loads(line))
-                    except:
-                        pass
-        
-        if not trades:
-            return 0.5
-        
-        cutoff = datetime.utcnow() - timedelta(hours=lookback_hours)
-        recent_trades = [
-            t for t in trades 
-            if 'timestamp' in t and datetime.fromisoformat(t['timestamp']) > cutoff
-        ]
-        
-        if len(recent_trades) < 5:
-            return 0.5
-        
-        correct = sum(1 for t in recent_trades if t.get('macd_correct', False))
-        accuracy = correct / len(recent_trades)
-        
-        return accuracy
-    
+        return accuracy_stream(trades_json_path, lookback_hours).update()[lookback_hours]['macd']
     except Exception as e:
         print(f"[MACD Accuracy] Error: {e}")
         return 0.5
@@ -144,36 +277,8 @@ def get_crypto_rsi_macd_combined(lookback_hours: int = 24) -> float:
     Combined RSI + MACD accuracy when both signals align.
     Only return accuracy when both are signaling (not just average of separate).
     """
-    
     try:
-        trades_path = r'C:\Users\chead\.openclaw\workspace-scalper\trades.jsonl'
-        
-        if not Path(trades_path).exists():
-            return 0.65  # Default to expected accuracy
-        
-        trades = []
-        with open(trades_path) as f:
-            for line in f:
-                if line.strip():
-                    try:
-                        trades.append(json.loads(line))
-                    except:
-                        pass
-        
-        if not trades:
-            return 0.65
-        
-        # Only count trades where BOTH RSI and MACD were aligned
-        aligned_trades = [t for t in trades if t.get('rsi_aligned', False) and t.get('macd_aligned', False)]
-        
-        if len(aligned_trades) < 3:
-            return 0.65  # Not enough aligned signals
-        
-        correct = sum(1 for t in aligned_trades if t.get('result', False) == True)
-        accuracy = correct / len(aligned_trades)
-        
-        return accuracy
-    
+        return accuracy_stream(TRADES_LOG, lookback_hours).update()[lookback_hours]['crypto_rsi_macd']
     except Exception as e:
         print(f"[Combined Accuracy] Error: {e}")
         return 0.65
@@ -259,14 +364,26 @@ def run_forecast_monitor():
     # Measure forecast accuracy (all zero/low API cost)
     print("\n[1] Measuring Forecast Accuracy...")
     
+    # One pass over the newly appended trades feeds every window
+    try:
+        windows = accuracy_stream(TRADES_LOG, DECISION_WINDOW_H).update()
+    except Exception as e:
+        print(f"[Accuracy Stream] Error: {e}")
+        windows = {DECISION_WINDOW_H: _Window(DECISION_WINDOW_H).accuracies()}
+    current = windows[DECISION_WINDOW_H]
+    
     forecast_accuracy = {
-        'rsi': get_rsi_accuracy(r'C:\Users\chead\.openclaw\workspace-scalper\trades.jsonl'),
-        'macd': get_macd_accuracy(r'C:\Users\chead\.openclaw\workspace-scalper\trades.jsonl'),
-        'crypto_rsi_macd': get_crypto_rsi_macd_combined(),
+        'rsi': current['rsi'],
+        'macd': current['macd'],
+        'crypto_rsi_macd': current['crypto_rsi_macd'],
         'weather': get_weather_forecast_accuracy(),
+        'windows': {f"{h}h": w for h, w in windows.items()},
         'timestamp': datetime.utcnow().isoformat(),
     }
     
+    for h, w in windows.items():
+        if h != DECISION_WINDOW_H:
+            print(f"  [{h}h] RSI {w['rsi']:.1%}  MACD {w['macd']:.1%}  Combined {w['crypto_rsi_macd']:.1%}  ({w['trades']} trades)")
     print(f"  RSI Accuracy: {forecast_accuracy['rsi']:.1%}")
     print(f"  MACD Accuracy: {forecast_accuracy['macd']:.1%}")
     print(f"  Combined (RSI+MACD): {forecast_accuracy['crypto_rsi_macd']:.1%}")
@@ -338,8 +455,14 @@ $scriptPath = "C:\Users\chead\.openclaw\workspace\skills\forecasting-for-trading
 if __name__ == "__main__":
     import sys
     
-    # Run forecast monitor
+    # Run forecast monitor (--interval-min N keeps running every N minutes)
+    interval = None
+    if '--interval-min' in sys.argv:
+        interval = float(sys.argv[sys.argv.index('--interval-min') + 1])
     result = run_forecast_monitor()
+    while interval:
+        time.sleep(interval * 60)
+        result = run_forecast_monitor()
     
     # Log result
     print(f"\n[Summary]")
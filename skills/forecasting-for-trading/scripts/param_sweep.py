@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+param_sweep.py — Parallel parameter sweeps over the backtest_strategies strategies
+
+Expands a parameter space (full grid, random, or Latin-hypercube samples) into
+cells of (params × scenario × replicate), runs each cell as a batched Monte
+Carlo backtest on a process pool, and aggregates Strategy.summary() metrics per
+parameter set with t-based confidence intervals across replicates.
+
+Seeding: replicate r of scenario s always draws from child_seed(seed, s, r),
+whatever the params, so every parameter set is scored on the same simulated
+markets (common random numbers) while replicates stay independent.
+
+Completed cells are appended to a JSONL cache as they finish; rerunning the
+same command skips them, so an interrupted sweep resumes where it stopped.
+
+  python param_sweep.py --strategy hybrid --param switch_day=2,3,4,5 --param threshold=0.05,0.08,0.12
+  python param_sweep.py --strategy snipe --sample lhs -n 40 --param min_accuracy=0.55:0.85 --param threshold=0.02:0.15
+"""
+
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List
+
+import numpy as np
+from scipy.stats import t as student_t
+
+from backtest_strategies import (
+    HybridStrategy, SnipeOnlyStrategy, TightMMStrategy, backtest_scenario_batch, child_seed,
+)
+
+STRATEGIES = {
+    "tight_mm": TightMMStrategy,
+    "snipe": SnipeOnlyStrategy,
+    "hybrid": HybridStrategy,
+}
+SCENARIOS = ["perfect", "realistic", "degraded"]
+METRICS = ["total_pnl", "pnl_per_market", "win_rate", "sharpe", "max_dd", "trades"]
+CACHE_VERSION = 1  # bump when simulation or strategy logic changes so old cells aren't reused
+
+# ──────────────────────────────────────────────────────────────────────────────
+# PARAMETER SPACES
+# ──────────────────────────────────────────────────────────────────────────────
+
+def grid(space: Dict[str, list]) -> List[dict]:
+    """Every combination of the listed values"""
+    names = sorted(space)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(space[n] for n in names))]
+
+def _scale(spec, u: np.ndarray) -> list:
+    """Map uniforms in [0, 1) onto a (lo, hi) range (ints stay ints) or a list of choices"""
+    if isinstance(spec, list):
+        return [spec[i] for i in (u * len(spec)).astype(int)]
+    lo, hi = spec
+    if isinstance(lo, int) and isinstance(hi, int):
+        return (lo + np.floor(u * (hi - lo + 1))).astype(int).tolist()
+    return (lo + u * (hi - lo)).tolist()
+
+def random_samples(space: dict, n: int, seed=None) -> List[dict]:
+    """n independent uniform draws per parameter"""
+    rng = np.random.default_rng(seed)
+    names = sorted(space)
+    cols = {name: _scale(space[name], rng.random(n)) for name in names}
+    return [{name: cols[name][i] for name in names} for i in range(n)]
+
+def latin_hypercube(space: dict, n: int, seed=None) -> List[dict]:
+    """n samples with exactly one sample in each 1/n stratum of every parameter"""
+    rng = np.random.default_rng(seed)
+    names = sorted(space)
+    cols = {name: _scale(space[name], (rng.permutation(n) + rng.random(n)) / n) for name in names}
+    return [{name: cols[name][i] for name in names} for i in range(n)]
+
+def parse_param(text: str):
+    """'name=v1,v2,v3' → list of values; 'name=lo:hi' → (lo, hi) range"""
+    name, _, values = text.partition("=")
+    if not values:
+        raise argparse.ArgumentTypeError(f"expected name=v1,v2 or name=lo:hi, got {text!r}")
+    if ":" in values:
+        lo, hi = (_number(v) for v in values.split(":", 1))
+        return name.strip(), (lo, hi)
+    return name.strip(), [_number(v) for v in values.split(",")]
+
+def _number(text: str):
+    text = text.strip()
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CELLS (one backtest each) + DISK CACHE
+# ──────────────────────────────────────────────────────────────────────────────
+
+def cell_key(cell: dict) -> str:
+    blob = json.dumps({**cell, "v": CACHE_VERSION}, sort_keys=True)
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
+
+def run_cell(cell: dict) -> dict:
+    """Worker: one batched backtest. Top-level so the process pool can pickle it."""
+    strategy = STRATEGIES[cell["strategy"]](cell["strategy"], **cell["params"])
+    seed = child_seed(cell["seed"], SCENARIOS.index(cell["scenario"]), cell["replicate"])
+    summary = backtest_scenario_batch([strategy], cell["scenario"], cell["markets"], seed=seed)[0]
+    metrics = {k: float(summary[k]) for k in METRICS if k in summary}
+    metrics["pnl_per_market"] = metrics["total_pnl"] / cell["markets"]
+    return {"key": cell_key(cell), **cell, "metrics": metrics}
+
+def load_cache(path: str) -> Dict[str, dict]:
+    done = {}
+    if not path or not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partial last line from an interrupted run
+            done[rec["key"]] = rec
+    return done
+
+def run_sweep(cells: List[dict], cache_path: str = None, workers: int = None, verbose: bool = True) -> List[dict]:
+    """Run the cells not already in the cache; returns records for all cells"""
+    done = load_cache(cache_path)
+    pending = [c for c in cells if cell_key(c) not in done]
+    if verbose:
+        print(f"{len(cells)} cells: {len(cells) - len(pending)} cached, {len(pending)} to run")
+
+    if pending:
+        out = open(cache_path, "a") if cache_path else None
+        t0 = time.perf_counter()
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(run_cell, c) for c in pending]
+                for i, fut in enumerate(as_completed(futures), 1):
+                    rec = fut.result()
+                    done[rec["key"]] = rec
+                    if out:
+                        out.write(json.dumps(rec) + "\n")
+                        out.flush()
+                    if verbose and (i % 10 == 0 or i == len(pending)):
+                        print(f"  {i}/{len(pending)} cells ({time.perf_counter() - t0:.1f}s)")
+        finally:
+            if out:
+                out.close()
+
+    return [done[cell_key(c)] for c in cells]
+
+# ──────────────────────────────────────────────────────────────────────────────
+# AGGREGATION
+# ──────────────────────────────────────────────────────────────────────────────
+
+def aggregate(records: List[dict], confidence: float = 0.95) -> List[dict]:
+    """Mean and CI half-width of every metric per (strategy, params, scenario) over replicates"""
+    groups = defaultdict(list)
+    for rec in records:
+        groups[(rec["strategy"], json.dumps(rec["params"], sort_keys=True), rec["scenario"])].append(rec["metrics"])
+
+    rows = []
+    for (strategy, params, scenario), runs in groups.items():
+        n = len(runs)
+        row = {"strategy": strategy, "params": json.loads(params), "scenario": scenario, "replicates": n}
+        tcrit = student_t.ppf(0.5 + confidence / 2, n - 1) if n > 1 else None
+        for metric in METRICS:
+            values = np.array([r[metric] for r in runs])
+            row[metric] = float(values.mean())
+            row[f"{metric}_ci"] = float(tcrit * values.std(ddof=1) / np.sqrt(n)) if tcrit is not None else None
+        rows.append(row)
+    rows.sort(key=lambda r: (SCENARIOS.index(r["scenario"]), -r["total_pnl"]))
+    return rows
+
+def print_table(rows: List[dict], top: int = 10):
+    for scenario in SCENARIOS:
+        block = [r for r in rows if r["scenario"] == scenario]
+        if not block:
+            continue
+        print(f"\n{'=' * 100}\nSCENARIO: {scenario.upper()}  (top {min(top, len(block))} of {len(block)} by mean total P&L)\n{'=' * 100}")
+        for r in block[:top]:
+            ci = lambda m, fmt=".3f": f" ±{r[f'{m}_ci']:{fmt}}" if r[f"{m}_ci"] is not None else ""
+            params = ", ".join(f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}" for k, v in r["params"].items())
+            print(f"  {params}")
+            print(f"    P&L ${r['total_pnl']:>10.2f}{ci('total_pnl'):<12} win {r['win_rate']:.1%}{ci('win_rate', '.1%'):<10}"
+                  f" sharpe {r['sharpe']:.3f}{ci('sharpe'):<10} trades {r['trades']:.0f}")
+
+def write_csv(rows: List[dict], path: str):
+    param_names = sorted({k for r in rows for k in r["params"]})
+    fields = ["strategy", "scenario", "replicates"] + param_names
+    fields += [f for m in METRICS for f in (m, f"{m}_ci")]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for r in rows:
+            writer.writerow({**{k: v for k, v in r.items() if k != "params"}, **r["params"]})
+
+# ──────────────────────────────────────────────────────────────────────────────
+# MAIN
+# ──────────────────────────────────────────────────────────────────────────────
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel parameter sweep for Kalshi strategy backtests")
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES), required=True)
+    parser.add_argument("--param", action="append", type=parse_param, default=[],
+                        help="name=v1,v2,... (grid values) or name=lo:hi (range, for --sample)")
+    parser.add_argument("--sample", choices=["grid", "random", "lhs"], default="grid")
+    parser.add_argument("-n", "--samples", type=int, default=20, help="Parameter sets for random / lhs")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--replicates", type=int, default=5)
+    parser.add_argument("--markets", type=int, default=200_000, help="Markets per cell")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count)")
+    parser.add_argument("--cache", default="sweep_cache.jsonl", help="JSONL of completed cells ('' to disable)")
+    parser.add_argument("--out", help="Write aggregated table to CSV")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    strategy_cls = STRATEGIES[args.strategy]
+    space = dict(args.param)
+    unknown = set(space) - set(strategy_cls.PARAMS)
+    if unknown:
+        sys.exit(f"Unknown params for {args.strategy}: {sorted(unknown)} (tunable: {sorted(strategy_cls.PARAMS)})")
+
+    if args.sample == "grid":
+        ranges = [name for name, spec in space.items() if isinstance(spec, tuple)]
+        if ranges:
+            sys.exit(f"Grid needs value lists, got ranges for {ranges}; use --sample random|lhs")
+        param_sets = grid(space) if space else [{}]
+    elif args.sample == "random":
+        param_sets = random_samples(space, args.samples, seed=args.seed)
+    else:
+        param_sets = latin_hypercube(space, args.samples, seed=args.seed)
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    cells = [
+        {"strategy": args.strategy, "params": {**strategy_cls.PARAMS, **p}, "scenario": scenario,
+         "replicate": r, "markets": args.markets, "seed": args.seed}
+        for p in param_sets for scenario in scenarios for r in range(args.replicates)
+    ]
+
+    records = run_sweep(cells, cache_path=args.cache or None, workers=args.workers)
+    rows = aggregate(records)
+    print_table(rows, top=args.top)
+    if args.out:
+        write_csv(rows, args.out)
+        print(f"\nWrote {len(rows)} rows to {args.out}")
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+replay_backtest.py — Replay real Kalshi history through the backtest_strategies strategies
+
+Streams recorded history in time order through an event-driven clock:
+  - market events   kalshi_trades fills we actually saw (price, contract, settlement value).
+                    Each one is offered to every strategy via should_trade(); a taken
+                    trade is booked when the clock reaches the contract's settlement.
+  - equity events   kalshi_snapshots, scalper_feed_snapshots and the scalper's own
+                    pnl_snapshots, replayed as the benchmark (what the live bot did).
+                    Kalshi snapshots are read through the kalshi_snapshot_history view,
+                    so days compacted by retention replay from their rollup buckets.
+
+Each source is exported once into a memory-mapped columnar cache (one .npy file
+per column, written chunk by chunk), rebuilt only when the source table changes.
+The replay walks those columns CHUNK_ROWS at a time, so a multi-month history is
+never fully resident; with --workers, variant groups run in separate processes
+that map the same files and share the OS page cache.
+
+All strategy variants consume the same single pass over the event stream.
+
+  python replay_backtest.py --forecast noisy:0.75 --seed 1
+  python replay_backtest.py --variant hybrid:switch_day=2 --variant hybrid:switch_day=4 --workers 2
+"""
+
+import argparse
+import heapq
+import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from backtest_strategies import (
+    HybridStrategy, MarketState, SnipeOnlyStrategy, Strategy, TightMMStrategy, print_results,
+)
+
+DASHBOARD_DB = r"C:\Users\chead\.openclaw\workspace\dashboard\data\northstar.db"
+SCALPER_DB = r"C:\Users\chead\.openclaw\workspace-scalper\scalper_v8.db"
+
+CHUNK_ROWS = 50_000
+CACHE_VERSION = 2  # v2: kalshi snapshots read via kalshi_snapshot_history
+TICKER_BYTES = 48
+
+STRATEGIES = {
+    "tight_mm": TightMMStrategy,
+    "snipe": SnipeOnlyStrategy,
+    "hybrid": HybridStrategy,
+}
+
+# ──────────────────────────────────────────────────────────────────────────────
+# SOURCES: table → columns exported to the memmap cache
+# ──────────────────────────────────────────────────────────────────────────────
+
+@dataclass
+class Source:
+    name: str
+    db: str        # "dashboard" or "scalper"
+    table: str
+    ts_col: str
+    kind: str      # "market" or "equity"
+    columns: Dict[str, str]  # cache column → SQL expression (REAL unless listed in TEXT_COLUMNS)
+    where: str = ""
+    fallback: str = ""       # table to read when `table` doesn't exist (older databases)
+
+TEXT_COLUMNS = {"contract_id", "direction", "expiry_date"}
+
+SOURCES = [
+    Source("kalshi_trades", "dashboard", "kalshi_trades", "trade_date", "market", {
+        "contract_id": "contract_id", "direction": "direction", "expiry_date": "expiry_date",
+        "entry_price": "entry_price", "exit_price": "exit_price",
+        "num_contracts": "num_contracts", "pnl_realized": "pnl_realized",
+    }, where="exit_price IS NOT NULL AND entry_price IS NOT NULL"),
+    Source("kalshi_snapshots", "dashboard", "kalshi_snapshot_history", "snapshot_ts", "equity", {
+        "equity_usd": "total_pnl_cents / 100.0", "balance_usd": "balance_cents / 100.0",
+    }, fallback="kalshi_snapshots"),
+    Source("scalper_feed", "dashboard", "scalper_feed_snapshots", "feed_ts_utc", "equity", {
+        "equity_usd": "total_value_usd", "balance_usd": "cash_usd",
+    }),
+    Source("scalper_pnl", "scalper", "pnl_snapshots", "timestamp", "equity", {
+        "equity_usd": "total_pnl_cents / 100.0", "balance_usd": "balance_cents / 100.0",
+    }),
+]
+
+def _epoch(ts: List[str]) -> np.ndarray:
+    """ISO timestamps ('T' or ' ' separated, fractional, Z/offset suffix) → epoch seconds (UTC wall clock)"""
+    return np.array([t[:19] for t in ts], dtype="datetime64[s]").astype(np.int64)
+
+_TICKER_DATE_FMT = "%y%b%d"
+
+def settle_epoch(ts_epoch: int, contract_id: str, expiry_date: str) -> int:
+    """Settlement time: expiry_date if recorded, else the date code in the ticker (KX...-26FEB22-...), else the fill time"""
+    if expiry_date:
+        try:
+            return int(_epoch([expiry_date.replace(" ", "T") if len(expiry_date) > 10 else expiry_date + "T23:59:59"])[0])
+        except ValueError:
+            pass
+    for part in (contract_id or "").split("-")[1:2]:
+        try:
+            day = datetime.strptime(part[:7].title(), _TICKER_DATE_FMT)
+            return int(np.datetime64(day.strftime("%Y-%m-%dT23:59:59"), "s").astype(np.int64))
+        except ValueError:
+            pass
+    return ts_epoch
+
+# ──────────────────────────────────────────────────────────────────────────────
+# MEMORY-MAPPED COLUMNAR CACHE
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _connect_ro(path: str) -> sqlite3.Connection:
+    return sqlite3.connect(f"file:{Path(path).as_posix()}?mode=ro", uri=True)
+
+def _table_exists(conn, table: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type IN ('table', 'view') AND name=?", (table,)
+    ).fetchone() is not None
+
+class ColumnCache:
+    """One source exported as ts.npy + one .npy per column; opened with mmap_mode='r'"""
+
+    def __init__(self, root: Path, source: Source):
+        self.source = source
+        self.dir = root / source.name
+        self.columns = {}
+
+    def _fingerprint(self, conn) -> dict:
+        s = self.source
+        where = f"WHERE {s.ts_col} IS NOT NULL" + (f" AND {s.where}" if s.where else "")
+        rows, max_ts = conn.execute(f"SELECT COUNT(*), MAX({s.ts_col}) FROM {s.table} {where}").fetchone()
+        return {"version": CACHE_VERSION, "table": s.table, "rows": rows, "max_ts": max_ts, "columns": sorted(s.columns)}
+
+    def open(self, conn, rebuild: bool = False) -> "ColumnCache":
+        meta_path = self.dir / "meta.json"
+        fingerprint = self._fingerprint(conn)
+        if rebuild or not meta_path.exists() or json.loads(meta_path.read_text()) != fingerprint:
+            self._build(conn, fingerprint)
+            meta_path.write_text(json.dumps(fingerprint))
+        for f in self.dir.glob("*.npy"):
+            self.columns[f.stem] = np.load(f, mmap_mode="r")
+        return self
+
+    def _build(self, conn, fingerprint: dict):
+        """Stream the table into preallocated .npy memmaps, CHUNK_ROWS at a time"""
+        s = self.source
+        n = fingerprint["rows"]
+        self.dir.mkdir(parents=True, exist_ok=True)
+        for f in self.dir.glob("*.npy"):
+            f.unlink()
+        out = {"ts": np.lib.format.open_memmap(self.dir / "ts.npy", "w+", np.int64, (n,))}
+        for col in s.columns:
+            dtype = f"S{TICKER_BYTES}" if col in TEXT_COLUMNS else np.float64
+            out[col] = np.lib.format.open_memmap(self.dir / f"{col}.npy", "w+", dtype, (n,))
+        if s.kind == "market":
+            out["settle_ts"] = np.lib.format.open_memmap(self.dir / "settle_ts.npy", "w+", np.int64, (n,))
+
+        exprs = ", ".join(f"{expr} AS {col}" for col, expr in s.columns.items())
+        where = f"WHERE {s.ts_col} IS NOT NULL" + (f" AND {s.where}" if s.where else "")
+        # normalize 'T' / ' ' separators so mixed formats still sort chronologically
+        cur = conn.execute(
+            f"SELECT {s.ts_col}, {exprs} FROM {s.table} {where} "
+            f"ORDER BY replace(substr({s.ts_col}, 1, 19), 'T', ' ')"
+        )
+        names = list(s.columns)
+        i = 0
+        while True:
+            rows = cur.fetchmany(CHUNK_ROWS)
+            if not rows:
+                break
+            j = i + len(rows)
+            ts = _epoch([r[0] for r in rows])
+            out["ts"][i:j] = ts
+            for k, col in enumerate(names, 1):
+                values = [r[k] for r in rows]
+                if col in TEXT_COLUMNS:
+                    out[col][i:j] = [(v or "").encode()[:TICKER_BYTES] for v in values]
+                else:
+                    out[col][i:j] = [np.nan if v is None else v for v in values]
+            if s.kind == "market":
+                out["settle_ts"][i:j] = [
+                    settle_epoch(int(t), r[names.index("contract_id") + 1], r[names.index("expiry_date") + 1])
+                    for t, r in zip(ts, rows)
+                ]
+            i = j
+        for arr in out.values():
+            arr.flush()
+        del out
+
+    def __len__(self) -> int:
+        return len(self.columns.get("ts", ()))
+
+    def chunks(self, start_ts: int = None, end_ts: int = None) -> Iterator[Dict[str, np.ndarray]]:
+        """Column slices CHUNK_ROWS at a time; only the touched pages are read"""
+        ts = self.columns.get("ts")
+        if ts is None or not len(ts):
+            return
+        lo = 0 if start_ts is None else int(np.searchsorted(ts, start_ts, "left"))
+        hi = len(ts) if end_ts is None else int(np.searchsorted(ts, end_ts, "right"))
+        for i in range(lo, hi, CHUNK_ROWS):
+            j = min(i + CHUNK_ROWS, hi)
+            yield {name: np.asarray(col[i:j]) for name, col in self.columns.items()}
+
+def open_caches(dashboard_db: str, scalper_db: Optional[str], cache_dir: Path, rebuild: bool = False) -> List[ColumnCache]:
+    caches = []
+    dbs = {"dashboard": dashboard_db, "scalper": scalper_db}
+    for source in SOURCES:
+        path = dbs[source.db]
+        if not path or not os.path.exists(path):
+            continue
+        conn = _connect_ro(path)
+        try:
+            if not _table_exists(conn, source.table) and source.fallback:
+                source = replace(source, table=source.fallback)
+            if _table_exists(conn, source.table):
+                caches.append(ColumnCache(cache_dir, source).open(conn, rebuild=rebuild))
+        finally:
+            conn.close()
+    return caches
+
+# ──────────────────────────────────────────────────────────────────────────────
+# FORECAST MODELS: what our forecast would have been at each market event
+# ──────────────────────────────────────────────────────────────────────────────
+
+def forecast_model(spec: str, seed=None) -> Callable[[np.ndarray], Tuple[np.ndarray, float]]:
+    """
+    "oracle"       forecast = settlement value (ceiling, like the "perfect" scenario)
+    "noisy:<acc>"  right (±2% noise) with probability acc, else a uniform guess, as in simulate_kalshi_market
+    Returns fn(true_outcome chunk) → (forecast array, forecast_accuracy)
+    """
+    if spec == "oracle":
+        return lambda true_outcome: (np.asarray(true_outcome, dtype=float), 1.0)
+    if spec.startswith("noisy:"):
+        accuracy = float(spec.split(":", 1)[1])
+        rng = np.random.default_rng(seed)
+        def noisy(true_outcome):
+            n = len(true_outcome)
+            right = rng.random(n) < accuracy
+            forecast = np.where(right, true_outcome + rng.normal(0, 0.02, n), rng.uniform(0, 1, n))
+            return np.clip(forecast, 0, 1), accuracy
+        return noisy
+    raise ValueError(f"Unknown forecast model {spec!r} (oracle | noisy:<accuracy>)")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# EVENT-DRIVEN REPLAY
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _events(cache: ColumnCache, forecast_fn, start_ts=None, end_ts=None):
+    """(ts, order, source, payload) per row; market rows carry a ready MarketState"""
+    kind = cache.source.kind
+    order = 0 if kind == "equity" else 1  # same second: mark equity before acting
+    for chunk in cache.chunks(start_ts, end_ts):
+        if kind == "equity":
+            for t, eq in zip(chunk["ts"].tolist(), chunk["equity_usd"].tolist()):
+                yield t, order, cache.source.name, eq
+            continue
+        forecast, accuracy = forecast_fn(chunk["exit_price"])
+        mids = chunk["entry_price"]
+        days = np.maximum(1, np.ceil((chunk["settle_ts"] - chunk["ts"]) / 86400.0)).astype(int)
+        spread = 0.02 + 0.05 / days  # same lead-time spread model as the simulator
+        bids, asks = np.maximum(0, mids - spread / 2), np.minimum(1, mids + spread / 2)
+        for k in range(len(mids)):
+            state = MarketState(
+                day=int(days[k]), true_outcome=chunk["exit_price"][k], forecast=forecast[k],
+                forecast_accuracy=accuracy, bid=bids[k], ask=asks[k], midpoint=mids[k],
+                volume=int(np.nan_to_num(chunk["num_contracts"][k])),
+            )
+            yield int(chunk["ts"][k]), order, cache.source.name, (state, int(chunk["settle_ts"][k]),
+                                                               chunk["contract_id"][k].decode())
+
+@dataclass
+class ReplayResult:
+    summaries: List[dict]
+    equity: Dict[str, Tuple[List[int], List[float]]]      # strategy name → (settle ts, cumulative P&L)
+    benchmarks: Dict[str, dict]                           # source → first/last equity over the window
+    events: int
+    skipped: int
+
+def replay(strategies: List[Strategy], caches: List[ColumnCache], forecast: str = "noisy:0.75",
+           seed=None, start_ts: int = None, end_ts: int = None) -> ReplayResult:
+    """One pass over the merged event stream, fanned out to every strategy"""
+    forecast_fn = forecast_model(forecast, seed)
+    stream = heapq.merge(*(_events(c, forecast_fn, start_ts, end_ts) for c in caches), key=lambda e: e[:2])
+
+    pending = []  # (settle_ts, seq, strategy index, trade)
+    equity = {s.name: ([], []) for s in strategies}
+    totals = [0.0] * len(strategies)
+    benchmarks = {}
+    events = skipped = seq = 0
+
+    def settle_until(now):
+        while pending and pending[0][0] <= now:
+            settle_ts, _, i, trade = heapq.heappop(pending)
+            strategies[i].trades.append(trade)
+            totals[i] += trade["pnl"]
+            ts_list, pnl_list = equity[strategies[i].name]
+            ts_list.append(settle_ts)
+            pnl_list.append(totals[i])
+
+    for ts, _, source, payload in stream:
+        events += 1
+        settle_until(ts)
+        if not isinstance(payload, tuple):
+            if not np.isnan(payload):
+                bench = benchmarks.setdefault(source, {"first_ts": ts, "first": payload})
+                bench.update(last_ts=ts, last=payload, change=payload - bench["first"])
+            continue
+        state, settle_ts, ticker = payload
+        if np.isnan(state.true_outcome) or np.isnan(state.midpoint):
+            skipped += 1
+            continue
+        for i, strategy in enumerate(strategies):
+            ok, action, confidence = strategy.should_trade(state)
+            if not ok or action not in ("BUY", "SELL"):
+                continue
+            entry = state.ask if action == "BUY" else state.bid
+            pnl = state.true_outcome - entry if action == "BUY" else entry - state.true_outcome
+            seq += 1
+            heapq.heappush(pending, (settle_ts, seq, i, {
+                "ts": ts, "settle_ts": settle_ts, "ticker": ticker, "day": state.day, "action": action,
+                "entry": entry, "exit": state.true_outcome, "pnl": pnl, "confidence": confidence,
+            }))
+    settle_until(float("inf"))
+
+    return ReplayResult(
+        summaries=[s.summary() for s in strategies],
+        equity=equity,
+        benchmarks=benchmarks,
+        events=events,
+        skipped=skipped,
+    )
+
+def parse_variant(text: str) -> Tuple[str, dict]:
+    """'hybrid' or 'hybrid:switch_day=2,threshold=0.1' → (strategy key, params)"""
+    key, _, rest = text.partition(":")
+    if key not in STRATEGIES:
+        raise argparse.ArgumentTypeError(f"unknown strategy {key!r} ({', '.join(STRATEGIES)})")
+    params = {}
+    for item in filter(None, rest.split(",")):
+        name, _, value = item.partition("=")
+        params[name.strip()] = float(value) if "." in value else int(value)
+    return key, params
+
+def _variant_name(key: str, params: dict) -> str:
+    return key + ("(" + ", ".join(f"{k}={v}" for k, v in params.items()) + ")" if params else "")
+
+def _run_group(variants, dashboard_db, scalper_db, cache_dir, forecast, seed, start_ts, end_ts):
+    """Worker: map the (already built) caches and replay one group of variants"""
+    caches = open_caches(dashboard_db, scalper_db, Path(cache_dir))
+    strategies = [STRATEGIES[key](_variant_name(key, params), **params) for key, params in variants]
+    return replay(strategies, caches, forecast, seed, start_ts, end_ts)
+
+def _to_epoch_arg(text: Optional[str]) -> Optional[int]:
+    return int(_epoch([text if len(text) > 10 else text + "T00:00:00"])[0]) if text else None
+
+# ──────────────────────────────────────────────────────────────────────────────
+# MAIN
+# ──────────────────────────────────────────────────────────────────────────────
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded Kalshi history through strategy variants")
+    parser.add_argument("--db", default=DASHBOARD_DB)
+    parser.add_argument("--scalper-db", default=SCALPER_DB)
+    parser.add_argument("--cache-dir", help="Columnar cache location (default: replay_cache/ next to --db)")
+    parser.add_argument("--rebuild", action="store_true", help="Re-export the caches even if unchanged")
+    parser.add_argument("--variant", action="append", type=parse_variant, default=[],
+                        help="strategy[:param=value,...]; repeatable (default: all three at default params)")
+    parser.add_argument("--forecast", default="noisy:0.75", help="oracle | noisy:<accuracy>")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--start", help="ISO date/time lower bound")
+    parser.add_argument("--end", help="ISO date/time upper bound")
+    parser.add_argument("--workers", type=int, default=1, help="Processes; variants are split across them")
+    args = parser.parse_args()
+
+    cache_dir = Path(args.cache_dir) if args.cache_dir else Path(args.db).parent / "replay_cache"
+    caches = open_caches(args.db, args.scalper_db, cache_dir, rebuild=args.rebuild)
+    if not caches:
+        raise SystemExit(f"No replayable history found in {args.db}")
+    for c in caches:
+        print(f"  {c.source.name:<18} {len(c):>10,} rows  ({c.source.kind})")
+
+    variants = args.variant or [(key, {}) for key in STRATEGIES]
+    start_ts, end_ts = _to_epoch_arg(args.start), _to_epoch_arg(args.end)
+    run_args = (args.db, args.scalper_db, str(cache_dir), args.forecast, args.seed, start_ts, end_ts)
+
+    workers = max(1, min(args.workers, len(variants)))
+    if workers == 1:
+        results = [_run_group(variants, *run_args)]
+    else:
+        groups = [variants[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_group, groups, *([a] * workers for a in run_args)))
+
+    print(f"\nReplayed {results[0].events:,} events ({results[0].skipped} market rows without prices skipped)")
+    print_results([s for r in results for s in r.summaries])
+    print("\nBenchmarks (recorded equity over the window):")
+    for name, b in results[0].benchmarks.items():
+        print(f"  {name:<18} ${b['first']:>10.2f} → ${b['last']:>10.2f}  ({b['change']:+.2f})")
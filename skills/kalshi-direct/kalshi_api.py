@@ -4,52 +4,34 @@ kalshi_api.py — Direct Kalshi REST API integration
 Fetches live account data, positions, orders, and P&L
 """
 import os
+import sys
 import json
-import urllib.request
-import urllib.error
 from datetime import datetime
 from typing import Dict, Any, List
 
+# Shared pooled/rate-limited client lives with the dashboard modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'dashboard'))
+import kalshi_http
+
 class KalshiAPI:
-    """Direct Kalshi API client using bearer token auth"""
+    """Direct Kalshi API client (RSA-PSS key if present, else bearer token) over kalshi_http"""
     
-    BASE_URL = "https://api.kalshi.com/v2"
+    BASE_URL = kalshi_http.KALSHI_BASE
     
     def __init__(self, api_key: str = None):
         """Initialize with API key (bearer token from Kalshi)"""
         self.api_key = api_key or os.environ.get('KALSHI_API_KEY', '')
-        if not self.api_key:
+        if not self.api_key and not os.path.exists(kalshi_http.KALSHI_PRIVATE_KEY_PATH):
             raise ValueError("KALSHI_API_KEY not set in environment")
+        if self.api_key:
+            os.environ.setdefault('KALSHI_API_KEY', self.api_key)
     
     def _request(self, method: str, endpoint: str, data: Dict = None) -> Dict:
-        """Make HTTP request to Kalshi API"""
-        url = f"{self.BASE_URL}{endpoint}"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-        
-        try:
-            if data:
-                req = urllib.request.Request(
-                    url, 
-                    data=json.dumps(data).encode('utf-8'),
-                    headers=headers,
-                    method=method
-                )
-            else:
-                req = urllib.request.Request(url, headers=headers, method=method)
-            
-            with urllib.request.urlopen(req, timeout=15) as response:
-                return json.loads(response.read().decode('utf-8'))
-        
-        except urllib.error.HTTPError as e:
-            try:
-                return {"error": json.loads(e.read()), "status": e.code}
-            except:
-                return {"error": str(e), "status": e.code}
-        except Exception as e:
-            return {"error": str(e), "status": 0}
+        """Make HTTP request to Kalshi API (keep-alive session shared across calls)"""
+        result, status = kalshi_http.request_sync(method, endpoint, body=data)
+        if status != 200:
+            return {"error": result.get("error"), "status": status}
+        return result
     
     def get_portfolio(self) -> Dict[str, Any]:
         """Get account portfolio summary"""
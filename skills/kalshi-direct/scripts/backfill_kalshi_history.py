@@ -1,41 +1,59 @@
 #!/usr/bin/env python3
 """
-backfill_kalshi_history.py — Fetch complete Kalshi order history from API
-Populates kalshi_orders table with all fills, wins/losses, P&L
+backfill_kalshi_history.py — Incremental Kalshi order + fill history sync
+Populates kalshi_orders / kalshi_fills from the Kalshi API.
+
+Each (account, stream) keeps a high-water mark in kalshi_sync_state, so a
+normal run only asks for orders/fills created since the last run (cursor
+pagination over min_ts). The in-flight cursor is saved after every page, so an
+interrupted run resumes where it stopped. --backfill splits a date range into
+windows fetched in parallel; ranges already covered are skipped.
+
+Run via:
+  python backfill_kalshi_history.py                     → incremental (O(new fills))
+  python backfill_kalshi_history.py --backfill --days 90 --workers 8
+  python backfill_kalshi_history.py --backfill --full   → everything since account open
 """
-import os, sqlite3, json, urllib.request, urllib.error, argparse
-from datetime import datetime, timedelta
+import os, sqlite3, argparse, hashlib, queue, threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 import sys
 
 # ── Config ────────────────────────────────────────────────────────────────────
 KALSHI_API_KEY = os.environ.get('KALSHI_API_KEY', '').strip()
-KALSHI_BASE_URL = 'https://api.kalshi.com/trade-api/v2'
 DASHBOARD_DB = r"C:\Users\chead\.openclaw\workspace\dashboard\data\northstar.db"
 
-def http_request(method, url, headers=None):
-    """Make HTTP request to Kalshi API."""
-    if not headers:
-        headers = {}
-    headers['Authorization'] = f'Bearer {KALSHI_API_KEY}'
-    headers['Content-Type'] = 'application/json'
-    
+# Shared pooled/rate-limited client lives with the dashboard modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'dashboard'))
+import kalshi_http
+
+PAGE_LIMIT = 200
+OVERLAP_S = 60           # re-read a little before the high-water mark; upserts are idempotent
+WINDOW_MIN_S = 86400     # don't split a backfill finer than a day
+EPOCH_START = 1577836800  # 2020-01-01, before any Kalshi account history
+
+def http_request(method, path, params=None):
+    """Kalshi request over the shared keep-alive client; returns (data, status)."""
+    return kalshi_http.request_sync(method, path, params)
+
+def account_id():
+    """Stable per-account key for the sync state (never stores the API key itself)."""
+    return os.environ.get('KALSHI_ACCOUNT') or hashlib.sha256((KALSHI_API_KEY or kalshi_http.KALSHI_API_KEY_ID).encode()).hexdigest()[:16]
+
+def _to_epoch(ts):
+    if not ts:
+        return 0
+    if isinstance(ts, (int, float)):
+        return int(ts)
     try:
-        req = urllib.request.Request(url, headers=headers, method=method)
-        with urllib.request.urlopen(req, timeout=15) as r:
-            data = json.loads(r.read().decode('utf-8'))
-            return data, r.status
-    except urllib.error.HTTPError as e:
-        try:
-            data = json.loads(e.read().decode('utf-8'))
-        except:
-            data = {"error": str(e)}
-        return data, e.code
-    except Exception as ex:
-        return {"error": str(ex)}, 0
+        return int(datetime.fromisoformat(ts.replace('Z', '+00:00')).timestamp())
+    except ValueError:
+        return 0
 
+# ── Schema ────────────────────────────────────────────────────────────────────
 def init_kalshi_orders_table(conn):
-    """Create kalshi_orders table if not exists."""
-    conn.execute("""
+    """Create kalshi_orders / kalshi_fills / kalshi_sync_state if not exists."""
+    conn.executescript("""
     CREATE TABLE IF NOT EXISTS kalshi_orders (
         id TEXT PRIMARY KEY,
         ticker TEXT NOT NULL,
@@ -46,111 +64,268 @@ def init_kalshi_orders_table(conn):
         status TEXT,
         pnl_cents INTEGER DEFAULT 0,
         notes TEXT
-    )
+    );
+    CREATE TABLE IF NOT EXISTS kalshi_fills (
+        trade_id TEXT PRIMARY KEY,
+        order_id TEXT,
+        ticker TEXT,
+        side TEXT,
+        action TEXT,
+        count INTEGER,
+        yes_price INTEGER,
+        no_price INTEGER,
+        is_taker INTEGER,
+        created_time TEXT,
+        created_ts INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_kalshi_fills_created_ts ON kalshi_fills(created_ts);
+    CREATE TABLE IF NOT EXISTS kalshi_sync_state (
+        account TEXT NOT NULL,
+        stream TEXT NOT NULL,
+        hwm_ts INTEGER,
+        low_ts INTEGER,
+        cursor TEXT,
+        cursor_min_ts INTEGER,
+        updated_at TEXT,
+        PRIMARY KEY (account, stream)
+    );
     """)
     conn.commit()
 
-def fetch_all_orders(limit_per_page=100, max_pages=None):
-    """Fetch all orders from Kalshi API with pagination."""
-    all_orders = []
-    page = 1
-    
+def load_state(conn, account, stream):
+    row = conn.execute(
+        "SELECT hwm_ts, low_ts, cursor, cursor_min_ts FROM kalshi_sync_state WHERE account=? AND stream=?",
+        (account, stream)).fetchone()
+    return dict(zip(("hwm_ts", "low_ts", "cursor", "cursor_min_ts"), row)) if row else {}
+
+def save_state(conn, account, stream, **fields):
+    cols = ["account", "stream", "updated_at"] + list(fields)
+    vals = [account, stream, datetime.utcnow().isoformat() + "Z"] + list(fields.values())
+    updates = ", ".join(f"{c}=excluded.{c}" for c in cols[2:])
+    conn.execute(
+        f"INSERT INTO kalshi_sync_state ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+        f"ON CONFLICT(account, stream) DO UPDATE SET {updates}", vals)
+
+# ── Row mapping + batched upserts ─────────────────────────────────────────────
+def _order_row(order):
+    order_id = order.get('order_id') or order.get('id')
+    if not order_id:
+        return None
+    quantity = order.get('initial_count', order.get('count', order.get('quantity', 0)))
+    price = order.get('yes_price', order.get('price', 0))
+    filled_at = order.get('last_update_time') or order.get('filled_at') or order.get('created_time', '')
+    pnl = int((order.get('pnl', 0) or 0) * 100)  # Convert to cents
+    return (order_id, order.get('ticker', ''), order.get('side', ''), quantity, price,
+            filled_at, order.get('status', 'unknown'), pnl)
+
+def _fill_row(fill):
+    trade_id = fill.get('trade_id') or fill.get('fill_id')
+    if not trade_id:
+        return None
+    created = fill.get('created_time', '')
+    return (trade_id, fill.get('order_id'), fill.get('ticker', ''), fill.get('side', ''),
+            fill.get('action', ''), fill.get('count', 0), fill.get('yes_price'), fill.get('no_price'),
+            1 if fill.get('is_taker') else 0, created, _to_epoch(created))
+
+def sync_orders_to_db(orders, conn, verbose=False):
+    """Upsert orders into kalshi_orders in one executemany (status changes overwrite)."""
+    rows = [r for r in map(_order_row, orders) if r]
+    conn.executemany("""
+        INSERT INTO kalshi_orders (id, ticker, side, quantity, price, filled_at, status, pnl_cents)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            quantity=excluded.quantity, price=excluded.price, filled_at=excluded.filled_at,
+            status=excluded.status, pnl_cents=excluded.pnl_cents
+    """, rows)
+    if verbose and len(rows) != len(orders):
+        print(f"[!] Skipped {len(orders) - len(rows)} orders without an id")
+    return len(rows)
+
+def sync_fills_to_db(fills, conn, verbose=False):
+    rows = [r for r in map(_fill_row, fills) if r]
+    conn.executemany("""
+        INSERT OR IGNORE INTO kalshi_fills
+        (trade_id, order_id, ticker, side, action, count, yes_price, no_price, is_taker, created_time, created_ts)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    return len(rows)
+
+STREAMS = {
+    # stream → (endpoint, response key, writer, timestamp field)
+    "orders": ("/portfolio/orders", "orders", sync_orders_to_db, "created_time"),
+    "fills":  ("/portfolio/fills",  "fills",  sync_fills_to_db,  "created_time"),
+}
+
+# ── Fetching ──────────────────────────────────────────────────────────────────
+def iter_pages(stream, min_ts=None, max_ts=None, cursor=None, extra=None):
+    """Yield (items, next_cursor) pages for one stream within [min_ts, max_ts]."""
+    endpoint, key = STREAMS[stream][:2]
     while True:
-        if max_pages and page > max_pages:
-            break
-        
-        print(f"[*] Fetching orders page {page}...")
-        url = f'{KALSHI_BASE_URL}/orders?limit={limit_per_page}&offset={(page-1)*limit_per_page}&status=any'
-        data, code = http_request('GET', url)
-        
+        params = {"limit": PAGE_LIMIT, **(extra or {})}
+        if min_ts is not None: params["min_ts"] = int(min_ts)
+        if max_ts is not None: params["max_ts"] = int(max_ts)
+        if cursor: params["cursor"] = cursor
+        data, code = http_request('GET', endpoint, params)
         if code != 200:
-            print(f"[!] Page {page} failed ({code}): {data}")
-            break
-        
-        orders = data.get('orders', [])
-        if not orders:
-            print(f"[*] No more orders (page {page})")
-            break
-        
-        all_orders.extend(orders)
-        print(f"    Fetched {len(orders)} orders (total: {len(all_orders)})")
-        page += 1
-    
-    return all_orders
+            raise RuntimeError(f"{stream} page failed ({code}): {data}")
+        cursor = data.get("cursor") or None
+        yield data.get(key, []) or [], cursor
+        if not cursor:
+            return
 
-def sync_orders_to_db(orders, conn, verbose=False):
-    """Store orders in kalshi_orders table."""
+def sync_incremental(conn, stream, verbose=False):
+    """Fetch only items created since the stored high-water mark; resumes an interrupted cursor."""
+    account = account_id()
+    ts_field = STREAMS[stream][3]
+    writer = STREAMS[stream][2]
+    state = load_state(conn, account, stream)
+    hwm = state.get("hwm_ts") or 0
+
+    if state.get("cursor"):
+        min_ts, cursor = state.get("cursor_min_ts"), state["cursor"]
+    else:
+        min_ts, cursor = (max(hwm - OVERLAP_S, 0) if hwm else None), None
+
+    synced, newest = 0, hwm
+    for items, next_cursor in iter_pages(stream, min_ts=min_ts, cursor=cursor):
+        synced += writer(items, conn, verbose)
+        newest = max([newest] + [_to_epoch(i.get(ts_field)) for i in items])
+        # Commit the page and where to resume from together
+        save_state(conn, account, stream, cursor=next_cursor, cursor_min_ts=min_ts)
+        conn.commit()
+        if verbose:
+            print(f"    {stream}: +{len(items)} (total {synced})")
+
+    save_state(conn, account, stream, hwm_ts=newest, cursor=None, cursor_min_ts=None,
+               low_ts=state.get("low_ts") if state.get("low_ts") is not None else (min_ts or EPOCH_START))
+    conn.commit()
+    return synced
+
+def refresh_resting_orders(conn, verbose=False):
+    """Old resting orders can still fill or cancel; their status is not covered by the created_ts mark."""
     synced = 0
-    for order in orders:
+    for items, _ in iter_pages("orders", extra={"status": "resting"}):
+        synced += sync_orders_to_db(items, conn, verbose)
+    conn.commit()
+    return synced
+
+def _windows(start_ts, end_ts, n, min_span=WINDOW_MIN_S):
+    """Disjoint inclusive [lo, hi] windows (min_ts/max_ts are both inclusive)."""
+    n = max(1, min(n, (end_ts - start_ts) // min_span))
+    step = -(-(end_ts - start_ts) // n)
+    return [(lo, min(lo + step, end_ts) - 1) for lo in range(start_ts, end_ts, step)]
+
+def backfill_range(conn, stream, start_ts, end_ts, workers=4, force=False, verbose=False):
+    """Parallel fetch of [start_ts, end_ts] split into windows; one thread writes to SQLite."""
+    account = account_id()
+    writer = STREAMS[stream][2]
+    ts_field = STREAMS[stream][3]
+    state = load_state(conn, account, stream)
+    hwm, low = state.get("hwm_ts"), state.get("low_ts")
+
+    # Skip what a previous backfill already covered; only the newer tail is fetched.
+    if not force and hwm and low is not None and low <= start_ts:
+        start_ts = max(start_ts, hwm - OVERLAP_S)
+    if start_ts >= end_ts:
+        return 0
+
+    pages = queue.Queue(maxsize=workers * 4)
+    DONE = object()
+    stop = threading.Event()  # set once the writer stops reading (done or failed)
+
+    def put(item):
+        """Bounded put that gives up when the writer has stopped, so a producer never blocks forever."""
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def fetch_window(window):
+        if stop.is_set():
+            return
+        try:
+            for items, _ in iter_pages(stream, min_ts=window[0], max_ts=window[1]):
+                if not put(items):
+                    return
+        finally:
+            put(DONE)
+
+    windows = _windows(start_ts, end_ts + 1, workers * 4)
+    synced, newest, finished = 0, hwm or 0, 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(fetch_window, w) for w in windows]
         try:
-            order_id = order.get('id')
-            if not order_id:
-                continue
-            
-            # Check if exists
-            cur = conn.execute("SELECT id FROM kalshi_orders WHERE id = ?", (order_id,))
-            if cur.fetchone():
-                continue
-            
-            ticker = order.get('ticker', '')
-            side = order.get('side', '')  # BUY / SELL
-            quantity = order.get('quantity', 0)
-            price = order.get('price', 0)
-            filled_at = order.get('filled_at', '')
-            status = order.get('status', 'unknown')
-            pnl = int((order.get('pnl', 0) or 0) * 100)  # Convert to cents
-            
-            conn.execute("""
-                INSERT INTO kalshi_orders 
-                (id, ticker, side, quantity, price, filled_at, status, pnl_cents)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (order_id, ticker, side, quantity, price, filled_at, status, pnl))
-            synced += 1
-        except Exception as e:
-            if verbose:
-                print(f"[!] Error storing order {order.get('id')}: {e}")
-    
+            while finished < len(windows):
+                items = pages.get()
+                if items is DONE:
+                    finished += 1
+                    continue
+                synced += writer(items, conn, verbose)
+                newest = max([newest] + [_to_epoch(i.get(ts_field)) for i in items])
+                conn.commit()
+        finally:
+            # A write/commit error must not leave producers blocked on a full queue
+            # (the pool's exit would then wait on them forever).
+            stop.set()
+            while True:
+                try:
+                    pages.get_nowait()
+                except queue.Empty:
+                    break
+        for f in futures:
+            f.result()  # surface fetch errors; the marks below only move on success
+
+    save_state(conn, account, stream, hwm_ts=max(newest, hwm or 0),
+               low_ts=min(start_ts, low) if low is not None else start_ts)
     conn.commit()
+    if verbose:
+        print(f"    {stream}: backfilled {synced} across {len(windows)} windows")
     return synced
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument('--days', type=int, default=0, help='Fetch last N days')
-    parser.add_argument('--full', action='store_true', help='Fetch all available')
+    parser.add_argument('--backfill', action='store_true', help='Parallel backfill by date range')
+    parser.add_argument('--days', type=int, default=30, help='Backfill the last N days')
+    parser.add_argument('--full', action='store_true', help='Backfill all available history')
+    parser.add_argument('--force', action='store_true', help='Re-fetch ranges already backfilled')
+    parser.add_argument('--workers', type=int, default=4)
     parser.add_argument('--verbose', action='store_true')
     args = parser.parse_args()
-    
-    if not KALSHI_API_KEY:
-        print("[!] ERROR: KALSHI_API_KEY not set")
+
+    if not KALSHI_API_KEY and not os.path.exists(kalshi_http.KALSHI_PRIVATE_KEY_PATH):
+        print("[!] ERROR: KALSHI_API_KEY not set and no private key at KALSHI_PRIVATE_KEY_PATH")
         print("    Set it: [System.Environment]::SetEnvironmentVariable('KALSHI_API_KEY','key','User')")
         sys.exit(1)
-    
-    print("[*] Kalshi Order History Backfill")
+
+    print("[*] Kalshi Order History Sync")
     print(f"    Time: {datetime.now().isoformat()}")
     print()
-    
-    # Fetch orders
-    if args.full:
-        orders = fetch_all_orders(max_pages=None)
-    else:
-        # For now, fetch last 100 pages (can be tuned)
-        orders = fetch_all_orders(max_pages=100)
-    
-    if not orders:
-        print("[!] No orders fetched")
-        sys.exit(1)
-    
-    print()
-    
-    # Sync to DB
+
     conn = sqlite3.connect(DASHBOARD_DB)
     init_kalshi_orders_table(conn)
-    
-    synced = sync_orders_to_db(orders, conn, args.verbose)
+
+    results = {}
+    try:
+        if args.backfill:
+            end_ts = int(datetime.now(timezone.utc).timestamp())
+            start_ts = EPOCH_START if args.full else int((datetime.now(timezone.utc) - timedelta(days=args.days)).timestamp())
+            for stream in STREAMS:
+                results[stream] = backfill_range(conn, stream, start_ts, end_ts, args.workers, args.force, args.verbose)
+        else:
+            for stream in STREAMS:
+                results[stream] = sync_incremental(conn, stream, args.verbose)
+            results["resting_refreshed"] = refresh_resting_orders(conn, args.verbose)
+    except RuntimeError as e:
+        print(f"[!] {e}")
+        conn.close()
+        sys.exit(1)
     conn.close()
-    
+
     print()
-    print(f"[OK] Synced {synced} orders to kalshi_orders table")
+    print(f"[OK] Synced {results.get('orders', 0)} orders, {results.get('fills', 0)} fills")
     print(f"     Dashboard will display live P&L at: https://chronic-slope-condo-justify.trycloudflare.com")
 
 if __name__ == '__main__':
@@ -3,45 +3,28 @@
 sync_kalshi_live.py — Fetch live Kalshi account data directly from API
 Syncs balance, positions, orders, and P&L to dashboard database
 """
-import os, sqlite3, json, urllib.request, urllib.error
+import os, sqlite3
 from datetime import datetime
 import sys
 
 # ── Config ────────────────────────────────────────────────────────────────────
 KALSHI_API_KEY = os.environ.get('KALSHI_API_KEY', '').strip()
-KALSHI_BASE_URL = 'https://api.kalshi.com/trade-api/v2'
 DASHBOARD_DB = r"C:\Users\chead\.openclaw\workspace\dashboard\data\northstar.db"
 
-def http_request(method, url, headers=None, body=None):
-    """Make HTTP request to Kalshi API."""
-    if not headers:
-        headers = {}
-    if not KALSHI_API_KEY:
-        return None, 401
-    
-    headers['Authorization'] = f'Bearer {KALSHI_API_KEY}'
-    headers['Content-Type'] = 'application/json'
-    
-    try:
-        req = urllib.request.Request(url, headers=headers, method=method)
-        if body:
-            req.data = json.dumps(body).encode('utf-8')
-        with urllib.request.urlopen(req, timeout=15) as r:
-            data = json.loads(r.read().decode('utf-8'))
-            return data, r.status
-    except urllib.error.HTTPError as e:
-        try:
-            data = json.loads(e.read().decode('utf-8'))
-        except:
-            data = {"error": str(e)}
-        return data, e.code
-    except Exception as ex:
-        return {"error": str(ex)}, 0
+# Shared pooled/rate-limited client lives with the dashboard modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'dashboard'))
+import kalshi_http
+import kpi_store
+import migrations
+
+def http_request(method, path, params=None):
+    """Kalshi request over the shared keep-alive client; returns (data, status)."""
+    return kalshi_http.request_sync(method, path, params)
 
 def fetch_portfolio():
     """Get account summary: balance, open positions, etc."""
     print("[*] Fetching portfolio...")
-    data, code = http_request('GET', f'{KALSHI_BASE_URL}/portfolio')
+    data, code = http_request('GET', '/portfolio')
     if code != 200:
         print(f"[!] Portfolio API {code}: {data}")
         return None
@@ -51,7 +34,7 @@ def fetch_portfolio():
 def fetch_pnl():
     """Get P&L breakdown by category."""
     print("[*] Fetching P&L...")
-    data, code = http_request('GET', f'{KALSHI_BASE_URL}/portfolio/pnl')
+    data, code = http_request('GET', '/portfolio/pnl')
     if code != 200:
         print(f"[!] P&L API {code}: {data}")
         return None
@@ -61,7 +44,7 @@ def fetch_pnl():
 def fetch_orders(limit=1000):
     """Get order history."""
     print(f"[*] Fetching order history (limit={limit})...")
-    data, code = http_request('GET', f'{KALSHI_BASE_URL}/orders?limit={limit}&status=any')
+    data, code = http_request('GET', '/portfolio/orders', {'limit': limit, 'status': 'any'})
     if code != 200:
         print(f"[!] Orders API {code}: {data}")
         return None
@@ -72,7 +55,7 @@ def fetch_orders(limit=1000):
 def fetch_positions():
     """Get currently open positions."""
     print("[*] Fetching positions...")
-    data, code = http_request('GET', f'{KALSHI_BASE_URL}/portfolio/positions')
+    data, code = http_request('GET', '/portfolio/positions')
     if code != 200:
         print(f"[!] Positions API {code}: {data}")
         return None
@@ -83,6 +66,7 @@ def fetch_positions():
 def sync_to_dashboard(portfolio, pnl, orders, positions, verbose=False):
     """Store Kalshi data in dashboard database."""
     conn = sqlite3.connect(DASHBOARD_DB)
+    migrations.migrate(conn)
     now = datetime.now().isoformat()
     synced = 0
     
@@ -128,6 +112,8 @@ def sync_to_dashboard(portfolio, pnl, orders, positions, verbose=False):
                 print(f"    [+] Snapshot: ${balance_cents/100:.2f} balance, ${total_pnl_cents/100:.2f} P&L")
         
         conn.commit()
+        if synced:
+            kpi_store.on_snapshot(conn, now[:10])
     except Exception as e:
         print(f"[!] Database error: {e}")
     finally:
@@ -141,8 +127,8 @@ def main():
     parser.add_argument('--verbose', action='store_true')
     args = parser.parse_args()
     
-    if not KALSHI_API_KEY:
-        print("[!] ERROR: KALSHI_API_KEY not set")
+    if not KALSHI_API_KEY and not os.path.exists(kalshi_http.KALSHI_PRIVATE_KEY_PATH):
+        print("[!] ERROR: KALSHI_API_KEY not set and no private key at KALSHI_PRIVATE_KEY_PATH")
         print("    Set it: [System.Environment]::SetEnvironmentVariable('KALSHI_API_KEY','key','User')")
         sys.exit(1)
     